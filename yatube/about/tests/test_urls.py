@@ -1,11 +1,13 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 
 class StaticPagesURLTests(TestCase):
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_about_urls_exists_at_desired_location(self):
         """Проверка доступности адресов статичных страниц."""
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -5,6 +6,7 @@ from django.urls import reverse
 class TaskStaticPagesTests(TestCase):
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_about_views_use_correct_templates(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -1,9 +1,19 @@
+from django.conf import settings
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from core.caching import cache_anonymous_page
 
+cache_for_anonymous = method_decorator(
+    cache_anonymous_page(settings.PAGE_CACHE_TIMEOUT), name='dispatch'
+)
+
+
+@cache_for_anonymous
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@cache_for_anonymous
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
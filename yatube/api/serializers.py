@@ -0,0 +1,120 @@
+"""
+Сериализация постов, авторов и комментариев для JSON API.
+
+Поле поста описано колонками, которые оно читает из базы, и функцией,
+достающей значение из объекта. По ?fields= выборка сужается через
+only() и select_related() ровно до нужных колонок и связей, а лайк
+читателя считается подзапросом, только если его спросили.
+"""
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+
+from posts import likebuffer
+from posts.models import Like
+
+# Поле -> (колонки в базе, значение из поста).
+POST_FIELDS = {
+    'id': ((), lambda post: post.pk),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date.isoformat()),
+    'author': (('author__username',), lambda post: post.author.username),
+    'group': (
+        ('group__slug',),
+        lambda post: post.group.slug if post.group_id else None
+    ),
+    'image': (('image',), lambda post: post.image.url if post.image else None),
+    'likes_count': (('likes_count',), lambda post: post.likes_count),
+    'comments_count': (('comments_count',), lambda post: post.comments_count),
+    'liked': ((), lambda post: post.liked_by_user),
+    'url': (
+        ('author__username',),
+        lambda post: reverse('post', args=(post.author.username, post.pk))
+    ),
+}
+
+
+def parse_fields(value):
+    """
+    Поля из строки ?fields= в порядке запроса; пустая строка — все поля.
+
+    На незнакомые поля бросает ValueError с их списком.
+    """
+    if not value:
+        return list(POST_FIELDS)
+    fields = list(dict.fromkeys(filter(None, value.split(','))))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown or not fields:
+        raise ValueError(', '.join(unknown))
+    return fields
+
+
+def select_fields(queryset, fields, user):
+    """Сужает выборку постов до колонок и связей, нужных полям fields."""
+    columns = {'id'}
+    for name in fields:
+        columns.update(POST_FIELDS[name][0])
+    related = sorted({
+        column.split('__')[0] for column in columns if '__' in column
+    })
+    # Связь нельзя одновременно отложить и пройти select_related.
+    queryset = queryset.select_related(*related) if related else (
+        queryset.select_related(None)
+    )
+    queryset = queryset.only(*columns, *related)
+    if 'liked' in fields:
+        queryset = queryset.annotate(liked_by_user=Exists(
+            Like.objects.filter(post=OuterRef('pk'), user_id=user.pk)
+        ))
+    return queryset
+
+
+def serialize_posts(posts, fields):
+    """Список словарей с полями fields; к лайкам прибавляет буфер."""
+    posts = list(posts)
+    if 'likes_count' in fields:
+        deltas = likebuffer.pending(post.pk for post in posts)
+        for post in posts:
+            post.likes_count = max(
+                0, post.likes_count + deltas.get(post.pk, 0)
+            )
+    getters = [(name, POST_FIELDS[name][1]) for name in fields]
+    return [
+        {name: getter(post) for name, getter in getters}
+        for post in posts
+    ]
+
+
+def serialize_author(user, following):
+    """Карточка автора со счётчиками из профиля и подпиской читателя."""
+    profile = getattr(user, 'profile', None)
+    return {
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'description': profile.description if profile else '',
+        'avatar': profile.avatar.url if profile and profile.avatar else None,
+        'posts_count': profile.posts_count if profile else 0,
+        'followers_count': profile.followers_count if profile else 0,
+        'following_count': profile.following_count if profile else 0,
+        'following': following,
+    }
+
+
+def serialize_group(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def serialize_comments(comments):
+    return [
+        {
+            'id': comment.pk,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+        for comment in comments
+    ]
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db.models import Count
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.seeding import seed
+from posts.tests.benchmark import (
+    measure, scale, timing_checks, write_results
+)
+from users.models import UserProfile
+
+# Запросы сессии и пользователя входят в бюджет, как и в posts;
+# ids первой страницы лент при холодном кэше читаются отдельно.
+QUERY_BUDGETS = {
+    'posts': 4,
+    'posts_sparse': 4,
+    'group': 5,
+    'profile': 5,
+    'follow_index': 4,
+    'post': 4,
+}
+# Лента сайта и её аналог в API: страницы разного размера сравниваются
+# по времени на один пост.
+COMPARED = (('posts', 'posts'), ('follow_index', 'follow_index'))
+
+
+class ApiBenchmarkTest(TestCase):
+    """
+    Замеряет эндпоинты API и сравнивает их с HTML-страницами.
+
+    Пост в JSON должен обходиться дешевле карточки поста в HTML; это
+    сравнение по времени проверяется только с YATUBE_BENCH=1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        size = scale()
+        cls.dataset = seed(
+            users=int(2000 * size),
+            posts=int(3000 * size),
+            follows=5,
+            likes=int(10000 * size),
+            comments=int(3000 * size),
+        )
+        cls.reader = UserProfile.objects.order_by(
+            '-following_count'
+        ).first().user
+        cls.author = UserProfile.objects.order_by(
+            '-followers_count'
+        ).first().user
+        cls.post = Post.objects.filter(
+            author=cls.author, is_valid=True
+        ).order_by('-comments_count').first()
+        cls.group = Group.objects.annotate(
+            size=Count('posts')
+        ).order_by('-size').first()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, name, *args, **params):
+        url = reverse(name, args=args)
+        return lambda: self.client.get(url, params)
+
+    def per_post(self, result, response):
+        page = response.context['page'] if response.context else None
+        count = len(page) if page is not None else len(
+            response.json()['results']
+        )
+        return round(result['p50_ms'] / count, 3)
+
+    def test_api_within_budget_and_cheaper_than_html(self):
+        cases = {
+            'posts': self.get('api:posts'),
+            'posts_sparse': self.get('api:posts', fields='id,text,pub_date'),
+            'group': self.get('api:group', self.group.slug),
+            'profile': self.get('api:profile', self.author.username),
+            'follow_index': self.get('api:follow_index'),
+            'post': self.get('api:post', self.post.pk),
+        }
+        results = {
+            name: measure(request) for name, request in cases.items()
+        }
+        for html, api in COMPARED:
+            request = self.get(html)
+            results[f'html_{html}'] = measure(request)
+            for name, view in ((f'html_{html}', request), (api, cases[api])):
+                results[name]['per_post_ms'] = self.per_post(
+                    results[name], view()
+                )
+        write_results(
+            'api', results, dataset=self.dataset,
+            page_size=settings.API_PAGE_SIZE
+        )
+
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertEqual(results[name]['statuses'], [200])
+                self.assertLessEqual(
+                    results[name]['queries_max'], budget, results[name]
+                )
+        if not timing_checks():
+            return
+        for html, api in COMPARED:
+            with self.subTest(compare=api):
+                self.assertLess(
+                    results[api]['per_post_ms'],
+                    results[f'html_{html}']['per_post_ms'],
+                    (results[api], results[f'html_{html}'])
+                )
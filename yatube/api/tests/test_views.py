@@ -0,0 +1,189 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.social import follow, like
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {num}', author=cls.author, is_valid=True,
+                group=cls.group if num % 2 else None
+            )
+            for num in range(5)
+        ]
+        cls.hidden = Post.objects.create(text='hidden', author=cls.author)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'api:{name}', args=args), params)
+        return response, json.loads(response.content)
+
+    def ids(self, data):
+        return [item['id'] for item in data['results']]
+
+    def test_anonymous_gets_json_401(self):
+        """Без входа API отвечает 401 в JSON, а не редиректом."""
+        response = Client().get(reverse('api:posts'))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', json.loads(response.content))
+
+    def test_posts_feed_shows_published_posts(self):
+        """Лента отдаёт опубликованные посты от новых к старым."""
+        response, data = self.get('posts')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.ids(data), [post.pk for post in reversed(self.posts)]
+        )
+        self.assertIsNone(data['next'])
+        item = data['results'][-1]
+        self.assertEqual(item['author'], 'author')
+        self.assertEqual(item['text'], 'Пост 0')
+        self.assertEqual(item['url'], reverse(
+            'post', args=('author', self.posts[0].pk)
+        ))
+
+    def test_output_is_compact(self):
+        """JSON без пробелов между элементами и без \\u-экранирования."""
+        response, _ = self.get('posts')
+
+        content = response.content.decode()
+        self.assertNotIn(', ', content)
+        self.assertNotIn('": ', content)
+        self.assertIn('Пост', content)
+
+    def test_fields_select_keys(self):
+        """?fields= оставляет только перечисленные поля в их порядке."""
+        _, data = self.get('posts', fields='text,id')
+
+        self.assertEqual(list(data['results'][0]), ['text', 'id'])
+
+    def test_unknown_field_is_rejected(self):
+        """Незнакомое поле — ошибка 400 с его названием."""
+        response, data = self.get('posts', fields='id,password')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', data['detail'])
+
+    def test_sparse_fields_skip_joins(self):
+        """Поля без связей читаются без JOIN и подзапроса лайка."""
+        self.get('posts')
+        with self.assertNumQueries(3) as context:
+            self.client.get(reverse('api:posts'), {'fields': 'id,text'})
+
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('posts_like', sql)
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_cursor_walks_all_posts(self):
+        """Ссылки next проходят всю ленту без пропусков и сохраняют fields."""
+        response, data = self.get('posts', fields='id')
+        ids = self.ids(data)
+        while data['next']:
+            self.assertIn('fields=id', data['next'])
+            data = json.loads(self.client.get(data['next']).content)
+            ids += self.ids(data)
+
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        self.assertIsNotNone(data['previous'])
+
+    def test_liked_and_likes_count(self):
+        """Лайк читателя виден в liked и likes_count."""
+        like(self.reader.pk, self.posts[0].pk)
+
+        _, data = self.get('posts', fields='id,liked,likes_count')
+
+        item = data['results'][-1]
+        self.assertEqual(item, {
+            'id': self.posts[0].pk, 'liked': True, 'likes_count': 1
+        })
+        self.assertFalse(data['results'][0]['liked'])
+
+    def test_group_posts(self):
+        """Лента группы — её описание и только её посты."""
+        _, data = self.get('group', 'group')
+
+        self.assertEqual(data['group']['title'], 'Группа')
+        self.assertEqual(
+            self.ids(data), [self.posts[3].pk, self.posts[1].pk]
+        )
+        self.assertEqual(data['results'][0]['group'], 'group')
+
+    def test_missing_objects_give_json_404(self):
+        """Несуществующие группа, автор и скрытый пост — 404 в JSON."""
+        for name, args in (
+            ('group', ('missing',)),
+            ('profile', ('missing',)),
+            ('post', (self.hidden.pk,)),
+        ):
+            with self.subTest(name=name):
+                response, data = self.get(name, *args)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', data)
+
+    def test_profile_shows_author_and_follow_state(self):
+        """Профиль отдаёт карточку автора, подписку читателя и посты."""
+        follow(self.reader.pk, self.author.pk)
+
+        _, data = self.get('profile', 'author')
+
+        self.assertEqual(data['author']['username'], 'author')
+        self.assertTrue(data['author']['following'])
+        self.assertEqual(data['author']['followers_count'], 1)
+        self.assertEqual(len(data['results']), 5)
+
+    def test_follow_index_shows_followed_authors(self):
+        """Лента подписок пуста до подписки и полна после неё."""
+        _, data = self.get('follow_index')
+        self.assertEqual(data['results'], [])
+
+        follow(self.reader.pk, self.author.pk)
+        _, data = self.get('follow_index')
+
+        self.assertEqual(
+            self.ids(data), [post.pk for post in reversed(self.posts)]
+        )
+
+    def test_post_view_includes_comments(self):
+        """Пост отдаётся вместе с первой страницей комментариев."""
+        _, data = self.get('post', self.posts[0].pk)
+
+        self.assertEqual(data['id'], self.posts[0].pk)
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+        self.assertEqual(data['comments'][0]['author'], 'reader')
+        self.assertIsNone(data['comments_next'])
+
+    def test_response_is_gzipped_on_request(self):
+        """Клиент, принимающий gzip, получает сжатый ответ."""
+        response = self.client.get(
+            reverse('api:posts'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 5)
@@ -0,0 +1,141 @@
+"""
+JSON API v1: ленты, группа, профиль, лента подписок и пост, только чтение.
+
+Страницы листаются курсором (?cursor=), как и на сайте; ссылки next
+и previous уже содержат курсор и остальные параметры запроса. Состав
+полей поста задаёт ?fields=id,text,... Ответ — JSON без пробелов
+и \\u-экранирования кириллицы, сжатый gzip, если клиент его принимает.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.timeline import timeline_posts
+from posts.utils import CursorPaginator, feed_key
+
+from .serializers import (
+    parse_fields, select_fields, serialize_author, serialize_comments,
+    serialize_group, serialize_posts
+)
+
+COMPACT = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=COMPACT)
+
+
+def _error(status, detail):
+    return _json({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """
+    GET от вошедшего пользователя; вьюха получает разобранный ?fields=.
+
+    Вместо редиректа на вход и HTML-страниц ошибок отвечает JSON.
+    """
+    @gzip_page
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error(401, 'Требуется вход')
+        try:
+            fields = parse_fields(request.GET.get('fields'))
+        except ValueError as error:
+            return _error(400, f'Неизвестные поля: {error}')
+        return view(request, fields, *args, **kwargs)
+    return wrapper
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode(safe=",")}'
+
+
+def _page(request, queryset, fields, first_page_key=None):
+    paginator = CursorPaginator(
+        select_fields(queryset, fields, request.user),
+        settings.API_PAGE_SIZE,
+        first_page_key
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': serialize_posts(page, fields),
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    }
+
+
+@api_view
+def posts(request, fields):
+    return _json(_page(
+        request, Post.objects.filter(is_valid=True), fields,
+        feed_key('api:posts')
+    ))
+
+
+@api_view
+def group_posts(request, fields, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error(404, 'Группа не найдена')
+    return _json({
+        'group': serialize_group(group),
+        **_page(
+            request, group.posts.filter(is_valid=True), fields,
+            feed_key(f'api:group:{group.pk}')
+        ),
+    })
+
+
+@api_view
+def profile(request, fields, username):
+    author = User.objects.select_related('profile').filter(
+        username=username
+    ).first()
+    if author is None:
+        return _error(404, 'Автор не найден')
+    following = Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
+    return _json({
+        'author': serialize_author(author, following),
+        **_page(request, author.posts.filter(is_valid=True), fields),
+    })
+
+
+@api_view
+def follow_index(request, fields):
+    return _json(_page(request, timeline_posts(request.user), fields))
+
+
+@api_view
+def post_view(request, fields, post_id):
+    """Пост и первая (или по ?cursor=) страница комментариев к нему."""
+    post = select_fields(
+        Post.objects.filter(pk=post_id, is_valid=True), fields, request.user
+    ).first()
+    if post is None:
+        return _error(404, 'Пост не найден')
+    comments = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).only(
+            'text', 'created', 'author', 'author__username'
+        ).order_by('created', 'id'),
+        settings.COMMENTS_PER_PAGE
+    ).get_page(request.GET.get('cursor'))
+    return _json({
+        **serialize_posts([post], fields)[0],
+        'comments': serialize_comments(comments),
+        'comments_next': _link(request, comments.next_cursor),
+    })
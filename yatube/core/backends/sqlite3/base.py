@@ -0,0 +1,22 @@
+"""
+SQLite, настроенный для параллельной записи.
+
+PRAGMA из ключа PRAGMAS настроек базы выполняются на каждом новом
+соединении: synchronous, busy_timeout и mmap_size действуют только
+в его рамках. Транзакции atomic() начинаются с BEGIN IMMEDIATE:
+отложенная транзакция, которая сначала читает, а потом пишет, не ждёт
+busy_timeout, а сразу падает с «database is locked», если другой
+писатель успел зафиксировать свою.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
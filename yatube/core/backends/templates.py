@@ -0,0 +1,26 @@
+"""
+Шаблоны Django с замером рендера для профилируемых запросов.
+
+Время рендера считает core.middleware, и только в запросах из выборки
+PROFILING_SAMPLE_RATE; в остальных обёртка лишь вызывает шаблон.
+"""
+from django.template.backends.django import DjangoTemplates, Template
+
+from ..middleware import render_template
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        return render_template(super().render, context, request)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return ProfiledTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(
+            super().get_template(template_name).template, self
+        )
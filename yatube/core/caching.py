@@ -0,0 +1,159 @@
+"""
+Кэширование с защитой от «давки» (cache stampede).
+
+Значение хранится вместе со сроком годности и временем, которое ушло на
+его вычисление. Незадолго до истечения срока один из запросов с растущей
+вероятностью пересчитывает значение заранее (probabilistic early
+refresh), а пересчёт идёт под замком в кэше (single flight): остальные
+процессы в это время отдают старое значение или ждут готового.
+
+Страницы, которые кэшировать целиком нельзя, отвечают на условный GET
+(conditional_page): совпал ETag — 304 без рендера.
+"""
+import math
+import random
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import metrics
+
+# Сколько ещё держать значение после срока годности, чтобы было что
+# отдать, пока его пересчитывает другой процесс.
+STALE_GRACE = 60
+LOCK_TIMEOUT = 10
+WAIT_STEP = 0.05
+
+
+def _fresh(entry, beta):
+    _, expires, delta = entry
+    # XFetch: чем дороже пересчёт и ближе срок, тем вероятнее обновить.
+    return time.time() - delta * beta * math.log(random.random()) < expires
+
+
+def _store(key, producer, timeout):
+    started = time.time()
+    value = producer()
+    delta = time.time() - started
+    cache.set(
+        key, (value, time.time() + timeout, delta), timeout + STALE_GRACE
+    )
+    return value
+
+
+def get_or_compute(key, producer, timeout, beta=1.0,
+                   lock_timeout=LOCK_TIMEOUT):
+    """
+    Возвращает значение из кэша или считает его вызовом producer().
+
+    Одновременно пересчитывает значение только один процесс.
+    """
+    entry = cache.get(key)
+    # Вид кэша для метрик — начало ключа: page, feed и т. п.
+    name = key.split(':', 1)[0]
+    if entry is not None and _fresh(entry, beta):
+        metrics.record_cache(name, 1, 0)
+        return entry[0]
+    metrics.record_cache(name, 0, 1)
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            return _store(key, producer, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry[0]
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # Владелец замка не успел — считаем сами, чем отдавать ошибку.
+    return _store(key, producer, timeout)
+
+
+def generation(name):
+    """Номер поколения данных: входит в ключи, чтобы сбросить их разом."""
+    return cache.get_or_set(f'generation:{name}', 1, None)
+
+
+def bump_generation(name):
+    key = f'generation:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def cache_anonymous_page(timeout):
+    """
+    Кэширует страницу целиком для анонимных GET-запросов.
+
+    Авторизованным отдаётся свежая страница: в ней меню пользователя.
+    В кэш идут тело и все заголовки ответа вьюхи. Куки у каждого
+    посетителя свои, поэтому ответ, который их ставит, не кэшируется.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            rendered = []
+
+            def render():
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                rendered.append(response)
+                if response.status_code != 200 or response.cookies:
+                    return None
+                return response.content, list(response.items())
+
+            key = f'page:{request.get_full_path()}'
+            cached = get_or_compute(key, render, timeout)
+            if cached is None:
+                # Некэшируемый ответ уже построен: второй раз вьюху не зовём.
+                return rendered[0] if rendered else view(
+                    request, *args, **kwargs
+                )
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers:
+                response[header] = value
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(etag_func):
+    """
+    Условный GET: при совпавшем If-None-Match отдаёт 304 без вызова вьюхи.
+
+    etag_func(request, *args, **kwargs) сверяет страницу и возвращает ETag
+    или None; вызывается только для запросов с If-None-Match. Полный ответ
+    вьюха помечает ETag сама, по уже загруженным данным. Ответ с ETag
+    помечается private, no-cache: браузер переспрашивает страницу каждый
+    раз, а общие кэши её не хранят.
+    """
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                response = conditional(request, *args, **kwargs)
+            else:
+                response = view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+"""
+Проверки конфигурации боевого окружения (YATUBE_ENV=production).
+
+Отладочный режим в бою копит каждый SQL в connection.queries и отдаёт
+трейсбеки наружу, а без манифеста статики падает каждая страница.
+Пустой ALLOWED_HOSTS отвечает 400 на любой запрос, а кэш в памяти
+процесса у каждого рабочего свой: сессии и сброс кэша лент не доходят
+до соседних процессов. Без METRICS_TOKEN /metrics закрыт только
+по адресу, а за обратным прокси все запросы приходят с 127.0.0.1.
+Проверки регистрируются в системе проверок Django и останавливают
+runserver, migrate и другие команды. Сервер приложений системные
+проверки не запускает, поэтому wsgi.py вызывает ensure_production_ready.
+"""
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestFilesMixin, staticfiles_storage
+)
+from django.core.checks import Error, Warning, register, run_checks
+from django.core.exceptions import ImproperlyConfigured
+
+TAG = 'yatube'
+ENVIRONMENTS = ('development', 'production')
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def _loaders(template):
+    return [
+        loader[0] if isinstance(loader, (list, tuple)) else loader
+        for loader in template.get('OPTIONS', {}).get('loaders', [])
+    ]
+
+
+@register(TAG)
+def check_environment(app_configs, **kwargs):
+    environment = getattr(settings, 'ENVIRONMENT', 'development')
+    if environment not in ENVIRONMENTS:
+        return [Error(
+            f'Неизвестное окружение YATUBE_ENV={environment!r}',
+            hint='Допустимо: ' + ', '.join(ENVIRONMENTS),
+            id='yatube.E001',
+        )]
+    if environment != 'production':
+        return []
+
+    messages = []
+    if settings.DEBUG:
+        messages.append(Error(
+            'DEBUG включён в production',
+            hint='Уберите YATUBE_DEBUG из окружения',
+            id='yatube.E002',
+        ))
+    for template in settings.TEMPLATES:
+        if template.get('OPTIONS', {}).get('debug'):
+            messages.append(Error(
+                'Отладка шаблонов включена в production',
+                id='yatube.E003',
+            ))
+        if CACHED_LOADER not in _loaders(template):
+            messages.append(Warning(
+                'Шаблоны загружаются без кэширующего загрузчика',
+                hint=f'Оберните загрузчики в {CACHED_LOADER}',
+                id='yatube.W001',
+            ))
+    if not settings.ALLOWED_HOSTS:
+        messages.append(Error(
+            'ALLOWED_HOSTS пуст: сайт ответит 400 на любой запрос',
+            hint='Перечислите домены в YATUBE_ALLOWED_HOSTS через запятую',
+            id='yatube.E005',
+        ))
+    for alias, cache in settings.CACHES.items():
+        if cache['BACKEND'] == LOCMEM_CACHE:
+            messages.append(Warning(
+                f'Кэш {alias!r} в памяти процесса: у каждого рабочего '
+                f'процесса он свой',
+                hint='Задайте YATUBE_CACHE=file или YATUBE_CACHE=redis',
+                id='yatube.W002',
+            ))
+    if not getattr(settings, 'METRICS_TOKEN', ''):
+        messages.append(Warning(
+            '/metrics закрыт только по адресу клиента',
+            hint=(
+                'За обратным прокси все запросы приходят с 127.0.0.1: '
+                'задайте YATUBE_METRICS_TOKEN'
+            ),
+            id='yatube.W003',
+        ))
+    if (
+        isinstance(staticfiles_storage, ManifestFilesMixin)
+        and staticfiles_storage.read_manifest() is None
+    ):
+        messages.append(Error(
+            'Нет манифеста собранной статики',
+            hint='Выполните manage.py collectstatic',
+            id='yatube.E004',
+        ))
+    return messages
+
+
+def ensure_production_ready():
+    """Бросает ImproperlyConfigured, если проверки нашли ошибки."""
+    errors = [
+        message for message in run_checks(tags=[TAG])
+        if message.is_serious()
+    ]
+    if errors:
+        raise ImproperlyConfigured(
+            '; '.join(f'{error.id}: {error.msg}' for error in errors)
+        )
@@ -0,0 +1,80 @@
+"""
+Приведение загруженных картинок к разумному виду.
+
+Оригинал с камеры весит мегабайты, а каждая миниатюра декодирует его
+целиком. Поэтому при загрузке картинка поворачивается по EXIF,
+уменьшается до IMAGE_MAX_SIZE и пережимается без метаданных.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from PIL import Image, ImageOps
+
+DEFAULT_MAX_SIZE = (1920, 1920)
+DEFAULT_QUALITY = 82
+
+# Форматы, которые пережимаются; остальные (например, анимированный GIF)
+# сохраняются как есть, если их не нужно уменьшать.
+SAVE_OPTIONS = {
+    'JPEG': lambda quality: {
+        'quality': quality, 'optimize': True, 'progressive': True
+    },
+    'WEBP': lambda quality: {'quality': quality, 'method': 6},
+    'PNG': lambda quality: {'optimize': True},
+    'GIF': lambda quality: {'optimize': True},
+}
+
+
+def max_size():
+    return tuple(getattr(settings, 'IMAGE_MAX_SIZE', DEFAULT_MAX_SIZE))
+
+
+def quality():
+    return getattr(settings, 'IMAGE_QUALITY', DEFAULT_QUALITY)
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS[image_format](quality()))
+    return buffer.getvalue()
+
+
+def normalize_image(upload):
+    """
+    Возвращает уменьшенную и очищенную от EXIF копию загрузки.
+
+    Если картинка не меняется и пережатие её не уменьшает, отдаётся
+    исходный файл. Битые картинки отсекает ImageField ещё до нас.
+    """
+    if not isinstance(upload, UploadedFile):
+        return upload
+    upload.seek(0)
+    original = upload.read()
+    upload.seek(0)
+
+    image = Image.open(BytesIO(original))
+    image_format = image.format
+    if image_format not in SAVE_OPTIONS or getattr(image, 'is_animated', False):
+        return upload
+
+    has_exif = bool(image.getexif())
+    image = ImageOps.exif_transpose(image)
+    resized = image.width > max_size()[0] or image.height > max_size()[1]
+    if resized:
+        image.thumbnail(max_size(), Image.LANCZOS)
+
+    content = _encode(image, image_format)
+    if not (resized or has_exif) and len(content) >= len(original):
+        return upload
+
+    return InMemoryUploadedFile(
+        BytesIO(content),
+        field_name=upload.field_name,
+        name=upload.name,
+        content_type=Image.MIME[image_format],
+        size=len(content),
+        charset=None,
+    )
@@ -0,0 +1,319 @@
+"""
+Метрики в формате Prometheus, общие для всех рабочих процессов.
+
+Каждый процесс пишет свои значения в файл METRICS_DIR/<вид>_<pid>.db,
+отображённый в память: запись — это struct.pack_into по известному
+смещению, без системных вызовов. При выдаче /metrics читаются файлы
+всех процессов и значения складываются, поэтому любой процесс отдаёт
+картину всего сервера. При выдаче же файлы умерших процессов убираются:
+их счётчики сливаются в общий файл counter_merged.db и остаются
+в сумме, а gauge-значения отбрасываются.
+"""
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+INITIAL_SIZE = 64 * 1024
+HEADER = struct.Struct('i')
+LENGTH = struct.Struct('i')
+VALUE = struct.Struct('d')
+MERGED = 'merged'
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# Семейство метрики: (тип, описание).
+FAMILIES = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по имени URL'
+    ),
+    'yatube_profiled_seconds': (
+        'histogram',
+        'Время профилированных запросов по имени URL: SQL, шаблоны, Python'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к базе по имени URL'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кэшу по виду кэша и результату'
+    ),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш по виду кэша'
+    ),
+    'yatube_thumbnail_queue_depth': (
+        'gauge', 'Задачи нарезки миниатюр в очереди'
+    ),
+    'yatube_posts': ('gauge', 'Посты по состоянию модерации'),
+}
+
+
+class MmapValues:
+    """Значения одного процесса в файле, отображённом в память."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = HEADER.unpack_from(self._map, 0)[0]
+        if not self._used:
+            self._used = HEADER.size
+            HEADER.pack_into(self._map, 0, self._used)
+        self._positions = {
+            key: position for key, _, position in _entries(self._map)
+        }
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode()
+        # Значение выравнивается по 8 байт, чтобы запись была атомарной.
+        padding = (8 - (LENGTH.size + len(encoded)) % 8) % 8
+        entry = (
+            LENGTH.pack(len(encoded)) + encoded + b' ' * padding
+            + VALUE.pack(0.0)
+        )
+        if self._used + len(entry) > len(self._map):
+            self._map.close()
+            self._file.truncate(max(2 * os.fstat(
+                self._file.fileno()
+            ).st_size, self._used + len(entry)))
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self._used:self._used + len(entry)] = entry
+        position = self._used + len(entry) - VALUE.size
+        self._used += len(entry)
+        HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._position(key)
+            value = VALUE.unpack_from(self._map, position)[0]
+            VALUE.pack_into(self._map, position, value + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            VALUE.pack_into(self._map, self._position(key), value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _entries(data):
+    used = HEADER.unpack_from(data, 0)[0]
+    offset = HEADER.size
+    while offset < used:
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        key = bytes(data[offset:offset + length]).decode()
+        offset += length + (8 - (LENGTH.size + length) % 8) % 8
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        offset += VALUE.size
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def metrics_dir():
+    return settings.METRICS_DIR
+
+
+def _store(kind):
+    # После fork у дочернего процесса свой pid, а значит и свой файл.
+    path = os.path.join(metrics_dir(), f'{kind}_{os.getpid()}.db')
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            os.makedirs(metrics_dir(), exist_ok=True)
+            store = _stores[path] = MmapValues(path)
+        return store
+
+
+def _key(family, sample, labels):
+    return json.dumps([family, sample, sorted(labels.items())])
+
+
+def inc(family, amount=1, **labels):
+    if amount:
+        _store('counter').add(_key(family, family, labels), amount)
+
+
+def set_gauge(family, value, **labels):
+    _store('gauge').set(_key(family, family, labels), value)
+
+
+def observe(family, value, buckets=DURATION_BUCKETS, **labels):
+    store = _store('counter')
+    # Пустые корзины тоже пишутся: гистограмме нужны все границы.
+    for bound in buckets:
+        store.add(
+            _key(family, f'{family}_bucket', {**labels, 'le': bound}),
+            1 if value <= bound else 0
+        )
+    store.add(_key(family, f'{family}_bucket', {**labels, 'le': '+Inf'}), 1)
+    store.add(_key(family, f'{family}_sum', labels), value)
+    store.add(_key(family, f'{family}_count', labels), 1)
+
+
+def observe_request(view, seconds, queries):
+    """Вызывается ProfilingMiddleware на каждый запрос."""
+    observe('yatube_request_duration_seconds', seconds, view=view)
+    inc('yatube_db_queries_total', queries, view=view)
+
+
+def observe_profile(view, parts):
+    """
+    Разбивка времени запроса из выборки профилирования.
+
+    parts — {'sql': секунды, 'template': ..., 'python': ...}.
+    """
+    for part, seconds in parts.items():
+        observe('yatube_profiled_seconds', seconds, view=view, part=part)
+
+
+def record_cache(name, hits, misses):
+    inc('yatube_cache_requests_total', hits, cache=name, result='hit')
+    inc('yatube_cache_requests_total', misses, cache=name, result='miss')
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _files():
+    """Пары (путь, вид, pid) файлов метрик; у общего файла pid — None."""
+    for path in glob.glob(os.path.join(metrics_dir(), '*.db')):
+        kind, pid = os.path.basename(path)[:-3].rsplit('_', 1)
+        yield path, kind, None if pid == MERGED else int(pid)
+
+
+def remove_dead():
+    """
+    Убирает файлы умерших процессов, сохраняя их счётчики в сумме.
+
+    Слияние идёт под файловой блокировкой: два процесса, одновременно
+    отдающие /metrics, не сольют один файл дважды.
+    """
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'merge.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = None
+        for path, kind, pid in _files():
+            if pid is None or _alive(pid):
+                continue
+            if kind == 'counter':
+                if merged is None:
+                    merged = MmapValues(
+                        os.path.join(directory, f'counter_{MERGED}.db')
+                    )
+                with open(path, 'rb') as metrics_file:
+                    data = metrics_file.read()
+                if len(data) >= HEADER.size:
+                    for key, value, _ in _entries(data):
+                        merged.add(key, value)
+            os.remove(path)
+        if merged is not None:
+            merged.close()
+
+
+def collect():
+    """Складывает значения всех процессов: {ключ: значение}."""
+    remove_dead()
+    values = defaultdict(float)
+    for path, _, _ in _files():
+        try:
+            with open(path, 'rb') as metrics_file:
+                data = metrics_file.read()
+        except FileNotFoundError:
+            # Файл умершего процесса успел слить другой процесс.
+            continue
+        if len(data) < HEADER.size:
+            continue
+        for key, value, _ in _entries(data):
+            values[key] += value
+    return values
+
+
+def _cache_ratios(values):
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for key, value in values.items():
+        family, _, labels = json.loads(key)
+        if family == 'yatube_cache_requests_total':
+            labels = dict(labels)
+            totals[labels['cache']][labels['result'] == 'hit'] += value
+    return {
+        _key('yatube_cache_hit_ratio', 'yatube_cache_hit_ratio',
+             {'cache': name}): hits / (hits + misses)
+        for name, (misses, hits) in totals.items() if hits + misses
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+def _sort_key(sample):
+    _, name, labels = sample
+    return name, [
+        (label, float(value) if label == 'le' else 0, str(value))
+        for label, value in labels
+    ]
+
+
+def render(extra=None):
+    """
+    Текст в формате exposition Prometheus.
+
+    extra — значения, которые считаются в момент выдачи, в том же виде,
+    что возвращает collect().
+    """
+    values = collect()
+    values.update(_cache_ratios(values))
+    values.update(extra or {})
+
+    samples = defaultdict(list)
+    for key, value in values.items():
+        family, name, labels = json.loads(key)
+        samples[family].append((value, name, labels))
+
+    lines = []
+    for family in sorted(samples):
+        kind, help_text = FAMILIES.get(family, ('untyped', family))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for value, name, labels in sorted(samples[family], key=_sort_key):
+            label_text = ','.join(
+                f'{label}="{_escape(label_value)}"'
+                for label, label_value in labels
+            )
+            if label_text:
+                name = f'{name}{{{label_text}}}'
+            lines.append(f'{name} {value!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def gauge_values(family, rows):
+    """Значения для render(extra=...): rows — пары (метки, значение)."""
+    return {_key(family, family, labels): value for labels, value in rows}
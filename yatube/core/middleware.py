@@ -0,0 +1,150 @@
+"""
+Лёгкое профилирование запросов в бою.
+
+Число запросов к базе, время SQL и несколько самых медленных запросов
+записываются для каждого запроса: это пара вызовов perf_counter на
+запрос к базе. Время рендера шаблонов замеряется только для доли
+запросов PROFILING_SAMPLE_RATE: шаблоны замеряет бэкенд
+core.backends.templates, а SQL, выполненный при рендере, ко времени
+шаблонов не прибавляется. Запросы дольше PROFILING_SLOW_MS пишутся
+в логгер yatube.slow одной строкой JSON вместе с самыми медленными SQL.
+Время ответа и число запросов каждого запроса попадают в метрики
+(core.metrics), а у запросов из выборки — ещё и разбивка времени
+на SQL, шаблоны и Python.
+"""
+import contextvars
+import heapq
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger('yatube.slow')
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_SLOW_MS = 500
+DEFAULT_SLOW_SQL = 5
+
+_profile = contextvars.ContextVar('profile', default=None)
+
+
+def render_template(render, *args):
+    """Рендерит шаблон, замеряя его, если запрос попал в выборку."""
+    profile = _profile.get()
+    if profile is None:
+        return render(*args)
+    return profile.time_template(render, *args)
+
+
+class RequestProfile:
+    def __init__(self, sampled, keep_sql):
+        self.sampled = sampled
+        self.keep_sql = keep_sql
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slowest = []
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_seconds += elapsed
+            # Куча из keep_sql самых медленных запросов; текст не копируется.
+            item = (elapsed, self.queries, sql)
+            if len(self.slowest) < self.keep_sql:
+                heapq.heappush(self.slowest, item)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def time_template(self, render, *args):
+        # Вложенные шаблоны уже входят во время внешнего.
+        if self.template_depth:
+            return render(*args)
+        self.template_depth += 1
+        sql_before = self.sql_seconds
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            self.template_depth -= 1
+            # SQL ленивых querysets уже учтён в sql_seconds.
+            self.template_seconds += (
+                time.perf_counter() - started
+                - (self.sql_seconds - sql_before)
+            )
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(
+            settings, 'PROFILING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE
+        )
+        self.slow_ms = getattr(settings, 'PROFILING_SLOW_MS', DEFAULT_SLOW_MS)
+        self.keep_sql = getattr(
+            settings, 'PROFILING_SLOW_SQL', DEFAULT_SLOW_SQL
+        )
+
+    def __call__(self, request):
+        profile = RequestProfile(
+            random.random() < self.sample_rate, self.keep_sql
+        )
+        token = _profile.set(profile if profile.sampled else None)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        metrics.observe_request(view or 'unresolved', total, profile.queries)
+        if profile.sampled:
+            self._record(view or 'unresolved', profile, total)
+        if total * 1000 >= self.slow_ms:
+            self._log_slow(request, response, view, profile, total)
+        return response
+
+    @staticmethod
+    def _record(view, profile, total):
+        python = total - profile.sql_seconds - profile.template_seconds
+        metrics.observe_profile(view, {
+            'sql': profile.sql_seconds,
+            'template': profile.template_seconds,
+            'python': python,
+        })
+
+    @staticmethod
+    def _log_slow(request, response, view, profile, total):
+        record = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'queries': profile.queries,
+            'sql_ms': _ms(profile.sql_seconds),
+            'sql': [
+                {'ms': _ms(elapsed), 'sql': sql}
+                for elapsed, _, sql in sorted(profile.slowest, reverse=True)
+            ],
+        }
+        if profile.sampled:
+            record['template_ms'] = _ms(profile.template_seconds)
+        logger.warning(json.dumps(record, ensure_ascii=False))
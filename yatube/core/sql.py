@@ -0,0 +1,69 @@
+"""Запросы, которые ORM Django 2.2 не умеет строить сам."""
+from django.db import connection
+from django.db.models import F
+
+
+def insert_select(model, queryset, **columns):
+    """
+    INSERT ... SELECT в таблицу model, пропуская конфликтующие строки.
+
+    columns — поле model -> путь или выражение над queryset. Возвращает
+    число вставленных строк: так одна вставка заменяет пару exists()
+    + create() и не гоняется с параллельными запросами.
+    """
+    if queryset.query.can_filter():
+        # Без LIMIT порядок строк вставке не нужен.
+        queryset = queryset.order_by()
+    # values_list() ставит аннотации после полей модели, поэтому
+    # каждая колонка становится аннотацией: их порядок в SELECT
+    # совпадает с порядком columns.
+    rows = queryset.annotate(**{
+        f'insert_{name}': F(value) if isinstance(value, str) else value
+        for name, value in columns.items()
+    }).values_list(*(f'insert_{name}' for name in columns))
+    sql, params = rows.query.sql_with_params()
+    names = ', '.join(
+        connection.ops.quote_name(model._meta.get_field(name).column)
+        for name in columns
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    insert = connection.ops.insert_statement(ignore_conflicts=True)
+    suffix = connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{insert} {table} ({names}) {sql} {suffix}'.rstrip(), params
+        )
+        return cursor.rowcount
+
+
+def insert_rows(model, objects, fields, batch_size=None):
+    """
+    Вставляет объекты model как есть, многострочными INSERT.
+
+    В отличие от bulk_create значения не проходят pre_save: поля
+    auto_now_add сохраняют заданные даты. fields — поля модели
+    в порядке колонок. Пачка не больше batch_size строк и не больше,
+    чем позволяет число параметров запроса в базе.
+    """
+    size = connection.ops.bulk_batch_size(fields, objects)
+    if batch_size:
+        size = min(size, batch_size)
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    row = '({})'.format(', '.join(['%s'] * len(fields)))
+    with connection.cursor() as cursor:
+        for start in range(0, len(objects), size):
+            batch = objects[start:start + size]
+            cursor.execute(
+                f'INSERT INTO {table} ({names}) VALUES '
+                + ', '.join([row] * len(batch)),
+                [
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname), connection
+                    )
+                    for obj in batch for field in fields
+                ]
+            )
+    return len(objects)
@@ -0,0 +1,145 @@
+"""
+Сборка и раздача статики.
+
+collectstatic кладёт каждый файл ещё и под именем с хэшем содержимого
+(css/my.3c5a0f2b9e1d.css) и пишет manifest соответствий, из которого
+{% static %} берёт хэшированные имена. Текстовые файлы там же заранее
+сжимаются в .gz и, если установлен пакет brotli, в .br.
+
+StaticFilesMiddleware отдаёт собранное из STATIC_ROOT. Файл с хэшем
+в имени никогда не меняется и кэшируется навсегда (immutable), прочие
+браузер перепроверяет по Last-Modified. Сжатая копия выбирается
+по Accept-Encoding, заголовки Content-Encoding и Vary ставятся под неё.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+)
+# Файлы меньше этого размера не сжимаются: выигрыш меньше заголовков.
+MIN_COMPRESS_SIZE = 256
+# Кодировка -> суффикс сжатой копии, от лучшей к худшей.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compressors():
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def url_converter(self, name, hashed_files, template=None):
+        # В сторонних CSS бывают ссылки на файлы, которых нет в поставке:
+        # такая ссылка остаётся как есть и не роняет сборку.
+        convert = super().url_converter(name, hashed_files, template)
+
+        def converter(matchobj):
+            try:
+                return convert(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+        return converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        """Пишет рядом с файлом сжатые копии, если они меньше оригинала."""
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in _compressors():
+            packed = compress(data)
+            if len(packed) < len(data):
+                with open(path + suffix, 'wb') as output:
+                    output.write(packed)
+
+
+class StaticFilesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+
+    @cached_property
+    def hashed_names(self):
+        """Имена с хэшем из manifest; он меняется только при выкладке."""
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if (
+            self.root and request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(self.prefix)
+        ):
+            response = self.serve(
+                request, request.path_info[len(self.prefix):]
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        """Ответ с файлом из STATIC_ROOT или None, если файла нет."""
+        name = posixpath.normpath(unquote(name)).lstrip('/')
+        if name == '..' or name.startswith('../'):
+            return None
+        path = safe_join(self.root, name)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            encoding = None
+            for coding, suffix in ENCODINGS:
+                if coding in accepted and os.path.isfile(path + suffix):
+                    path, encoding = path + suffix, coding
+                    break
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type or 'application/octet-stream'
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = http_date(stat.st_mtime)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = (
+            IMMUTABLE if name in self.hashed_names else REVALIDATE
+        )
+        return response
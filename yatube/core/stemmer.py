@@ -0,0 +1,111 @@
+"""
+Стеммер Портера для русского языка (алгоритм Snowball).
+
+Отрезает окончания, чтобы «котики», «котиков» и «котика» попадали
+в поисковый индекс одним термином «котик».
+"""
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = ('в', 'вши', 'вшись')
+PERFECTIVE_GERUND_2 = ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+    'ют', 'ны', 'ть', 'ешь', 'нно',
+)
+VERB_2 = (
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+    'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+    'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _regions(word):
+    """Начало RV и R2 в терминах алгоритма."""
+    rv = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+
+    def after_vowel_consonant(start):
+        for i in range(max(start, 1), len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vowel_consonant(1)
+    return rv, after_vowel_consonant(r1 + 1)
+
+
+def _cut(word, start, endings, after_a=()):
+    """
+    Отрезает самое длинное окончание, целиком лежащее после start.
+
+    Окончания из after_a отрезаются, только если перед ними «а» или «я»
+    в той же области. None — окончания нет.
+    """
+    found = max(
+        (
+            ending for ending in endings + after_a
+            if word.endswith(ending) and len(word) - len(ending) >= start
+        ),
+        key=len,
+        default=None,
+    )
+    if found is None:
+        return None
+    stem = word[:-len(found)]
+    if found in after_a and not (len(stem) > start and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+# Словарь живого текста невелик, а одни и те же слова повторяются.
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    stemmed = _cut(word, rv, PERFECTIVE_GERUND_2, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = _cut(word, rv, REFLEXIVE) or word
+        stemmed = _cut(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _cut(stemmed, rv, PARTICIPLE_2, PARTICIPLE) or stemmed
+        else:
+            stemmed = (
+                _cut(word, rv, VERB_2, VERB) or _cut(word, rv, NOUN)
+            )
+    word = stemmed if stemmed is not None else word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    word = _cut(word, r2, DERIVATIONAL) or word
+
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    superlative = _cut(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн') and len(word) - 2 >= rv:
+            word = word[:-1]
+        return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
@@ -1,8 +0,0 @@
-from django import template
-
-register = template.Library()
-
-
-@register.filter
-def addclass(field, css):
-    return field.as_widget(attrs={"class": css})
@@ -0,0 +1,126 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..caching import cache_anonymous_page, get_or_compute
+
+User = get_user_model()
+
+
+class GetOrComputeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def producer(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_computed_once(self):
+        for _ in range(3):
+            self.assertEqual(get_or_compute('key', self.producer, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_other_process_recomputes(self):
+        cache.set('key', ('stale', time.time() - 1, 0.1), 60)
+        cache.add('key:lock', 1, 60)
+
+        self.assertEqual(get_or_compute('key', self.producer, 60), 'stale')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_recomputed_by_lock_owner(self):
+        cache.set('key', ('stale', time.time() - 1, 0.1), 60)
+
+        self.assertEqual(get_or_compute('key', self.producer, 60), 1)
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_waiter_computes_itself_when_lock_owner_is_gone(self):
+        cache.add('key:lock', 1, 60)
+
+        value = get_or_compute('key', self.producer, 60, lock_timeout=0.1)
+
+        self.assertEqual(value, 1)
+
+
+class CacheAnonymousPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @cache_anonymous_page(60)
+        def view(request):
+            self.calls += 1
+            response = HttpResponse(f'call {self.calls}')
+            response['Content-Language'] = 'ru'
+            if request.GET.get('cookie'):
+                response.set_cookie('seen', self.calls)
+            return response
+
+        self.view = view
+        self.factory = RequestFactory()
+
+    def get(self, user, **params):
+        request = self.factory.get('/about/author/', params)
+        request.user = user
+        return self.view(request)
+
+    def test_anonymous_page_is_cached(self):
+        self.get(AnonymousUser())
+        response = self.get(AnonymousUser())
+
+        self.assertEqual(response.content, b'call 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_cached_page_keeps_headers(self):
+        """Из кэша ответ приходит со всеми заголовками вьюхи."""
+        self.get(AnonymousUser())
+        response = self.get(AnonymousUser())
+
+        self.assertEqual(response['Content-Language'], 'ru')
+        self.assertEqual(
+            response['Content-Type'], 'text/html; charset=utf-8'
+        )
+
+    def test_page_setting_cookies_is_not_cached(self):
+        """Куки у каждого посетителя свои: такой ответ не кэшируется."""
+        self.get(AnonymousUser(), cookie=1)
+        response = self.get(AnonymousUser(), cookie=1)
+
+        self.assertEqual(response.content, b'call 2')
+        self.assertIn('seen', response.cookies)
+
+    def test_authenticated_user_gets_fresh_page(self):
+        user = User.objects.create_user(username='auth')
+        self.get(AnonymousUser())
+
+        response = self.get(user)
+
+        self.assertEqual(response.content, b'call 2')
+
+
+class FeedFirstPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_published_post_appears_on_cached_first_page(self):
+        self.client.get(reverse('posts'))
+        post = Post.objects.create(text='new', author=self.user)
+
+        response = self.client.get(reverse('posts'))
+        self.assertEqual(list(response.context['page']), [])
+
+        post.is_valid = True
+        post.save()
+
+        response = self.client.get(reverse('posts'))
+        self.assertEqual(list(response.context['page']), [post])
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.checks.registry import registry
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_environment, ensure_production_ready
+
+CACHED_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'OPTIONS': {
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+            ]),
+        ],
+    },
+}]
+MANIFEST = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(
+    ENVIRONMENT='production', DEBUG=False, TEMPLATES=CACHED_TEMPLATES,
+    ALLOWED_HOSTS=['yatube.example'], CACHES=SHARED_CACHES,
+    METRICS_TOKEN='secret'
+)
+class ProductionCheckTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def ids(self):
+        return [message.id for message in check_environment(None)]
+
+    def collected(self):
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder'
+            ],
+            STATICFILES_STORAGE=MANIFEST,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collected_production_passes(self):
+        """Собранная статика и кэшируемые шаблоны — без замечаний."""
+        self.collected()
+
+        self.assertEqual(self.ids(), [])
+        ensure_production_ready()
+
+    def test_debug_is_refused(self):
+        """DEBUG в production — ошибка, и wsgi не поднимется."""
+        self.collected()
+
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.ids(), ['yatube.E002'])
+            with self.assertRaisesMessage(ImproperlyConfigured, 'E002'):
+                ensure_production_ready()
+
+    def test_template_debug_and_plain_loaders(self):
+        """Отладка шаблонов — ошибка, загрузка без кэша — предупреждение."""
+        self.collected()
+        templates = [{
+            **CACHED_TEMPLATES[0],
+            'OPTIONS': {'debug': True},
+        }]
+
+        with self.settings(TEMPLATES=templates):
+            self.assertEqual(self.ids(), ['yatube.E003', 'yatube.W001'])
+
+    def test_empty_allowed_hosts_is_refused(self):
+        """Без ALLOWED_HOSTS сайт отвечает 400: это ошибка."""
+        self.collected()
+
+        with self.settings(ALLOWED_HOSTS=[]):
+            self.assertEqual(self.ids(), ['yatube.E005'])
+
+    def test_locmem_cache_is_warned(self):
+        """Кэш в памяти процесса в production — предупреждение."""
+        self.collected()
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+
+        with self.settings(CACHES=caches):
+            self.assertEqual(self.ids(), ['yatube.W002'])
+            ensure_production_ready()
+
+    def test_metrics_without_token_is_warned(self):
+        """За прокси проверка адреса не закрывает /metrics."""
+        self.collected()
+
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.ids(), ['yatube.W003'])
+
+    def test_checks_are_registered_by_core_app(self):
+        """Проверки регистрирует приложение core при запуске."""
+        self.assertIn(check_environment, registry.get_checks())
+
+    def test_missing_manifest_is_refused(self):
+        """Без collectstatic страницы упадут: это ошибка."""
+        with self.settings(
+            STATIC_ROOT=self.root, STATICFILES_STORAGE=MANIFEST
+        ):
+            self.assertEqual(self.ids(), ['yatube.E004'])
+
+    def test_development_is_not_checked(self):
+        """В разработке DEBUG разрешён, а неизвестное окружение — нет."""
+        with self.settings(ENVIRONMENT='development', DEBUG=True):
+            self.assertEqual(self.ids(), [])
+        with self.settings(ENVIRONMENT='prod'):
+            self.assertEqual(self.ids(), ['yatube.E001'])
@@ -0,0 +1,47 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..images import normalize_image
+
+
+def upload(size, image_format='JPEG', name='photo.jpg', exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif} if exif is not None else {}
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(IMAGE_MAX_SIZE=(200, 200))
+class NormalizeImageTest(TestCase):
+    def open(self, uploaded):
+        uploaded.seek(0)
+        return Image.open(BytesIO(uploaded.read()))
+
+    def test_large_image_is_resized_and_exif_stripped(self):
+        exif = Image.Exif()
+        exif[0x0110] = 'Camera'
+        original = upload((800, 400), exif=exif)
+
+        result = normalize_image(original)
+
+        image = self.open(result)
+        self.assertEqual(image.size, (200, 100))
+        self.assertEqual(image.format, 'JPEG')
+        self.assertFalse(image.getexif())
+        self.assertEqual(result.name, 'photo.jpg')
+        self.assertLess(result.size, original.size)
+
+    def test_exif_orientation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        result = normalize_image(upload((100, 50), exif=exif))
+
+        self.assertEqual(self.open(result).size, (50, 100))
+
+    def test_small_clean_image_is_kept(self):
+        original = upload((10, 10), 'GIF', 'small.gif')
+
+        self.assertIs(normalize_image(original), original)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='valid', author=cls.user, is_valid=True)
+        Post.objects.create(text='pending', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def worker_file(self, kind, pid):
+        return metrics.MmapValues(
+            os.path.join(self.directory, f'{kind}_{pid}.db')
+        )
+
+    def test_values_of_all_processes_are_summed(self):
+        metrics.inc('yatube_db_queries_total', 2, view='posts')
+        other = self.worker_file('counter', 999999999)
+        other.add(
+            metrics._key('yatube_db_queries_total',
+                         'yatube_db_queries_total', {'view': 'posts'}),
+            3
+        )
+
+        self.assertIn(
+            'yatube_db_queries_total{view="posts"} 5.0', metrics.render()
+        )
+
+    def test_files_of_dead_processes_are_merged(self):
+        """Файлы умерших процессов удаляются, их счётчики остаются."""
+        key = metrics._key(
+            'yatube_db_queries_total', 'yatube_db_queries_total',
+            {'view': 'posts'}
+        )
+        for pid in (999999998, 999999999):
+            self.worker_file('counter', pid).add(key, 3)
+        self.worker_file('gauge', 999999999).set(key, 7)
+
+        metrics.render()
+
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory)
+                   if name.endswith('.db')),
+            ['counter_merged.db']
+        )
+        self.assertIn(
+            'yatube_db_queries_total{view="posts"} 6.0', metrics.render()
+        )
+
+    def test_gauges_of_dead_processes_are_dropped(self):
+        metrics.set_gauge('yatube_thumbnail_queue_depth', 1)
+        self.worker_file('gauge', 999999999).set(
+            metrics._key('yatube_thumbnail_queue_depth',
+                         'yatube_thumbnail_queue_depth', {}),
+            7
+        )
+
+        self.assertIn('yatube_thumbnail_queue_depth 1.0', metrics.render())
+
+    def test_store_grows_past_initial_size(self):
+        for num in range(3000):
+            metrics.inc('yatube_db_queries_total', view=f'view_{num}')
+
+        text = metrics.render()
+        self.assertIn('yatube_db_queries_total{view="view_2999"} 1.0', text)
+
+    def test_metrics_endpoint(self):
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('posts'))
+        client.get(reverse('posts'))
+
+        response = client.get(reverse('metrics'))
+
+        text = response.content.decode()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts"} 2.0', text
+        )
+        self.assertIn('yatube_posts{state="valid"} 1', text)
+        self.assertIn('yatube_posts{state="pending"} 1', text)
+        self.assertIn('yatube_cache_hit_ratio{cache="card"} 0.5', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_endpoint_checks_address(self):
+        response = Client().get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_empty_allowed_list_denies_everyone(self):
+        response = Client().get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_checks_token(self):
+        """С токеном /metrics отдаётся только по Authorization: Bearer."""
+        url = reverse('metrics')
+        for header, status in (
+            (None, 403), ('Bearer wrong', 403), ('Bearer secret', 200)
+        ):
+            with self.subTest(header=header):
+                extra = {'HTTP_AUTHORIZATION': header} if header else {}
+                response = Client().get(url, **extra)
+                self.assertEqual(response.status_code, status)
@@ -0,0 +1,85 @@
+import json
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+from ..middleware import RequestProfile, render_template
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='text', author=cls.user, is_valid=True)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(METRICS_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def key(suffix, labels):
+        family = 'yatube_profiled_seconds'
+        return metrics._key(family, family + suffix, labels)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=10 ** 6)
+    def test_sampled_request_is_exported_to_metrics(self):
+        self.client.get(reverse('posts'))
+
+        values = metrics.collect()
+        for part in ('sql', 'template', 'python'):
+            with self.subTest(part=part):
+                labels = {'view': 'posts', 'part': part}
+                self.assertEqual(values[self.key('_count', labels)], 1)
+                self.assertGreater(values[self.key('_sum', labels)], 0)
+        self.assertIn(
+            '# TYPE yatube_profiled_seconds histogram', metrics.render()
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_MS=0)
+    def test_slow_request_is_logged_with_sql(self):
+        with self.assertLogs('yatube.slow', 'WARNING') as logs:
+            self.client.get(reverse('posts'))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts')
+        self.assertEqual(record['status'], 200)
+        self.assertTrue(record['sql'])
+        self.assertLessEqual(len(record['sql']), 5)
+        self.assertNotIn(
+            self.key('_count', {'view': 'posts', 'part': 'sql'}),
+            metrics.collect()
+        )
+
+    def test_sql_inside_template_is_counted_once(self):
+        """SQL ленивого queryset в шаблоне не входит во время шаблона."""
+        profile = RequestProfile(True, 5)
+
+        def execute(sql, params, many, context):
+            time.sleep(0.05)
+
+        profile.time_template(
+            profile, execute, 'SELECT 1', (), False, {}
+        )
+
+        self.assertGreaterEqual(profile.sql_seconds, 0.05)
+        self.assertLess(profile.template_seconds, 0.025)
+
+    def test_unsampled_render_is_not_timed(self):
+        """Вне профилируемого запроса шаблон просто рендерится."""
+        self.assertEqual(render_template(str.upper, 'text'), 'TEXT')
@@ -0,0 +1,131 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..staticfiles import IMMUTABLE, REVALIDATE, StaticFilesMiddleware
+
+User = get_user_model()
+
+STYLE = 'body { background: url("img/dot.png"); }\n' * 20
+# Ссылка на несуществующий файл, как в сторонних CSS.
+BROKEN = '.box { background: url("missing.gif"); }\n' * 20
+
+
+class StaticFilesTest(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.source, 'img'))
+        for name, content in (
+            ('style.css', STYLE.encode()),
+            ('broken.css', BROKEN.encode()),
+            ('img/dot.png', b'\x89PNG' + bytes(300)),
+        ):
+            with open(os.path.join(self.source, name), 'wb') as output:
+                output.write(content)
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder'
+            ],
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.client = Client()
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as source:
+            return source.read()
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """Сборка даёт имена с хэшем и .gz-копии текстовых файлов."""
+        hashed = staticfiles_storage.stored_name('style.css')
+
+        self.assertNotEqual(hashed, 'style.css')
+        self.assertIn(
+            staticfiles_storage.stored_name('img/dot.png'),
+            self.read(hashed).decode()
+        )
+        self.assertEqual(
+            gzip.decompress(self.read(hashed + '.gz')), self.read(hashed)
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, 'img/dot.png.gz'))
+        )
+
+    def test_missing_reference_does_not_break_build(self):
+        """Битая ссылка в CSS остаётся как есть."""
+        hashed = staticfiles_storage.stored_name('broken.css')
+
+        self.assertIn('url("missing.gif")', self.read(hashed).decode())
+
+    def test_hashed_file_is_immutable_and_gzipped(self):
+        """Файл с хэшем кэшируется навсегда и отдаётся сжатым по запросу."""
+        url = staticfiles_storage.url('style.css')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            STYLE.replace(
+                'img/dot.png', staticfiles_storage.stored_name('img/dot.png')
+            )
+        )
+
+    def test_plain_response_without_accept_encoding(self):
+        """Без Accept-Encoding файл отдаётся несжатым."""
+        response = self.client.get(staticfiles_storage.url('style.css'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'background', b''.join(response.streaming_content))
+
+    def test_unhashed_name_is_revalidated(self):
+        """Файл без хэша в имени браузер перепроверяет."""
+        response = self.client.get('/static/style.css')
+        self.assertEqual(response['Cache-Control'], REVALIDATE)
+
+        response = self.client.get(
+            '/static/style.css',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_outside_of_root_is_not_served(self):
+        """Путь за пределы STATIC_ROOT и несуществующий файл идут дальше."""
+        middleware = StaticFilesMiddleware(lambda request: None)
+        factory = RequestFactory()
+        for path in ('/static/../manage.py', '/static/missing.css'):
+            with self.subTest(path=path):
+                self.assertIsNone(middleware(factory.get(path)))
+
+
+class LocalBootstrapTest(TestCase):
+    def test_base_template_uses_local_bootstrap(self):
+        """Bootstrap берётся из своей статики, а не с CDN."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='auth'))
+
+        content = client.get(reverse('posts')).content.decode()
+
+        self.assertIn('/static/bootstrap/css/bootstrap.min.css', content)
+        self.assertIn('/static/bootstrap/js/bootstrap.bundle.min.js', content)
+        self.assertNotIn('cdn.jsdelivr.net', content)
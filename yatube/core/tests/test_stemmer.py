@@ -0,0 +1,19 @@
+from django.test import SimpleTestCase
+
+from ..stemmer import stem
+
+
+class StemmerTest(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        cases = {
+            'котики': 'котик',
+            'котиков': 'котик',
+            'красивая': 'красив',
+            'программирование': 'программирован',
+            'воспользовавшись': 'воспользова',
+            'прекраснейшие': 'прекрасн',
+            'ёлка': 'елк',
+        }
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from posts.models import Post
+
+from . import metrics
+
+
+def _post_state(row):
+    if row['is_valid']:
+        return 'valid'
+    return 'rejected' if row['is_rejected'] else 'pending'
+
+
+def metrics_view(request):
+    """Метрики всех рабочих процессов в формате Prometheus."""
+    # Пустой список закрывает /metrics для всех, а не открывает его.
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+
+    posts = Post.objects.order_by().values(
+        'is_valid', 'is_rejected'
+    ).annotate(count=Count('pk'))
+    extra = metrics.gauge_values('yatube_posts', (
+        ({'state': _post_state(row)}, row['count']) for row in posts
+    ))
+    return HttpResponse(
+        metrics.render(extra),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
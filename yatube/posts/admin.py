@@ -1,13 +1,42 @@
 from django.contrib import admin
 
 from .models import Comment, Group, Post
+from .moderation import approve, reject
+from .search import terms
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author')
+    list_display = ('pk', 'text', 'pub_date', 'author', 'is_valid')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('is_valid', 'is_rejected', 'pub_date')
     empty_value_display = '-пусто-'
+    actions = ('approve_posts', 'reject_posts')
+
+    def approve_posts(self, request, queryset):
+        count = approve(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Опубликовано постов: {count}')
+
+    approve_posts.short_description = 'Опубликовать выбранные посты'
+
+    def reject_posts(self, request, queryset):
+        count = reject(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Отклонено постов: {count}')
+
+    reject_posts.short_description = 'Отклонить выбранные посты'
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Ищет по поисковому индексу вместо LIKE по всей таблице.
+
+        Как и на сайте (posts.search), нужны все слова запроса.
+        """
+        query_terms = terms(search_term)
+        if not query_terms:
+            return queryset, False
+        for term in query_terms:
+            queryset = queryset.filter(search_postings__term=term)
+        # Пара (термин, пост) уникальна, дублей строк не бывает.
+        return queryset, False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,84 @@
+"""
+Автоматическая оценка постов перед модерацией.
+
+Классификатор получает тексты пачкой и возвращает для каждого риск от 0
+(можно публиковать без человека) до 1 (нужен модератор). Какой класс
+использовать, задаёт MODERATION_CLASSIFIER; свой классификатор достаточно
+унаследовать от Classifier и переопределить score() или score_many().
+"""
+import re
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .search import terms
+
+DEFAULT_CLASSIFIER = 'posts.classifiers.WordlistClassifier'
+
+# Слова, из-за которых пост лучше показать человеку.
+DEFAULT_WORDLIST = (
+    'казино', 'ставки', 'букмекер', 'кредит', 'займ', 'заработок',
+    'криптовалюта', 'инвестиции', 'скидка', 'распродажа', 'реклама',
+    'подписывайтесь', 'наркотики', 'оружие', 'порно', 'взлом',
+)
+
+LINK = re.compile(r'https?://|www\.', re.IGNORECASE)
+REPEAT = re.compile(r'(.)\1{5,}')
+# Доля заглавных букв, начиная с которой текст считается криком.
+CAPS_RATIO = 0.7
+CAPS_MIN_LETTERS = 20
+
+
+class Classifier:
+    """Базовый классификатор: оценивает тексты по одному."""
+
+    def score(self, text):
+        raise NotImplementedError
+
+    def score_many(self, texts):
+        return [self.score(text) for text in texts]
+
+
+class WordlistClassifier(Classifier):
+    """
+    Правила и список слов.
+
+    Каждое слово из списка (в любой форме) добавляет WORD_RISK, каждая
+    ссылка — LINK_RISK; текст капсом и повторы символов тоже повышают
+    риск.
+    """
+
+    WORD_RISK = 0.5
+    LINK_RISK = 0.2
+    CAPS_RISK = 0.3
+    REPEAT_RISK = 0.2
+
+    def __init__(self, words=None):
+        if words is None:
+            words = getattr(settings, 'MODERATION_WORDLIST', DEFAULT_WORDLIST)
+        self.terms = frozenset(terms(' '.join(words)))
+
+    def score(self, text):
+        risk = self.WORD_RISK * sum(
+            term in self.terms for term in set(terms(text))
+        )
+        risk += self.LINK_RISK * len(LINK.findall(text))
+        letters = [char for char in text if char.isalpha()]
+        if len(letters) >= CAPS_MIN_LETTERS and sum(
+            char.isupper() for char in letters
+        ) >= CAPS_RATIO * len(letters):
+            risk += self.CAPS_RISK
+        if REPEAT.search(text):
+            risk += self.REPEAT_RISK
+        return min(1.0, risk)
+
+
+_classifiers = {}
+
+
+def get_classifier():
+    path = getattr(settings, 'MODERATION_CLASSIFIER', DEFAULT_CLASSIFIER)
+    classifier = _classifiers.get(path)
+    if classifier is None:
+        classifier = _classifiers[path] = import_string(path)()
+    return classifier
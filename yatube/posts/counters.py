@@ -0,0 +1,206 @@
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Q, Subquery, When
+)
+from django.db.models.functions import Coalesce
+
+from users.models import UserProfile
+
+from .models import Comment, Follow, Like, Post, User
+
+
+# Эти счётчики видны в закэшированной карточке поста, см. posts.fragments.
+CARD_COUNTERS = {'comments_count'}
+
+
+def _shift(queryset, field, delta, **extra):
+    # Счётчики беззнаковые: не уводим их в минус, расхождение
+    # потом исправит rebuild_counters.
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def change_post_counter(post_id, field, delta):
+    """Атомарно меняет comments_count или likes_count поста."""
+    extra = {}
+    if field in CARD_COUNTERS:
+        extra['card_version'] = F('card_version') + 1
+    return _shift(Post.objects.filter(pk=post_id), field, delta, **extra)
+
+
+def change_profile_counter(user_id, field, delta):
+    """Атомарно меняет счётчик в профиле пользователя."""
+    return _shift(UserProfile.objects.filter(user_id=user_id), field, delta)
+
+
+def _shift_many(queryset, key, field, deltas):
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    return queryset.filter(**{f'{key}__in': deltas}).update(**{
+        field: Case(
+            *(
+                When(
+                    Q(**{key: pk}) & Q(**{f'{field}__gte': -delta}),
+                    then=F(field) + delta,
+                )
+                for pk, delta in deltas.items()
+            ),
+            default=F(field),
+            output_field=IntegerField(),
+        )
+    })
+
+
+def change_post_counters(field, deltas):
+    """Меняет счётчик нескольких постов одним UPDATE, см. ниже."""
+    return _shift_many(Post.objects.all(), 'pk', field, deltas)
+
+
+def change_profile_counters(field, deltas):
+    """
+    Меняет счётчик в профилях нескольких пользователей одним UPDATE.
+
+    deltas — {user_id: приращение}. Как и в _shift, счётчик, который ушёл
+    бы в минус, не трогается.
+    """
+    return _shift_many(UserProfile.objects.all(), 'user_id', field, deltas)
+
+
+def _shifted(field, user_id, delta):
+    return Case(
+        When(
+            Q(user_id=user_id) & Q(**{f'{field}__gte': -delta}),
+            then=F(field) + delta,
+        ),
+        default=F(field),
+        output_field=IntegerField(),
+    )
+
+
+def follow_changed(user_id, author_id, delta):
+    """Двигает счётчики подписчиков автора и подписок читателя одним UPDATE."""
+    return UserProfile.objects.filter(
+        user_id__in=(user_id, author_id)
+    ).update(
+        followers_count=_shifted('followers_count', author_id, delta),
+        following_count=_shifted('following_count', user_id, delta),
+    )
+
+
+def _count(queryset, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+# Хранимый счётчик -> выражение, считающее его заново.
+# Профиль связан с пользователем по user_id, поэтому его счётчики
+# коррелируют именно по этому полю.
+POST_COUNTERS = {
+    'comments_count': lambda: _count(Comment.objects.all(), 'post'),
+    'likes_count': lambda: _count(Like.objects.all(), 'post'),
+}
+PROFILE_COUNTERS = {
+    'followers_count': lambda: _count(
+        Follow.objects.all(), 'author', 'user_id'
+    ),
+    'following_count': lambda: _count(
+        Follow.objects.all(), 'user', 'user_id'
+    ),
+    'posts_count': lambda: _count(
+        Post.objects.filter(is_valid=True), 'author', 'user_id'
+    ),
+}
+
+
+def _find_drift(queryset, counters):
+    annotations = {
+        f'actual_{field}': expression()
+        for field, expression in counters.items()
+    }
+    for obj in queryset.annotate(**annotations).iterator():
+        changed = {
+            field: getattr(obj, f'actual_{field}')
+            for field in counters
+            if getattr(obj, field) != getattr(obj, f'actual_{field}')
+        }
+        if changed:
+            yield obj, changed
+
+
+def _create_missing_profiles(batch_size):
+    # У пользователей, заведённых до появления профилей, профиля может
+    # не быть, а счётчики хранятся именно там.
+    missing = User.objects.filter(profile__isnull=True)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=user) for user in missing.iterator()],
+        batch_size=batch_size
+    )
+
+
+def recount_all(batch_size=500):
+    """
+    Пересчитывает все счётчики одним UPDATE на таблицу.
+
+    В отличие от rebuild_counters, не ищет расхождения: после массовой
+    загрузки расходится всё, и построчный bulk_update только мешает.
+    """
+    _create_missing_profiles(batch_size)
+    Post.objects.update(
+        card_version=F('card_version') + 1,
+        **{field: expression() for field, expression in POST_COUNTERS.items()}
+    )
+    UserProfile.objects.filter(user__isnull=False).update(**{
+        field: expression() for field, expression in PROFILE_COUNTERS.items()
+    })
+
+
+def rebuild_counters(dry_run=False, batch_size=500):
+    """
+    Пересчитывает все счётчики с нуля.
+
+    Возвращает список расхождений (модель, pk, поле, было, стало).
+    """
+    if not dry_run:
+        _create_missing_profiles(batch_size)
+
+    drift = []
+    targets = (
+        (Post.objects.all(), POST_COUNTERS),
+        (UserProfile.objects.filter(user__isnull=False), PROFILE_COUNTERS),
+    )
+    for queryset, counters in targets:
+        model = queryset.model
+        queryset = queryset.only('pk', *counters)
+        fixed = []
+        for obj, changed in _find_drift(queryset, counters):
+            for field, actual in changed.items():
+                drift.append(
+                    (model.__name__, obj.pk, field,
+                     getattr(obj, field), actual)
+                )
+                setattr(obj, field, actual)
+            fixed.append(obj)
+        if fixed and not dry_run:
+            model.objects.bulk_update(
+                fixed, list(counters), batch_size=batch_size
+            )
+    if not dry_run:
+        stale_cards = {
+            pk for model, pk, field, _, _ in drift
+            if model == 'Post' and field in CARD_COUNTERS
+        }
+        Post.objects.filter(pk__in=stale_cards).update(
+            card_version=F('card_version') + 1
+        )
+    return drift
+
@@ -0,0 +1,155 @@
+"""
+Валидаторы условного GET (ETag) для лент и страницы поста.
+
+Для каждого видимого поста в ETag входят id, card_version (её поднимают
+правка, новый комментарий и готовая миниатюра), число лайков вместе
+с ещё не записанными приращениями (posts.likebuffer), лайк читателя
+и версия группы, а на странице автора — ещё его карточка и подписка.
+К ним добавляются id читателя, адрес страницы и CSRF-кука: в странице
+есть формы с токеном.
+
+Полный ответ получает ETag из уже загруженных для рендера постов, без
+лишних запросов. Запрос с If-None-Match сначала сверяется одним запросом
+по тем же индексам, что и сама страница, и при совпадении получает 304
+без рендера. Пустая страница и старые ссылки ?page=N валидатора
+не получают.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef
+from django.utils.http import quote_etag
+
+from . import likebuffer
+from .models import Follow, Like
+from .utils import CursorPaginator
+
+# Поля автора, видные в его карточке над постами.
+AUTHOR_FIELDS = (
+    'first_name',
+    'last_name',
+    'profile__description',
+    'profile__avatar',
+    'profile__followers_count',
+    'profile__following_count',
+    'profile__posts_count',
+)
+
+
+def _digest(request, data):
+    raw = json.dumps(
+        [
+            request.user.pk,
+            request.get_full_path(),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            data,
+        ],
+        default=str,
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _rows(posts):
+    pending = likebuffer.pending(post.pk for post in posts)
+    return [
+        [
+            post.pk,
+            post.card_version,
+            post.likes_count + pending.get(post.pk, 0),
+            post.liked_by_user,
+            post.group.card_version if post.group_id else None,
+        ]
+        for post in posts
+    ]
+
+
+def _page_digest(request, page, author=None):
+    return _digest(request, [
+        page.has_next(), page.has_previous(), _rows(page), author
+    ])
+
+
+def _author(values, following):
+    return [str(value) for value in values] + [following]
+
+
+def _path_value(obj, path):
+    for name in path.split('__'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _versioned(queryset, user):
+    return queryset.select_related('group').annotate(
+        liked_by_user=Exists(
+            Like.objects.filter(post=OuterRef('pk'), user_id=user.pk)
+        ),
+    ).only(
+        'pub_date', 'card_version', 'likes_count', 'group__card_version'
+    )
+
+
+def page_etag(request, queryset, per_page, first_page_key=None,
+              with_author=False):
+    """
+    Сверяет страницу ленты одним запросом; возвращает ETag или None.
+
+    Страница выбирается так же, как в posts.utils.paginate. Если
+    with_author, к постам аннотациями добавляются карточка автора
+    и подписка читателя на него.
+    """
+    if 'page' in request.GET and 'cursor' not in request.GET:
+        return None
+    queryset = _versioned(queryset, request.user)
+    if with_author:
+        queryset = queryset.annotate(
+            etag_following=Exists(Follow.objects.filter(
+                user_id=request.user.pk, author=OuterRef('author')
+            )),
+            **{
+                f'etag_author_{index}': F(f'author__{path}')
+                for index, path in enumerate(AUTHOR_FIELDS)
+            }
+        )
+    paginator = CursorPaginator(queryset, per_page, first_page_key)
+    page = paginator.get_page(request.GET.get('cursor'))
+    if not page.object_list:
+        return None
+    author = None
+    if with_author:
+        first = page[0]
+        author = _author(
+            (
+                getattr(first, f'etag_author_{index}')
+                for index in range(len(AUTHOR_FIELDS))
+            ),
+            first.etag_following,
+        )
+    return _page_digest(request, page, author)
+
+
+def post_etag(request, queryset):
+    """Сверяет страницу поста одним запросом; возвращает ETag или None."""
+    post = _versioned(queryset, request.user).first()
+    if post is None:
+        return None
+    return _digest(request, _rows([post]))
+
+
+def tag_page(response, request, page, author=None, following=None):
+    """Ставит ETag ответу ленты по постам, загруженным для рендера."""
+    if getattr(page, 'is_cursor', False) and page.object_list:
+        if author is not None:
+            author = _author(
+                (_path_value(author, path) for path in AUTHOR_FIELDS),
+                following,
+            )
+        response['ETag'] = quote_etag(_page_digest(request, page, author))
+    return response
+
+
+def tag_post(response, request, post):
+    """Ставит ETag ответу страницы поста."""
+    response['ETag'] = quote_etag(_digest(request, _rows([post])))
+    return response
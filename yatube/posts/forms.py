@@ -1,6 +1,8 @@
 from django import forms
 
-from .models import Post, Comment
+from core.images import normalize_image
+
+from .models import Group, Post, Comment
 
 
 class PostForm(forms.ModelForm):
@@ -18,6 +20,9 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост'
         }
 
+    def clean_image(self):
+        return normalize_image(self.cleaned_data['image'])
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -29,3 +34,15 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             'text': 'Текст нового комментария',
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        label='Группа',
+        empty_label='Все группы',
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
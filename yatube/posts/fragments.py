@@ -0,0 +1,72 @@
+"""
+Кэш отрендеренных карточек постов.
+
+Карточка (картинка, текст, группа, ссылка на комментарии) одинакова для
+всех читателей и кэшируется по ключу из id поста и версий поста и группы.
+Версию поста поднимают правка и новый комментарий, версию группы —
+переименование. Кнопки лайка и редактирования зависят от читателя и
+подставляются в готовую карточку на каждый запрос.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+from . import likebuffer
+
+ACTIONS_SLOT = '<!--post-actions-->'
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def card_cache_stats():
+    """Попадания и промахи кэша карточек в этом процессе."""
+    with _lock:
+        return dict(_stats)
+
+
+def _record(hits, misses):
+    with _lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+    metrics.record_cache('card', hits, misses)
+
+
+def card_key(post):
+    group_version = post.group.card_version if post.group_id else 0
+    # pub_date страхует от повторно выданного id удалённого поста.
+    return 'post_card:{}:{}:{}:{}:{}'.format(
+        post.pk,
+        int(post.pub_date.timestamp() * 1000000),
+        post.card_version,
+        post.group_id,
+        group_version,
+    )
+
+
+def render_cards(posts, user):
+    """Рендерит карточки постов, беря общую часть из кэша."""
+    posts = list(posts)
+    likebuffer.merge(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    rendered = {}
+    parts = []
+    for post, key in zip(posts, keys):
+        body = cached.get(key)
+        if body is None:
+            body = render_to_string('includes/post_item.html', {'post': post})
+            rendered[key] = body
+        actions = render_to_string(
+            'includes/post_actions.html', {'post': post, 'user': user}
+        )
+        parts.append(body.replace(ACTIONS_SLOT, actions))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    _record(hits=len(posts) - len(rendered), misses=len(rendered))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,160 @@
+"""
+Отложенная запись счётчика лайков (write-behind).
+
+На популярный пост лайки идут потоком, и каждый UPDATE likes_count
+ждёт одну и ту же строку, а в SQLite — единственного писателя. Поэтому
+строка Like вставляется сразу, а приращение счётчика копится в памяти
+процесса и раз в LIKE_FLUSH_INTERVAL секунд уходит в базу одним UPDATE
+на пачку постов. Чтобы другие процессы показывали актуальное число,
+та же сумма ведётся в кэше: при чтении к likes_count из базы
+прибавляется ещё не записанное приращение.
+
+Накопленное записывается и при штатной остановке процесса (atexit).
+Если процесс убит, счётчик поправит rebuild_counters.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .counters import change_post_counter, change_post_counters
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'likes_pending:{}'
+# Кэш лишь подсказывает читателям: источник правды — _pending процесса.
+PENDING_TIMEOUT = 60 * 60
+# Параметров на UPDATE меньше 999, это предел старых SQLite.
+FLUSH_CHUNK = 300
+
+_pending = {}
+_lock = threading.Lock()
+_flusher = None
+
+
+def flush_interval():
+    """Период записи в секундах; 0 — писать счётчик сразу (в тестах)."""
+    return getattr(settings, 'LIKE_FLUSH_INTERVAL', 2)
+
+
+def _key(post_id):
+    return PENDING_KEY.format(post_id)
+
+
+def _shift_cached(post_id, delta, create=True):
+    """
+    Сдвигает сумму в кэше; без create трогает только уже лежащий ключ.
+
+    Записанное в базу снимается без create: если ключ вытеснили,
+    новый со снятой суммой вычел бы её из базы второй раз.
+    """
+    key = _key(post_id)
+    if create:
+        cache.add(key, 0, PENDING_TIMEOUT)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Ключ успели вытеснить: читатели недолго увидят старое число.
+        pass
+
+
+def add(post_id, delta):
+    """Копит приращение счётчика поста до следующей записи."""
+    if not delta:
+        return
+    with _lock:
+        _pending[post_id] = _pending.get(post_id, 0) + delta
+    _shift_cached(post_id, delta)
+
+
+def record(post_id, delta):
+    """
+    Учитывает лайк или его отмену.
+
+    Приращение копится только после фиксации транзакции, в которой
+    вставлена или удалена строка Like, иначе откат оставил бы его висеть.
+    """
+    if not flush_interval():
+        change_post_counter(post_id, 'likes_count', delta)
+        return
+
+    def buffer():
+        add(post_id, delta)
+        _start_flusher()
+
+    transaction.on_commit(buffer)
+
+
+def flush():
+    """Записывает накопленные приращения; возвращает число постов."""
+    with _lock:
+        pending = {pk: delta for pk, delta in _pending.items() if delta}
+        _pending.clear()
+    items = list(pending.items())
+    for start in range(0, len(items), FLUSH_CHUNK):
+        chunk = dict(items[start:start + FLUSH_CHUNK])
+        try:
+            change_post_counters('likes_count', chunk)
+        except Exception:
+            # Вернём непросохшее назад: попробуем в следующий раз.
+            with _lock:
+                for pk, delta in items[start:]:
+                    _pending[pk] = _pending.get(pk, 0) + delta
+            raise
+        for pk, delta in chunk.items():
+            _shift_cached(pk, -delta, create=False)
+    return len(items)
+
+
+def pending(post_ids):
+    """Ещё не записанные приращения {post_id: delta} всех процессов."""
+    post_ids = list(post_ids)
+    if not flush_interval() or not post_ids:
+        return {}
+    cached = cache.get_many([_key(pk) for pk in post_ids])
+    return {
+        pk: cached[_key(pk)] for pk in post_ids
+        if cached.get(_key(pk))
+    }
+
+
+def merge(posts):
+    """Прибавляет к like_count постов ещё не записанные лайки."""
+    posts = [post for post in posts if hasattr(post, 'like_count')]
+    deltas = pending(post.pk for post in posts)
+    for post in posts:
+        post.like_count = max(0, post.like_count + deltas.get(post.pk, 0))
+
+
+def _run(stop):
+    while not stop.wait(flush_interval()):
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать счётчики лайков')
+        finally:
+            close_old_connections()
+
+
+def _shutdown(stop):
+    stop.set()
+    try:
+        flush()
+    except Exception:
+        logger.exception('Счётчики лайков не записаны при остановке')
+
+
+def _start_flusher():
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        stop = threading.Event()
+        _flusher = threading.Thread(
+            target=_run, args=(stop,), name='like-flusher', daemon=True
+        )
+        _flusher.start()
+    atexit.register(_shutdown, stop)
@@ -0,0 +1,237 @@
+"""
+Нагрузочный прогон WSGI-приложения в том же процессе.
+
+Несколько потоков выбирают сценарий по весам (лента, группа, подписки,
+профиль, пост, лайк, а для замеров записи — новый пост и комментарий),
+собирают WSGI environ с сессионной кукой одного из читателей и вызывают
+приложение напрямую, без сокета и HTTP-сервера.
+Так в замер попадают все middleware, вьюхи, шаблоны и база, а сеть
+и сервер приложений — нет. Данные для запросов берутся из базы, обычно
+наполненной командой seed_yatube.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from users.models import UserProfile
+
+from .models import Group, Post
+
+User = get_user_model()
+
+# Сценарий -> вес в смеси запросов.
+DEFAULT_MIX = {
+    'posts': 30,
+    'group': 10,
+    'follow_index': 15,
+    'profile': 15,
+    'post': 20,
+    'like': 10,
+}
+# Смесь для замеров записи: POST на new_post и add_comment.
+WRITE_MIX = {
+    'new_post': 1,
+    'add_comment': 3,
+}
+SCENARIOS = {*DEFAULT_MIX, *WRITE_MIX}
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def parse_mix(text):
+    """Смесь из строки вида «posts=30,like=10»."""
+    mix = {}
+    for item in filter(None, text.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+def _session_cookie(user):
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+class LoadGenerator:
+    def __init__(self, application, readers=50, mix=None, rng_seed=0):
+        self.application = application
+        self.mix = mix or DEFAULT_MIX
+        self.rng_seed = rng_seed
+        rng = random.Random(rng_seed)
+
+        # Читатели с подписками, чтобы /follow/ не был пустым.
+        reader_ids = list(
+            UserProfile.objects.order_by('-following_count')
+            .values_list('user_id', flat=True)[:readers]
+        )
+        self.cookies = [
+            _session_cookie(user)
+            for user in User.objects.filter(pk__in=reader_ids)
+        ]
+        self.authors = list(
+            UserProfile.objects.filter(posts_count__gt=0)
+            .order_by('-posts_count')
+            .values_list('user__username', flat=True)[:SAMPLE_SIZE]
+        )
+        self.posts = list(
+            Post.objects.filter(is_valid=True)
+            .values_list('author__username', 'pk')[:SAMPLE_SIZE]
+        )
+        self.groups = list(
+            Group.objects.values_list('slug', flat=True)[:SAMPLE_SIZE]
+        )
+        if not (self.cookies and self.posts):
+            raise ValueError('В базе нет пользователей или постов')
+        rng.shuffle(self.posts)
+        # Одна и та же строка в куке и заголовке проходит проверку CSRF.
+        self.csrf_token = get_random_string(64)
+
+    def _path(self, scenario, rng):
+        """Адрес запроса сценария и данные формы (None — это GET)."""
+        if scenario == 'posts':
+            return reverse('posts'), None
+        if scenario == 'group' and self.groups:
+            return reverse('group', args=(rng.choice(self.groups),)), None
+        if scenario == 'follow_index':
+            return reverse('follow_index'), None
+        if scenario == 'profile' and self.authors:
+            return reverse('profile', args=(rng.choice(self.authors),)), None
+        if scenario == 'new_post':
+            return reverse('new_post'), {
+                'text': f'Нагрузочный пост {rng.getrandbits(32)}'
+            }
+        username, post_id = rng.choice(self.posts)
+        if scenario == 'like':
+            name = 'post_like' if rng.random() < 0.5 else 'post_unlike'
+            return reverse(name, args=(post_id,)), None
+        if scenario == 'add_comment':
+            return reverse('add_comment', args=(username, post_id)), {
+                'text': f'Нагрузочный комментарий {rng.getrandbits(32)}'
+            }
+        return reverse('post', args=(username, post_id)), None
+
+    def request(self, path, cookie, data=None):
+        """Вызывает приложение; с data шлёт POST формы. Возвращает код."""
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': 'GET' if data is None else 'POST',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'HTTP_COOKIE': (
+                f'{cookie}; {settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+            ),
+            'HTTP_X_CSRFTOKEN': self.csrf_token,
+            'HTTP_REFERER': 'http://testserver/posts',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(line, headers, exc_info=None):
+            status.append(int(line.split(' ', 1)[0]))
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return status[0]
+
+    def run(self, requests=1000, concurrency=8, duration=None):
+        """
+        Выполняет requests запросов (или гоняет нагрузку duration секунд)
+        в concurrency потоков и возвращает сводку по сценариям.
+        """
+        scenarios = list(self.mix)
+        weights = [self.mix[name] for name in scenarios]
+        results = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        issued = 0
+        deadline = duration and time.perf_counter() + duration
+
+        def worker(number):
+            nonlocal issued
+            rng = random.Random(self.rng_seed * 1000 + number)
+            while True:
+                with lock:
+                    if deadline:
+                        if time.perf_counter() >= deadline:
+                            return
+                    elif issued >= requests:
+                        return
+                    issued += 1
+                scenario = rng.choices(scenarios, weights)[0]
+                path, data = self._path(scenario, rng)
+                started = time.perf_counter()
+                try:
+                    status = self.request(
+                        path, rng.choice(self.cookies), data
+                    )
+                except Exception:
+                    status = 500
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results[scenario].append(elapsed)
+                    if status >= 400:
+                        errors[scenario] += 1
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        report = {
+            name: self._summary(latencies, errors[name])
+            for name, latencies in sorted(results.items())
+        }
+        everything = [value for values in results.values() for value in values]
+        report['total'] = self._summary(everything, sum(errors.values()))
+        report['total']['rps'] = round(len(everything) / wall, 1)
+        return report
+
+    @staticmethod
+    def _summary(latencies, errors):
+        if not latencies:
+            return {'requests': 0, 'errors': errors}
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
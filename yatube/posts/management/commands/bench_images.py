@@ -0,0 +1,88 @@
+import os
+import time
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from core.images import normalize_image
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def _camera_photo(seed, size):
+    """Снимок «как с камеры»: шум поверх градиента, качество 95 и EXIF."""
+    noise = Image.effect_noise(size, 40 + seed % 30).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    image = Image.blend(noise, gradient, 0.6)
+    exif = Image.Exif()
+    exif[0x0110] = f'Bench camera {seed}'
+    exif[0x0112] = 1
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif)
+    return f'photo_{seed}.jpg', buffer.getvalue()
+
+
+def _decode_time(content, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with Image.open(BytesIO(content)) as image:
+            image.load()
+    return (time.perf_counter() - started) / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время декодирования картинок до и после '
+        'нормализации при загрузке'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Папка с картинками; без неё генерируются снимки 4000x3000',
+        )
+        parser.add_argument('--count', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def corpus(self, options):
+        if options['path']:
+            for name in sorted(os.listdir(options['path'])):
+                if name.lower().endswith(EXTENSIONS):
+                    path = os.path.join(options['path'], name)
+                    with open(path, 'rb') as image_file:
+                        yield name, image_file.read()
+            return
+        for seed in range(options['count']):
+            yield _camera_photo(seed, (4000, 3000))
+
+    def handle(self, *args, **options):
+        total_before = total_after = 0
+        decode_before = decode_after = 0.0
+        for name, content in self.corpus(options):
+            upload = SimpleUploadedFile(name, content)
+            normalized = normalize_image(upload)
+            normalized.seek(0)
+            result = normalized.read()
+
+            before = _decode_time(content, options['repeat'])
+            after = _decode_time(result, options['repeat'])
+            total_before += len(content)
+            total_after += len(result)
+            decode_before += before
+            decode_after += after
+            self.stdout.write(
+                f'{name}: {len(content) // 1024} -> {len(result) // 1024} КБ, '
+                f'декодирование {before * 1000:.1f} -> {after * 1000:.1f} мс'
+            )
+
+        if not total_before:
+            self.stdout.write(self.style.WARNING('Картинок не найдено'))
+            return
+        saved = 100 * (1 - total_after / total_before)
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {total_before // 1024} -> {total_after // 1024} КБ '
+            f'(-{saved:.0f}%), декодирование {decode_before * 1000:.1f} -> '
+            f'{decode_after * 1000:.1f} мс'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import BATCH_SIZE, FORMATS, export_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, пользователей, посты, комментарии, подписки '
+        'и лайки в каталог, по файлу на таблицу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов выгрузки')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='ndjson',
+            help='Формат файлов',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        counts = export_data(
+            options['directory'], options['format'], options['batch_size']
+        )
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count}')
+        self.stdout.write(self.style.SUCCESS('Выгрузка готова'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import BATCH_SIZE, FORMATS, import_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_data и пересобирает счётчики, ленты '
+        'и поисковый индекс'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами выгрузки')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='ndjson',
+            help='Формат файлов',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк вставлять одной пачкой',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = import_data(
+            options['directory'], options['format'], options['batch_size']
+        )
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка готова за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from posts.loadgen import DEFAULT_MIX, LoadGenerator, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет смесь запросов к WSGI-приложению в этом процессе '
+        'и печатает пропускную способность и перцентили задержки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Сколько запросов выполнить',
+        )
+        parser.add_argument(
+            '--duration', type=float,
+            help='Сколько секунд гонять нагрузку (вместо --requests)',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Сколько потоков шлют запросы одновременно',
+        )
+        parser.add_argument(
+            '--readers', type=int, default=50,
+            help='От скольких пользователей идут запросы',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help=(
+                'Веса сценариев, например «posts=30,like=10»; запись — '
+                '«new_post=1,add_comment=3»'
+            ),
+        )
+        parser.add_argument('--seed', type=int, default=0, dest='rng_seed')
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Напечатать сводку одной строкой JSON',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            generator = LoadGenerator(
+                get_wsgi_application(),
+                readers=options['readers'],
+                mix=parse_mix(options['mix']),
+                rng_seed=options['rng_seed'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        report = generator.run(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        for name, summary in report.items():
+            self.stdout.write(f'{name}: ' + ', '.join(
+                f'{key}={value}' for key, value in summary.items()
+            ))
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.thumbnails import pending_images
+
+
+def _run(task):
+    job, *args = task
+    try:
+        job(*args)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры картинок, для которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько картинок резать параллельно',
+        )
+
+    def handle(self, *args, **options):
+        tasks = list(pending_images())
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                list(executor.map(_run, tasks))
+        else:
+            for job, *job_args in tasks:
+                job(*job_args)
+        self.stdout.write(
+            self.style.SUCCESS(f'Нарезано картинок: {len(tasks)}')
+        )
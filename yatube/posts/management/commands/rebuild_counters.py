@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и профилей и сообщает о расхождениях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = rebuild_counters(dry_run=options['dry_run'])
+
+        for model, pk, field, stored, actual in drift:
+            self.stdout.write(
+                f'{model} #{pk}: {field} {stored} -> {actual}'
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'Найдено расхождений: {len(drift)}')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}')
+            )
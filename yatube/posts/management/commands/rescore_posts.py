@@ -0,0 +1,88 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.moderation import (
+    CHUNK_SIZE, pending_posts, save_scores, score_texts
+)
+from posts.models import Post
+
+
+def _batches(queryset, batch_size):
+    ids, texts = [], []
+    for pk, text in queryset.values_list('pk', 'text').iterator():
+        ids.append(pk)
+        texts.append(text)
+        if len(ids) == batch_size:
+            yield ids, texts
+            ids, texts = [], []
+    if ids:
+        yield ids, texts
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново оценивает посты классификатором и публикует безопасные '
+        'из очереди модерации'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько процессов оценивают тексты параллельно',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько постов оценивается за раз',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help=(
+                'Оценить все неотклонённые посты, кроме опубликованных '
+                'модератором, а не только очередь'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            # Решения модератора классификатор не пересматривает.
+            posts = Post.objects.filter(
+                is_rejected=False, approved_by_moderator=False
+            ).order_by('pk')
+        else:
+            posts = pending_posts()
+        # Тексты читаются заранее: итератор курсора не переживёт записи
+        # оценок в SQLite.
+        batches = list(_batches(posts, options['batch_size']))
+
+        scored = approved = 0
+        if options['workers'] > 1:
+            # Дочерним процессам не должно достаться открытое соединение.
+            connections.close_all()
+            # fork, а не spawn или forkserver (по умолчанию на macOS
+            # и в новых Python): дочерний процесс получает настроенный
+            # Django и классификатор без повторного django.setup().
+            with ProcessPoolExecutor(
+                options['workers'],
+                mp_context=multiprocessing.get_context('fork')
+            ) as executor:
+                results = executor.map(
+                    score_texts, (texts for _, texts in batches)
+                )
+                for (ids, _), risks in zip(batches, results):
+                    approved += save_scores(dict(zip(ids, risks)))
+                    scored += len(ids)
+        else:
+            for ids, texts in batches:
+                approved += save_scores(dict(zip(ids, score_texts(texts))))
+                scored += len(ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Оценено постов: {scored}, опубликовано: {approved}'
+        ))
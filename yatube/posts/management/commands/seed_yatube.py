@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import BATCH_SIZE, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу пользователями, группами, подписками, постами, '
+        'лайками и комментариями для нагрузочных прогонов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument('--likes', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней назад разнести посты',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности авторов',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Начало имён пользователей и slug групп',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, dest='rng_seed',
+            help='Зерно генератора случайных чисел',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows=options['follows'],
+            likes=options['likes'],
+            comments=options['comments'],
+            days=options['days'],
+            alpha=options['alpha'],
+            prefix=options['prefix'],
+            rng_seed=options['rng_seed'],
+            batch_size=options['batch_size'],
+        )
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'База наполнена за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.6 on 2026-10-17 23:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Like = apps.get_model('posts', 'Like')
+    Follow = apps.get_model('posts', 'Follow')
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('users', 'UserProfile')
+
+    UserProfile.objects.bulk_create(
+        UserProfile(user=user)
+        for user in User.objects.filter(profile__isnull=True)
+    )
+    Post.objects.update(
+        comments_count=count(Comment.objects.all(), 'post'),
+        likes_count=count(Like.objects.all(), 'post'),
+    )
+    UserProfile.objects.update(
+        followers_count=count(Follow.objects.all(), 'author', 'user_id'),
+        following_count=count(Follow.objects.all(), 'user', 'user_id'),
+        posts_count=count(
+            Post.objects.filter(is_valid=True), 'author', 'user_id'
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_auto_20230321_1351'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
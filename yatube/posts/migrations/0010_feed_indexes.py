@@ -0,0 +1,59 @@
+# Generated by Django 2.2.6 on 2026-10-17 23:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+
+    # Первый лайк каждой пары выбирается подзапросом, а не списком id
+    # в памяти: на большой таблице список не влезет в запрос.
+    keep = Like.objects.order_by().values('post', 'user').annotate(
+        first=Min('id')
+    ).values('first')
+    duplicates = Like.objects.exclude(id__in=keep)
+    if not duplicates.exists():
+        return
+    duplicates.delete()
+    # Дубли раздували счётчик лайков, пересчитываем его.
+    Post.objects.update(likes_count=Coalesce(
+        Subquery(
+            Like.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_ordering_tiebreak'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_valid', 'pub_date', 'id'], name='post_valid_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'is_valid', 'pub_date', 'id'], name='post_author_valid_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'is_valid', 'pub_date', 'id'], name='post_group_valid_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_post_user_like'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2026-10-18 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_searchposting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_rejected',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_valid', 'is_rejected', 'pub_date', 'id'], name='post_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_is_rejected'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='moderation_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+def mark_manual_approvals(apps, schema_editor):
+    # Посты без оценки классификатора опубликованы до автоматической
+    # премодерации, то есть модератором.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.filter(
+        is_valid=True, moderation_score__isnull=True
+    ).update(approved_by_moderator=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_thread_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='approved_by_moderator',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_manual_approvals, migrations.RunPython.noop),
+    ]
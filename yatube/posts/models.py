@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Value
 
 User = get_user_model()
 
@@ -8,11 +9,28 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Меняется при переименовании: входит в ключ кэша карточек постов.
+    card_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_likes(self, user):
+        """Добавляет к каждому посту число лайков и отметку лайка юзера."""
+        if user.is_authenticated:
+            liked_by_user = Exists(
+                Like.objects.filter(post=OuterRef('pk'), user=user)
+            )
+        else:
+            liked_by_user = Value(False, output_field=models.BooleanField())
+        return self.select_related('author', 'group').annotate(
+            like_count=F('likes_count'),
+            liked_by_user=liked_by_user,
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -33,9 +51,49 @@ class Post(models.Model):
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
     is_valid = models.BooleanField(default=False)
+    # Отклонённый модератором пост уходит из очереди модерации.
+    is_rejected = models.BooleanField(default=False)
+    # Пост опубликовал модератор, а не автоматическая премодерация:
+    # повторная оценка классификатором его не снимает.
+    approved_by_moderator = models.BooleanField(
+        default=False, editable=False
+    )
+    # Риск по оценке классификатора, см. posts.classifiers.
+    moderation_score = models.FloatField(
+        blank=True, null=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    # Версия закэшированной карточки поста, см. posts.fragments.
+    card_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Ленты выбирают опубликованные посты от новых к старым: целиком,
+        # по автору и по группе. Обратный проход такого индекса даёт ровно
+        # ORDER BY pub_date DESC, id DESC без отдельной сортировки.
+        indexes = [
+            models.Index(
+                fields=['is_valid', 'pub_date', 'id'],
+                name='post_valid_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'is_valid', 'pub_date', 'id'],
+                name='post_author_valid_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'is_valid', 'pub_date', 'id'],
+                name='post_group_valid_date_idx'
+            ),
+            # Очередь модерации листается от старых постов к новым,
+            # отклонённые посты в ней не попадаются.
+            models.Index(
+                fields=['is_valid', 'is_rejected', 'pub_date', 'id'],
+                name='post_pending_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -55,6 +113,16 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Ветка комментариев листается курсором по (created, id) внутри
+        # поста: страница — короткий проход индекса, сколько бы
+        # комментариев ни было.
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'], name='comment_thread_idx'
+            )
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -75,6 +143,7 @@ class Follow(models.Model):
             )
         ]
 
+
 class Like(models.Model):
     user = models.ForeignKey(
         User,
@@ -87,3 +156,67 @@ class Like(models.Model):
         related_name='likes'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'user'], name='unique_post_user_like'
+            )
+        ]
+
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, разложенный при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_user_post_timeline'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class SearchPosting(models.Model):
+    """Запись инвертированного индекса: основа слова встречается в посте."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_postings'
+    )
+    weight = models.PositiveIntegerField(default=1)
+    # Копия Post.is_valid: выдача сайта отбирает опубликованные посты,
+    # не выходя из индекса терминов.
+    published = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='unique_term_post_posting'
+            )
+        ]
@@ -0,0 +1,267 @@
+"""
+Очередь модерации и массовые решения по ней.
+
+Одобрение и отклонение идут пачками по CHUNK_SIZE постов: на пачку один
+UPDATE постов, один UPDATE счётчиков авторов, один INSERT ... SELECT
+в ленты подписчиков и один UPDATE поискового индекса, вместо save()
+и сигналов на каждый пост.
+
+Новые и отредактированные посты сначала оценивает классификатор
+(posts.classifiers) в фоновом пуле потоков: вьюха только кладёт id
+в очередь, а поток забирает накопившиеся id пачкой. Посты с риском ниже
+MODERATION_AUTO_APPROVE публикуются сразу, остальные ждут модератора;
+пост, опубликованный классификатором и ставший рискованным после
+правки, снимается с публикации и тоже возвращается в очередь. Посты,
+опубликованные модератором, повторная оценка не снимает.
+"""
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from core.caching import bump_generation
+
+from . import timeline
+from .classifiers import get_classifier
+from .counters import change_profile_counters
+from .models import Post, SearchPosting
+
+logger = logging.getLogger(__name__)
+
+# Не больше 999 параметров на запрос в SQLite.
+CHUNK_SIZE = 500
+
+_queue = []
+_queue_lock = threading.Lock()
+_drainers = 0
+_executor = None
+
+
+def pending_posts():
+    """Непроверенные посты от старых к новым, по индексу post_pending_idx."""
+    return Post.objects.filter(
+        is_valid=False, is_rejected=False
+    ).order_by('pub_date', 'id')
+
+
+def _chunks(ids):
+    ids = sorted(set(int(pk) for pk in ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _author_deltas(rows, delta):
+    return {
+        author_id: count * delta
+        for author_id, count in Counter(
+            author_id for _, author_id in rows
+        ).items()
+    }
+
+
+def approve(post_ids, by_moderator=True):
+    """
+    Публикует посты; возвращает число постов, которые опубликованы.
+
+    by_moderator=False — решение классификатора: такие посты снова
+    снимаются с публикации, если правка сделала их рискованными.
+    """
+    approved = 0
+    for chunk in _chunks(post_ids):
+        with transaction.atomic():
+            rows = list(
+                Post.objects.filter(pk__in=chunk, is_valid=False)
+                .values_list('pk', 'author_id')
+            )
+            if not rows:
+                continue
+            ids = [pk for pk, _ in rows]
+            Post.objects.filter(pk__in=ids).update(
+                is_valid=True, is_rejected=False,
+                approved_by_moderator=by_moderator
+            )
+            change_profile_counters('posts_count', _author_deltas(rows, 1))
+            timeline.fan_out_many(ids)
+            SearchPosting.objects.filter(post_id__in=ids).update(
+                published=True
+            )
+        approved += len(rows)
+    if approved:
+        bump_generation('feed')
+    return approved
+
+
+def reject(post_ids):
+    """
+    Отклоняет посты; возвращает число отклонённых.
+
+    Уже опубликованные посты снимаются с публикации: уходят из лент,
+    из поиска и из счётчиков авторов.
+    """
+    rejected = unpublished = 0
+    for chunk in _chunks(post_ids):
+        with transaction.atomic():
+            rows = list(
+                Post.objects.filter(pk__in=chunk)
+                .exclude(is_valid=False, is_rejected=True)
+                .values_list('pk', 'author_id', 'is_valid')
+            )
+            if not rows:
+                continue
+            Post.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+                is_valid=False, is_rejected=True
+            )
+            valid = [
+                (pk, author_id) for pk, author_id, is_valid in rows
+                if is_valid
+            ]
+            if valid:
+                _retract(valid)
+        rejected += len(rows)
+        unpublished += len(valid)
+    if unpublished:
+        bump_generation('feed')
+    return rejected
+
+
+def unpublish(post_ids):
+    """
+    Возвращает в очередь модерации посты, опубликованные классификатором.
+
+    В отличие от reject пост не отклоняется, а снова ждёт модератора.
+    Посты, опубликованные модератором, остаются как есть. Возвращает
+    число снятых с публикации постов.
+    """
+    unpublished = 0
+    for chunk in _chunks(post_ids):
+        with transaction.atomic():
+            rows = list(
+                Post.objects.filter(
+                    pk__in=chunk, is_valid=True, approved_by_moderator=False
+                )
+                .values_list('pk', 'author_id')
+            )
+            if not rows:
+                continue
+            Post.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                is_valid=False
+            )
+            _retract(rows)
+        unpublished += len(rows)
+    if unpublished:
+        bump_generation('feed')
+    return unpublished
+
+
+def _retract(rows):
+    """Убирает посты [(id, автор)] из лент, поиска и счётчиков авторов."""
+    ids = [pk for pk, _ in rows]
+    change_profile_counters('posts_count', _author_deltas(rows, -1))
+    timeline.retract_many(ids)
+    SearchPosting.objects.filter(post_id__in=ids).update(published=False)
+
+
+def workers():
+    """Сколько потоков оценивают посты; 0 — оценивать сразу в запросе."""
+    return getattr(settings, 'MODERATION_WORKERS', 1)
+
+
+def auto_approve_below():
+    return getattr(settings, 'MODERATION_AUTO_APPROVE', 0.3)
+
+
+def score_texts(texts):
+    return get_classifier().score_many(texts)
+
+
+def save_scores(scores):
+    """
+    Записывает оценки {post_id: риск} и публикует безопасные посты.
+
+    Посты, опубликованные классификатором, с риском не ниже порога
+    возвращаются в очередь.
+    Возвращает число опубликованных постов.
+    """
+    Post.objects.bulk_update(
+        [
+            Post(pk=post_id, moderation_score=risk)
+            for post_id, risk in scores.items()
+        ],
+        ['moderation_score'],
+        batch_size=CHUNK_SIZE
+    )
+    threshold = auto_approve_below()
+    unpublish(
+        post_id for post_id, risk in scores.items() if risk >= threshold
+    )
+    return approve(
+        (post_id for post_id, risk in scores.items() if risk < threshold),
+        by_moderator=False
+    )
+
+
+def score(post_ids):
+    """Оценивает посты и публикует безопасные; отклонённые пропускаются."""
+    approved = 0
+    for chunk in _chunks(post_ids):
+        rows = list(
+            Post.objects.filter(pk__in=chunk, is_rejected=False)
+            .values_list('pk', 'text')
+        )
+        if rows:
+            risks = score_texts([text for _, text in rows])
+            approved += save_scores(dict(zip(
+                (pk for pk, _ in rows), risks
+            )))
+    return approved
+
+
+def _get_executor():
+    global _executor
+    with _queue_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='moderation'
+            )
+        return _executor
+
+
+def _drain():
+    global _drainers
+    try:
+        while True:
+            with _queue_lock:
+                batch = _queue[:CHUNK_SIZE]
+                del _queue[:CHUNK_SIZE]
+                if not batch:
+                    _drainers -= 1
+                    return
+            try:
+                score(batch)
+            except Exception:
+                logger.exception('Не удалось оценить посты %s', batch)
+    finally:
+        close_old_connections()
+
+
+def _push(post_id):
+    global _drainers
+    with _queue_lock:
+        _queue.append(post_id)
+        # Пока поток занят пачкой, новые id копятся к следующей.
+        if _drainers >= workers():
+            return
+        _drainers += 1
+    _get_executor().submit(_drain)
+
+
+def enqueue_score(post):
+    """Ставит пост на автоматическую оценку."""
+    if not workers():
+        score([post.pk])
+        return
+    # Поток не увидит строку, пока транзакция запроса не зафиксирована.
+    transaction.on_commit(lambda: _push(post.pk))
@@ -0,0 +1,273 @@
+"""
+Полнотекстовый поиск по постам на инвертированном индексе.
+
+Текст поста и его комментариев разбивается на слова, слова сводятся
+к основам русским стеммером, и для каждой основы хранится SearchPosting
+с весом (слово из текста поста весит больше слова из комментария).
+Запрос читает только записи своих терминов по индексу (term, post),
+поэтому его стоимость зависит от числа совпадений, а не от размера
+таблицы постов. Термины запроса объединяются через И: и на сайте,
+и в админке находятся только посты, где встретились все слова.
+
+Новый комментарий и правка поста не пересобирают записи поста целиком,
+а сдвигают веса только своих терминов (shift_terms): стоимость не
+зависит от числа комментариев под постом.
+"""
+import math
+import re
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Greatest
+
+from core.stemmer import stem
+
+from .models import Comment, Post, SearchPosting
+
+TEXT_WEIGHT = 3
+COMMENT_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 500
+# Частота термина нужна для ранжирования и меняется медленно.
+DF_CACHE_TIMEOUT = 600
+
+WORD = re.compile(r'\w+')
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'вы', 'да', 'для', 'до',
+    'его', 'ее', 'ей', 'если', 'же', 'за', 'и', 'из', 'или', 'им', 'их',
+    'к', 'как', 'ко', 'ли', 'мне', 'мы', 'на', 'над', 'не', 'нет', 'ни',
+    'но', 'о', 'об', 'он', 'она', 'они', 'оно', 'от', 'по', 'под', 'при',
+    'с', 'со', 'так', 'то', 'ты', 'у', 'уже', 'что', 'это', 'я',
+))
+
+
+def terms(text):
+    """Основы значимых слов текста в порядке появления."""
+    result = []
+    for word in WORD.findall(text.lower().replace('ё', 'е')):
+        if word in STOP_WORDS or word.isdigit() and len(word) < 2:
+            continue
+        result.append(stem(word)[:MAX_TERM_LENGTH])
+    return result
+
+
+def text_weights(text, weight):
+    """Веса терминов одного текста: weight за каждое вхождение."""
+    weights = Counter()
+    for term in terms(text):
+        weights[term] += weight
+    return weights
+
+
+def term_weights(text, comments=()):
+    weights = text_weights(text, TEXT_WEIGHT)
+    for comment in comments:
+        weights.update(text_weights(comment, COMMENT_WEIGHT))
+    return weights
+
+
+def shift_terms(post_id, deltas):
+    """
+    Прибавляет к записям индекса поста веса {термин: приращение}.
+
+    Недостающие записи сначала вставляются с нулевым весом, затем одним
+    UPDATE сдвигаются все веса, и записи с нулевым весом удаляются.
+    Так параллельные комментарии не теряют веса друг друга.
+    """
+    deltas = {term: delta for term, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    added = [term for term, delta in deltas.items() if delta > 0]
+    with transaction.atomic():
+        if added:
+            published = Post.objects.filter(
+                pk=post_id, is_valid=True
+            ).exists()
+            SearchPosting.objects.bulk_create(
+                (
+                    SearchPosting(
+                        term=term, post_id=post_id, weight=0,
+                        published=published
+                    )
+                    for term in added
+                ),
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True
+            )
+        postings = SearchPosting.objects.filter(
+            post_id=post_id, term__in=deltas
+        )
+        postings.update(weight=Greatest(
+            F('weight') + Case(
+                *(
+                    When(term=term, then=Value(delta))
+                    for term, delta in deltas.items()
+                ),
+                output_field=IntegerField(),
+            ),
+            Value(0)
+        ))
+        if len(added) < len(deltas):
+            postings.filter(weight=0).delete()
+
+
+def index_text_change(post_id, old_text, new_text):
+    """Переносит в индекс правку текста поста."""
+    deltas = text_weights(new_text, TEXT_WEIGHT)
+    deltas.subtract(text_weights(old_text, TEXT_WEIGHT))
+    shift_terms(post_id, deltas)
+
+
+def index_comment(post_id, text, sign=1):
+    """Добавляет в индекс слова комментария (sign=-1 — убирает)."""
+    shift_terms(post_id, {
+        term: sign * weight
+        for term, weight in text_weights(text, COMMENT_WEIGHT).items()
+    })
+
+
+def _postings(post_id, text, is_valid, comments):
+    return [
+        SearchPosting(
+            term=term, post_id=post_id, weight=weight, published=is_valid
+        )
+        for term, weight in term_weights(text, comments).items()
+    ]
+
+
+def index_post(post_id):
+    """Пересобирает записи индекса одного поста."""
+    post = Post.objects.filter(pk=post_id).values('text', 'is_valid').first()
+    with transaction.atomic():
+        SearchPosting.objects.filter(post_id=post_id).delete()
+        if post is None:
+            return
+        comments = Comment.objects.filter(post_id=post_id).values_list(
+            'text', flat=True
+        )
+        SearchPosting.objects.bulk_create(
+            _postings(post_id, post['text'], post['is_valid'], comments),
+            batch_size=BATCH_SIZE
+        )
+
+
+def _comments_by_post(batch_size):
+    """Тексты комментариев, сгруппированные по посту, по возрастанию id."""
+    rows = Comment.objects.order_by('post_id').values_list(
+        'post_id', 'text'
+    ).iterator(chunk_size=batch_size)
+    for post_id, group in groupby(rows, key=itemgetter(0)):
+        yield post_id, [text for _, text in group]
+
+
+def rebuild_index(batch_size=BATCH_SIZE):
+    """
+    Пересобирает весь индекс; возвращает число проиндексированных постов.
+
+    Посты и комментарии читаются двумя упорядоченными по посту потоками,
+    поэтому память не зависит от размера базы. Записи пишутся
+    executemany без создания объектов модели: при полной пересборке на
+    них уходит большая часть времени bulk_create.
+    """
+    table = connection.ops.quote_name(SearchPosting._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(SearchPosting._meta.get_field(name).column)
+        for name in ('term', 'post', 'weight', 'published')
+    )
+    insert = f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s)'
+
+    comments = _comments_by_post(batch_size)
+    pending = next(comments, None)
+    count = 0
+    rows = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        SearchPosting.objects.all().delete()
+        posts = Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'is_valid'
+        )
+        for post_id, text, is_valid in posts.iterator(chunk_size=batch_size):
+            while pending is not None and pending[0] < post_id:
+                pending = next(comments, None)
+            post_comments = (
+                pending[1] if pending is not None and pending[0] == post_id
+                else ()
+            )
+            rows.extend(
+                (term, post_id, weight, is_valid)
+                for term, weight in term_weights(text, post_comments).items()
+            )
+            count += 1
+            if len(rows) >= batch_size:
+                cursor.executemany(insert, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert, rows)
+    return count
+
+
+def _term_multipliers(query_terms):
+    """
+    Чем реже термин, тем больше он весит (подобие IDF).
+
+    Число постов с термином кэшируется, чтобы не пересчитывать его
+    для частых слов при каждом запросе.
+    """
+    keys = {term: f'search:df:{term}' for term in query_terms}
+    cached = cache.get_many(keys.values())
+    multipliers, missing = {}, {}
+    for term, key in keys.items():
+        df = cached.get(key)
+        if df is None:
+            df = SearchPosting.objects.filter(term=term).count()
+            missing[key] = df
+        multipliers[term] = round(1000 / (1 + math.log(1 + df)))
+    cache.set_many(missing, DF_CACHE_TIMEOUT)
+    return multipliers
+
+
+def search_posts(query, group=None, author=None):
+    """
+    Опубликованные посты, где встретились все слова запроса,
+    от самых подходящих.
+
+    Посты упорядочены по search_score и id, поэтому выдачу можно листать
+    CursorPaginator.
+    """
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return Post.objects.none()
+    multipliers = _term_multipliers(query_terms)
+
+    postings = SearchPosting.objects.filter(term__in=query_terms)
+    score = postings.filter(post_id=OuterRef('pk')).values('post_id').annotate(
+        score=Sum(
+            Case(
+                *(
+                    When(term=term, then=F('weight') * Value(multiplier))
+                    for term, multiplier in multipliers.items()
+                ),
+                output_field=IntegerField(),
+            )
+        )
+    ).values('score')
+    # Совпавшие посты выбираются по индексу (term, post), а не проходом
+    # по ленте: опубликованность проверяется по копии в SearchPosting,
+    # чтобы у планировщика не было соблазна идти от индекса is_valid.
+    matched = postings.filter(published=True).values('post_id').annotate(
+        matched_terms=Count('term')
+    ).filter(matched_terms=len(query_terms)).values('post_id')
+    posts = Post.objects.filter(pk__in=matched)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts.annotate(
+        search_score=Subquery(score, output_field=IntegerField())
+    ).order_by('-search_score', '-id')
@@ -0,0 +1,179 @@
+"""
+Наполнение базы правдоподобными данными для бенчмарков и нагрузочных
+прогонов.
+
+Популярность авторов распределена по степенному закону: немногие
+пишут много и собирают большую часть подписок и лайков, как в живой
+соцсети. Всё создаётся пачками через bulk_create, после чего счётчики,
+ленты и поисковый индекс пересобираются целиком.
+"""
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import UserProfile
+
+from .models import Comment, Follow, Group, Like, Post
+from .transfer import rebuild_derived
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+WORDS = (
+    'котик собака утро город море лес книга музыка кофе дорога друзья '
+    'работа отпуск праздник погода фото новости спорт кино театр поезд '
+    'горы река закат рассвет осень зима весна лето дом сад'
+).split()
+
+
+def _popularity(count, alpha):
+    """Веса по закону Ципфа: у k-го по популярности вес 1 / k^alpha."""
+    return [1 / (rank + 1) ** alpha for rank in range(count)]
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _ids(queryset):
+    return list(queryset.order_by('pk').values_list('pk', flat=True))
+
+
+def _last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def seed(users=1000, posts=5000, groups=20, follows=20, likes=20000,
+         comments=5000, days=365, alpha=1.1, prefix='seed', rng_seed=0,
+         batch_size=BATCH_SIZE):
+    """
+    Создаёт пользователей, группы, посты, подписки, лайки и комментарии.
+
+    follows — среднее число подписок на пользователя. Имена пользователей
+    начинаются с prefix, поэтому наполнение можно повторить с другим
+    префиксом в той же базе. Возвращает словарь с числом созданных строк.
+    """
+    rng = random.Random(rng_seed)
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Созданные строки выбираются по id после прежних, а не по
+        # префиксу: префиксы seed и seed2 пересекаются.
+        last_user, last_group = _last_pk(User), _last_pk(Group)
+        User.objects.bulk_create(
+            (User(username=f'{prefix}{num}', password='!')
+             for num in range(users)),
+            batch_size=batch_size
+        )
+        user_ids = _ids(User.objects.filter(pk__gt=last_user))
+        UserProfile.objects.bulk_create(
+            (UserProfile(user_id=user_id) for user_id in user_ids),
+            batch_size=batch_size
+        )
+        # Порядок в списке и есть ранг популярности.
+        rng.shuffle(user_ids)
+        weights = _popularity(len(user_ids), alpha)
+
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=f'Группа {prefix} {num}',
+                    slug=f'{prefix}-group-{num}',
+                    description=_text(rng, 8),
+                )
+                for num in range(groups)
+            ),
+            batch_size=batch_size
+        )
+        group_ids = _ids(Group.objects.filter(pk__gt=last_group))
+
+        first_post = _last_pk(Post)
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=_text(rng, rng.randint(5, 40)),
+                    author_id=author_id,
+                    group_id=(
+                        rng.choice(group_ids)
+                        if group_ids and rng.random() < 0.7 else None
+                    ),
+                    is_valid=rng.random() < 0.9,
+                )
+                for author_id in rng.choices(user_ids, weights, k=posts)
+            ),
+            batch_size=batch_size
+        )
+        # pub_date выставляется в момент вставки; разносим посты по
+        # времени задним числом, сохраняя порядок id.
+        new_posts = list(
+            Post.objects.filter(pk__gt=first_post).order_by('pk').only('pk')
+        )
+        step = datetime.timedelta(days=days) / max(len(new_posts), 1)
+        start = now - datetime.timedelta(days=days)
+        for num, post in enumerate(new_posts):
+            post.pub_date = start + step * num
+        Post.objects.bulk_update(new_posts, ['pub_date'], batch_size=batch_size)
+        post_ids = [post.pk for post in new_posts]
+        post_authors = dict(
+            Post.objects.filter(pk__gt=first_post).values_list(
+                'pk', 'author_id'
+            )
+        )
+
+        follow_pairs = set()
+        for user_id in user_ids:
+            count = min(int(rng.expovariate(1 / follows)) if follows else 0,
+                        len(user_ids) - 1)
+            for author_id in rng.choices(user_ids, weights, k=count):
+                if author_id != user_id:
+                    follow_pairs.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follow_pairs),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+        # Лайки и комментарии тоже тянутся к популярным авторам.
+        author_weight = dict(zip(user_ids, weights))
+        post_weights = [author_weight[post_authors[pk]] for pk in post_ids]
+        like_pairs = set()
+        if post_ids:
+            for post_id in rng.choices(post_ids, post_weights, k=likes):
+                like_pairs.add((post_id, rng.choice(user_ids)))
+        Like.objects.bulk_create(
+            (Like(post_id=post_id, user_id=user_id)
+             for post_id, user_id in like_pairs),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=post_id,
+                    author_id=rng.choice(user_ids),
+                    text=_text(rng, rng.randint(3, 15)),
+                )
+                for post_id in (
+                    rng.choices(post_ids, post_weights, k=comments)
+                    if post_ids else ()
+                )
+            ),
+            batch_size=batch_size
+        )
+
+    rebuild_derived(batch_size)
+
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'follows': len(follow_pairs),
+        'likes': len(like_pairs),
+        'comments': comments if post_ids else 0,
+    }
@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.caching import bump_generation
+
+from . import search, timeline
+from .counters import change_profile_counter
+from .models import Comment, Group, Post, SearchPosting
+
+
+@receiver(pre_save, sender=Post)
+def remember_state(sender, instance, **kwargs):
+    """Запоминает текст поста и был ли он опубликован до сохранения."""
+    old = instance.pk and Post.objects.filter(pk=instance.pk).values(
+        'text', 'is_valid'
+    ).first()
+    instance._was_valid = bool(old and old['is_valid'])
+    instance._old_text = old['text'] if old else ''
+
+
+@receiver(post_save, sender=Post)
+def validity_changed(sender, instance, **kwargs):
+    """
+    Модерация переключила is_valid: двигаем счётчик постов автора
+    и раскладываем пост по лентам подписчиков или убираем из них.
+    """
+    was_valid = getattr(instance, '_was_valid', False)
+    if instance.is_valid == was_valid:
+        return
+    bump_generation('feed')
+    if instance.is_valid:
+        change_profile_counter(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    else:
+        change_profile_counter(instance.author_id, 'posts_count', -1)
+        timeline.retract(instance)
+
+
+@receiver(post_delete, sender=Post)
+def valid_post_deleted(sender, instance, **kwargs):
+    if instance.is_valid:
+        change_profile_counter(instance.author_id, 'posts_count', -1)
+        bump_generation('feed')
+
+
+@receiver(post_save, sender=Post)
+def post_edited(sender, instance, created, **kwargs):
+    """
+    Правка поста сбрасывает его закэшированную карточку, а смена группы
+    может переставить его между первыми страницами лент.
+    """
+    if not created:
+        Post.objects.filter(pk=instance.pk).update(
+            card_version=F('card_version') + 1
+        )
+        bump_generation('feed')
+
+
+@receiver(post_save, sender=Group)
+def group_edited(sender, instance, created, **kwargs):
+    """Переименование группы сбрасывает карточки всех её постов."""
+    if not created:
+        Group.objects.filter(pk=instance.pk).update(
+            card_version=F('card_version') + 1
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved_to_index(sender, instance, **kwargs):
+    """Сдвигает в индексе веса изменённых слов и отметку публикации."""
+    old_text = getattr(instance, '_old_text', '')
+    if instance.text != old_text:
+        search.index_text_change(instance.pk, old_text, instance.text)
+    if instance.is_valid != getattr(instance, '_was_valid', False):
+        SearchPosting.objects.filter(post_id=instance.pk).update(
+            published=instance.is_valid
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved_to_index(sender, instance, created, **kwargs):
+    if created:
+        search.index_comment(instance.post_id, instance.text)
+        return
+    # Комментарии правят только в админке: там пересборка поста уместна.
+    post_id = instance.post_id
+    transaction.on_commit(lambda: search.index_post(post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted_from_index(sender, instance, **kwargs):
+    # Комментарии удаляются и вместе с постом: убираем слова после
+    # фиксации, когда пост уже либо удалён, либо точно остался.
+    post_id, text = instance.post_id, instance.text
+    transaction.on_commit(
+        lambda: search.index_comment(post_id, text, sign=-1)
+    )
@@ -0,0 +1,67 @@
+"""
+Лайки и подписки.
+
+Каждое действие — одна вставка с пропуском конфликта или одно удаление:
+уникальные ограничения Like и Follow сами отсекают повторы, в том числе
+от параллельных запросов, а число затронутых строк говорит, надо ли
+двигать счётчики и ленты. У Like и Follow нет сигналов и зависимых
+строк, поэтому delete() удаляет их одним DELETE, без выборки.
+"""
+from django.db import transaction
+from django.db.models import IntegerField, Value
+
+from core.sql import insert_select
+
+from . import likebuffer
+from .counters import follow_changed
+from .models import Follow, Like, Post, User
+from .timeline import author_unfollowed, backfill, trim
+
+
+def _user(user_id):
+    return Value(user_id, output_field=IntegerField())
+
+
+def like(user_id, post_id):
+    """Ставит лайк опубликованному посту; True, если его ещё не было."""
+    posts = Post.objects.filter(pk=post_id, is_valid=True)
+    with transaction.atomic():
+        created = insert_select(Like, posts, user=_user(user_id), post='pk')
+        if created:
+            likebuffer.record(post_id, created)
+    return bool(created)
+
+
+def unlike(user_id, post_id):
+    """Снимает лайк; True, если он был."""
+    likes = Like.objects.filter(user_id=user_id, post_id=post_id)
+    with transaction.atomic():
+        deleted, _ = likes.delete()
+        if deleted:
+            likebuffer.record(post_id, -deleted)
+    return bool(deleted)
+
+
+def follow(user_id, author_id):
+    """Подписывает на автора; True, если подписки ещё не было."""
+    authors = User.objects.filter(pk=author_id).exclude(pk=user_id)
+    with transaction.atomic():
+        created = insert_select(
+            Follow, authors, user=_user(user_id), author='pk'
+        )
+        if created:
+            follow_changed(user_id, author_id, 1)
+            backfill(user_id, author_id)
+    return bool(created)
+
+
+def unfollow(user_id, author_id):
+    """Отписывает от автора; True, если подписка была."""
+    follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    with transaction.atomic():
+        deleted, _ = follows.delete()
+        if deleted:
+            follow_changed(user_id, author_id, -deleted)
+            trim(user_id, author_id)
+            author_unfollowed(author_id)
+    return bool(deleted)
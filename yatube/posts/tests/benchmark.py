@@ -0,0 +1,128 @@
+"""
+Замеры для бенчмарков: число запросов, время SQL и задержка ответа.
+
+Размер данных и число повторов задаются переменными окружения:
+YATUBE_BENCH_SCALE (множитель объёма данных, по умолчанию 0.1;
+1 — полный объём из описаний замеров), YATUBE_BENCH_REPEAT
+(сколько раз запрашивать каждую страницу) и YATUBE_BENCH_OUTPUT
+(куда дописать результаты в JSON, чтобы сравнивать прогоны).
+Сравнения по времени ответа зависят от загрузки машины, поэтому
+проверяются только с YATUBE_BENCH=1; число запросов проверяется всегда.
+"""
+import json
+import os
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connection, connections
+from django.utils import timezone
+
+from ..loadgen import percentile
+
+
+def scale():
+    # Бюджеты запросов от объёма не зависят, поэтому обычный прогон
+    # тестов идёт на десятой доле данных; полный объём — SCALE=1.
+    return float(os.environ.get('YATUBE_BENCH_SCALE', 0.1))
+
+
+def repeat():
+    return int(os.environ.get('YATUBE_BENCH_REPEAT', 5))
+
+
+def timing_checks():
+    """Проверять ли сравнения по времени, а не только число запросов."""
+    return os.environ.get('YATUBE_BENCH') == '1'
+
+
+def database_unavailable(alias='default'):
+    """
+    Почему профиль базы недоступен: нет драйвера или сервера; иначе None.
+
+    Проверка идёт до создания тестовой базы, через служебное соединение
+    без имени базы, которым пользуется и сам тестовый раннер.
+    """
+    try:
+        wrapper = connections[alias]
+    except ImproperlyConfigured as error:
+        return str(error).strip()
+    if wrapper.vendor == 'sqlite':
+        return None
+    nodb = wrapper._nodb_connection
+    try:
+        nodb.ensure_connection()
+    except DatabaseError as error:
+        return str(error).strip()
+    finally:
+        nodb.close()
+    return None
+
+
+class QueryTimer:
+    """Считает запросы и их суммарное время через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def measure(request, times=None, prepare=None, cold=True):
+    """
+    Выполняет request() times раз и возвращает сводку замеров.
+
+    prepare() вызывается перед каждым повтором вне замера, например чтобы
+    снять лайк перед очередным лайком. Если cold, кэш перед первым
+    повтором очищается: число запросов считается по холодному кэшу,
+    а задержка — по всем повторам.
+    """
+    times = times or repeat()
+    latencies, queries, sql_time, statuses = [], [], [], set()
+    for attempt in range(times):
+        if prepare is not None:
+            prepare()
+        if cold and attempt == 0:
+            cache.clear()
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = request()
+            latencies.append(time.perf_counter() - started)
+        statuses.add(response.status_code)
+        queries.append(timer.count)
+        sql_time.append(timer.seconds)
+    return {
+        'queries': queries[0],
+        'queries_max': max(queries),
+        'sql_ms': round(statistics.mean(sql_time) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'statuses': sorted(statuses),
+    }
+
+
+def write_results(suite, results, **meta):
+    """Дописывает прогон в YATUBE_BENCH_OUTPUT (JSON Lines), если он задан."""
+    path = os.environ.get('YATUBE_BENCH_OUTPUT')
+    if not path:
+        return
+    record = {
+        'suite': suite,
+        'time': timezone.now().isoformat(),
+        'vendor': connection.vendor,
+        'scale': scale(),
+        'repeat': repeat(),
+        **meta,
+        'results': results,
+    }
+    with open(path, 'a', encoding='utf-8') as output:
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
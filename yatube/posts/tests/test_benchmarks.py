@@ -0,0 +1,325 @@
+import time
+from unittest import skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from users.models import UserProfile
+
+from ..counters import rebuild_counters
+from ..loadgen import WRITE_MIX, LoadGenerator
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..moderation import approve, pending_posts
+from ..seeding import seed
+from ..utils import NEXT, CursorPaginator
+from .benchmark import (
+    QueryTimer, database_unavailable, measure, scale, write_results
+)
+
+User = get_user_model()
+
+# Сколько запросов к базе может сделать страница при холодном кэше.
+# Запросы сессии и пользователя, а также точки сохранения транзакций
+# (тест идёт внутри TestCase) входят в бюджет.
+QUERY_BUDGETS = {
+    'posts': 4,
+    'posts_next_page': 3,
+    'group_posts': 5,
+    'profile': 5,
+    'post_view': 4,
+    'follow_index': 4,
+    'search': 6,
+    'post_like': 6,
+    'post_unlike': 6,
+    'profile_follow': 8,
+    # Отписка ещё проверяет, не опустился ли автор под
+    # TIMELINE_FANOUT_LIMIT.
+    'profile_unfollow': 9,
+    'post_comments': 4,
+    'posts_not_modified': 4,
+    'post_not_modified': 3,
+}
+
+
+class ViewBenchmarkTest(TestCase):
+    """
+    Прогоняет основные страницы на правдоподобном объёме данных
+    (при YATUBE_BENCH_SCALE=1).
+
+    Падает, если страница вышла за бюджет запросов: так ловятся N+1.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        size = scale()
+        cls.dataset = seed(
+            users=int(2000 * size),
+            posts=int(3000 * size),
+            follows=5,
+            likes=int(10000 * size),
+            comments=int(3000 * size),
+        )
+        cls.reader = UserProfile.objects.order_by(
+            '-following_count'
+        ).first().user
+        cls.author = UserProfile.objects.order_by(
+            '-followers_count'
+        ).first().user
+        cls.post = Post.objects.filter(
+            author=cls.author, is_valid=True
+        ).order_by('-comments_count').first()
+        cls.group = Group.objects.annotate(
+            size=Count('posts')
+        ).order_by('-size').first()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def get(self, name, *args, **params):
+        url = reverse(name, args=args)
+        return lambda: self.client.get(
+            url, params, HTTP_REFERER='http://testserver/posts'
+        )
+
+    def revalidate(self, name, *args):
+        url = reverse(name, args=args)
+        etag = self.client.get(url)['ETag']
+        return lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def cases(self):
+        # Страница с формой ставит CSRF-куку, а она входит в ETag.
+        self.client.get(reverse('new_post'))
+        first_page = self.client.get(reverse('posts')).context['page']
+        like = self.get('post_like', self.post.pk)
+        unlike = self.get('post_unlike', self.post.pk)
+        follow = self.get('profile_follow', self.author.username)
+        unfollow = self.get('profile_unfollow', self.author.username)
+        return {
+            'posts': (self.get('posts'), None),
+            'posts_next_page': (
+                self.get('posts', cursor=first_page.next_cursor), None
+            ),
+            'group_posts': (self.get('group', self.group.slug), None),
+            'profile': (self.get('profile', self.author.username), None),
+            'post_view': (
+                self.get('post', self.author.username, self.post.pk), None
+            ),
+            'post_comments': (
+                self.get(
+                    'post_comments', self.author.username, self.post.pk
+                ),
+                None
+            ),
+            'follow_index': (self.get('follow_index'), None),
+            'posts_not_modified': (self.revalidate('posts'), None),
+            'post_not_modified': (
+                self.revalidate('post', self.author.username, self.post.pk),
+                None
+            ),
+            'search': (self.get('search', q='котик утро'), None),
+            'post_like': (like, unlike),
+            'post_unlike': (unlike, like),
+            'profile_follow': (follow, unfollow),
+            'profile_unfollow': (unfollow, follow),
+        }
+
+    def test_views_stay_within_query_budget(self):
+        results = {
+            name: measure(request, prepare=prepare)
+            for name, (request, prepare) in self.cases().items()
+        }
+        write_results('views', results, dataset=self.dataset)
+
+        for name, result in results.items():
+            with self.subTest(view=name):
+                self.assertTrue(
+                    all(status < 400 for status in result['statuses']),
+                    result
+                )
+                self.assertLessEqual(
+                    result['queries_max'], QUERY_BUDGETS[name], result
+                )
+
+
+class CommentThreadBenchmarkTest(TestCase):
+    """
+    Пост с 10 тысячами комментариев (при YATUBE_BENCH_SCALE=1) против
+    поста с десятью.
+
+    Страница поста и подгрузка последней страницы комментариев должны
+    стоить столько же запросов и примерно столько же времени.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        size = scale()
+        User.objects.bulk_create(
+            User(username=f'commenter{num}') for num in range(100)
+        )
+        users = list(User.objects.order_by('pk'))
+        cls.author = users[0]
+        cls.small, cls.large = (
+            Post.objects.create(text=text, author=cls.author, is_valid=True)
+            for text in ('small', 'large')
+        )
+        for post, count in ((cls.small, 10), (cls.large, int(10000 * size))):
+            Comment.objects.bulk_create(
+                (
+                    Comment(
+                        post=post, author=users[num % len(users)],
+                        text=f'comment {num}'
+                    )
+                    for num in range(count)
+                ),
+                batch_size=500
+            )
+        UserProfile.objects.get_or_create(user=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def last_page(self, post):
+        paginator = CursorPaginator(
+            Comment.objects.filter(post=post).order_by('created', 'id'),
+            settings.COMMENTS_PER_PAGE
+        )
+        # Курсор перед последней страницей (у короткой ветки — после
+        # первого комментария).
+        before_last = list(Comment.objects.filter(post=post).order_by(
+            '-created', '-id'
+        )[:settings.COMMENTS_PER_PAGE + 1])[-1]
+        return paginator.encode(NEXT, paginator.queryset.get(
+            pk=before_last.pk
+        ))
+
+    def test_thread_size_does_not_change_cost(self):
+        results = {}
+        for name, post in (('small', self.small), ('large', self.large)):
+            url = reverse('post', args=(self.author.username, post.pk))
+            fragment = reverse(
+                'post_comments', args=(self.author.username, post.pk)
+            )
+            cursor = self.last_page(post)
+            results[f'post_view_{name}'] = measure(
+                lambda: self.client.get(url)
+            )
+            results[f'last_comments_{name}'] = measure(
+                lambda: self.client.get(fragment, {'cursor': cursor})
+            )
+        write_results('comments', results)
+
+        for view in ('post_view', 'last_comments'):
+            with self.subTest(view=view):
+                small = results[f'{view}_small']
+                large = results[f'{view}_large']
+                self.assertEqual(small['statuses'], [200])
+                self.assertEqual(large['statuses'], [200])
+                self.assertEqual(large['queries'], small['queries'])
+
+
+class ModerationBenchmarkTest(TestCase):
+    """
+    Одобрение 10 тысяч постов (при YATUBE_BENCH_SCALE=1) из очереди
+    одним вызовом approve().
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        size = scale()
+        User.objects.bulk_create(
+            User(username=f'moderation{num}') for num in range(200)
+        )
+        users = list(User.objects.order_by('pk'))
+        authors, readers = users[:50], users[50:]
+        Follow.objects.bulk_create(
+            (
+                Follow(user=reader, author=author)
+                for num, author in enumerate(authors)
+                for reader in readers[num::10]
+            ),
+            batch_size=500
+        )
+        Post.objects.bulk_create(
+            (
+                Post(text=f'post {num}', author=authors[num % len(authors)])
+                for num in range(int(10000 * size))
+            ),
+            batch_size=500
+        )
+        rebuild_counters()
+
+    def test_approve_throughput(self):
+        ids = list(pending_posts().values_list('pk', flat=True))
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            approved = approve(ids)
+            elapsed = time.perf_counter() - started
+
+        result = {
+            'posts': approved,
+            'seconds': round(elapsed, 3),
+            'posts_per_second': round(approved / elapsed),
+            'queries': timer.count,
+            'sql_ms': round(timer.seconds * 1000, 3),
+            'timeline_entries': TimelineEntry.objects.count(),
+        }
+        write_results('moderation', {'approve': result})
+
+        self.assertEqual(approved, len(ids))
+        self.assertFalse(pending_posts().exists())
+        # Пачка из CHUNK_SIZE постов — постоянное число запросов.
+        self.assertLessEqual(timer.count, 8 * (len(ids) // 500 + 1), result)
+
+
+UNAVAILABLE = database_unavailable()
+
+
+@skipIf(UNAVAILABLE, f'База недоступна: {UNAVAILABLE}')
+class WriteConcurrencyBenchmarkTest(TransactionTestCase):
+    """
+    Посты и комментарии из нескольких потоков сразу.
+
+    Показывает, как профиль базы держит параллельную запись. Профиль
+    задаёт YATUBE_DB, например для локального PostgreSQL:
+    YATUBE_DB=postgres YATUBE_DB_HOST=localhost python manage.py test
+    posts.tests.test_benchmarks.WriteConcurrencyBenchmarkTest.
+    Драйвер PostgreSQL ставится из requirements-postgres.txt; если
+    сервер недоступен, замер пропускается. Ошибки под нагрузкой
+    (например, «database is locked») — часть замера и попадают в отчёт.
+    """
+
+    # Без базы раннер не пытается создать тестовую базу для этого класса.
+    databases = set() if UNAVAILABLE else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        seed(
+            users=50, posts=int(200 * scale()), follows=3, likes=0,
+            comments=0
+        )
+
+    def test_concurrent_writes(self):
+        generator = LoadGenerator(WSGIHandler(), readers=20, mix=WRITE_MIX)
+        requests = int(100 * scale())
+        results = {
+            f'concurrency_{concurrency}': generator.run(
+                requests=requests, concurrency=concurrency
+            )
+            for concurrency in (1, 4, 8)
+        }
+        write_results(
+            'writes', results, database=settings.DATABASE_PROFILE
+        )
+
+        serial = results['concurrency_1']['total']
+        self.assertEqual(serial['requests'], requests)
+        self.assertEqual(serial['errors'], 0, results)
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from users.models import UserProfile
+
+from ..models import Comment, Follow, Like, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Test post', author=cls.author, is_valid=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def profile(self, user):
+        return UserProfile.objects.get(user=user)
+
+    def test_profile_created_for_new_user(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.author).exists())
+
+    def test_valid_post_counted_in_author_profile(self):
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+
+        Post.objects.create(text='draft', author=self.author)
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+
+    def test_moderation_flip_changes_posts_count(self):
+        post = Post.objects.create(text='draft', author=self.author)
+
+        post.is_valid = True
+        post.save()
+        self.assertEqual(self.profile(self.author).posts_count, 2)
+
+        post.is_valid = False
+        post.save()
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+
+    def test_comment_increments_comments_count(self):
+        self.client.post(
+            reverse('add_comment', args=(self.author.username, self.post.pk)),
+            data={'text': 'hello'}
+        )
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_like_and_unlike_change_likes_count(self):
+        referer = {'HTTP_REFERER': 'http://testserver/posts'}
+
+        for _ in range(2):
+            self.client.get(
+                reverse('post_like', args=(self.post.pk,)), **referer
+            )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.get(reverse('post_unlike', args=(self.post.pk,)), **referer)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_follow_and_unfollow_change_profile_counters(self):
+        self.client.get(reverse('profile_follow', args=(self.author.username,)))
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+
+        self.client.get(
+            reverse('profile_unfollow', args=(self.author.username,))
+        )
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+
+    def test_rebuild_counters_reports_and_fixes_drift(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='a')
+        Like.objects.create(post=self.post, user=self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserProfile.objects.filter(user=self.author).update(posts_count=7)
+
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+
+        self.assertIn(f'Post #{self.post.pk}: comments_count 0 -> 1',
+                      out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.likes_count, 1)
+        author_profile = self.profile(self.author)
+        self.assertEqual(author_profile.posts_count, 1)
+        self.assertEqual(author_profile.followers_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('Расхождений нет', out.getvalue())
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test group', slug='test-group', description='test'
+        )
+        cls.post = Post.objects.create(
+            text='Test post', author=cls.author, group=cls.group,
+            is_valid=True
+        )
+        cls.urls = {
+            'posts': reverse('posts'),
+            'group': reverse('group', args=(cls.group.slug,)),
+            'profile': reverse('profile', args=(cls.author.username,)),
+            'post': reverse('post', args=(cls.author.username, cls.post.pk)),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def etag(self, url, client=None):
+        response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_page_is_not_rendered_again(self):
+        """Совпавший ETag — 304 без рендера, за один запрос валидатора."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                # Первый ответ с формой ставит CSRF-куку, а она входит в ETag.
+                self.client.get(url)
+                etag = self.etag(url)
+                # Сессия, пользователь и запрос валидатора.
+                with self.assertNumQueries(3):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertIn('private', response['Cache-Control'])
+
+    def test_group_etag_uses_cached_first_page(self):
+        """ETag группы сверяется с той же первой страницей, что и ответ."""
+        url = self.urls['group']
+        etag = self.etag(url)
+        # bulk_create не шлёт сигналов: закэшированная первая страница
+        # остаётся прежней, как до истечения FEED_CACHE_TIMEOUT.
+        Post.objects.bulk_create([Post(
+            text='Unseen post', author=self.author, group=self.group,
+            is_valid=True
+        )])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_like_changes_etag(self):
+        etags = {name: self.etag(url) for name, url in self.urls.items()}
+
+        self.client.get(reverse('post_like', args=(self.post.pk,)))
+
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertNotEqual(self.etag(url), etags[name])
+
+    def test_comment_and_edit_change_post_etag(self):
+        url = self.urls['post']
+        etag = self.etag(url)
+
+        self.client.post(
+            reverse('add_comment', args=(self.author.username, self.post.pk)),
+            {'text': 'Комментарий'}
+        )
+        self.assertTrue(Comment.objects.exists())
+        etag_after_comment = self.etag(url)
+        self.assertNotEqual(etag_after_comment, etag)
+
+        self.group.title = 'Renamed'
+        self.group.save()
+        self.assertNotEqual(self.etag(url), etag_after_comment)
+
+    def test_follow_changes_profile_etag(self):
+        url = self.urls['profile']
+        etag = self.etag(url)
+
+        self.client.get(
+            reverse('profile_follow', args=(self.author.username,))
+        )
+
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_etag_depends_on_viewer(self):
+        other = Client()
+        other.force_login(self.author)
+
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertNotEqual(self.etag(url), self.etag(url, other))
+
+    def test_empty_page_has_no_etag(self):
+        response = self.client.get(
+            reverse('profile', args=(self.reader.username,))
+        )
+
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..fragments import card_cache_stats
+from ..models import Group, Like, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Old title', slug='test-group', description='test'
+        )
+        cls.post = Post.objects.create(
+            text='Old text',
+            author=cls.author,
+            group=cls.group,
+            is_valid=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts')
+
+    def test_second_render_hits_cache(self):
+        self.reader_client.get(self.url)
+        before = card_cache_stats()
+
+        self.reader_client.get(self.url)
+
+        after = card_cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'], before['misses'])
+
+    def test_edit_invalidates_card(self):
+        self.reader_client.get(self.url)
+
+        self.author_client.post(
+            reverse('post_edit', args=(self.author.username, self.post.pk)),
+            data={'text': 'New text', 'group': self.group.pk}
+        )
+
+        response = self.reader_client.get(self.url)
+        self.assertContains(response, 'New text')
+        self.assertNotContains(response, 'Old text')
+
+    def test_comment_invalidates_card(self):
+        self.reader_client.get(self.url)
+
+        self.reader_client.post(
+            reverse('add_comment', args=(self.author.username, self.post.pk)),
+            data={'text': 'hello'}
+        )
+
+        response = self.reader_client.get(self.url)
+        self.assertContains(response, '1 комментарий')
+
+    def test_group_rename_invalidates_card(self):
+        self.reader_client.get(self.url)
+
+        self.group.title = 'New title'
+        self.group.save()
+
+        response = self.reader_client.get(self.url)
+        self.assertContains(response, '#New title')
+
+    def test_viewer_specific_buttons_are_not_cached(self):
+        Like.objects.create(post=self.post, user=self.reader)
+        like_url = reverse('post_like', args=(self.post.pk,))
+        unlike_url = reverse('post_unlike', args=(self.post.pk,))
+        edit_url = reverse(
+            'post_edit', args=(self.author.username, self.post.pk)
+        )
+
+        response = self.reader_client.get(self.url)
+        self.assertContains(response, unlike_url)
+        self.assertNotContains(response, edit_url)
+
+        response = self.author_client.get(self.url)
+        self.assertContains(response, like_url)
+        self.assertContains(response, edit_url)
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import likebuffer
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(LIKE_FLUSH_INTERVAL=60)
+class LikeBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Test post', author=cls.author, is_valid=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        likebuffer._pending.clear()
+
+    def likes_count(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count
+
+    def test_deltas_wait_for_flush(self):
+        """Приращения не пишутся в базу до flush() и сливаются в одно."""
+        for _ in range(3):
+            likebuffer.add(self.post.pk, 1)
+        likebuffer.add(self.post.pk, -1)
+
+        self.assertEqual(self.likes_count(), 0)
+        self.assertEqual(likebuffer.pending([self.post.pk]), {self.post.pk: 2})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(likebuffer.flush(), 1)
+        self.assertEqual(self.likes_count(), 2)
+        self.assertEqual(likebuffer.pending([self.post.pk]), {})
+
+    def test_pages_show_database_plus_pending(self):
+        """Лента показывает число из базы вместе с ещё не записанным."""
+        Post.objects.filter(pk=self.post.pk).update(likes_count=5)
+        likebuffer.add(self.post.pk, 2)
+
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts'))
+
+        self.assertContains(response, '<span class="js-count">7</span>')
+
+    def test_evicted_key_is_not_recreated_by_flush(self):
+        """Вытесненный до записи ключ не превращается в минус."""
+        likebuffer.add(self.post.pk, 2)
+        cache.delete(likebuffer._key(self.post.pk))
+
+        likebuffer.flush()
+
+        self.assertEqual(self.likes_count(), 2)
+        self.assertIsNone(cache.get(likebuffer._key(self.post.pk)))
+        self.assertEqual(likebuffer.pending([self.post.pk]), {})
+
+    def test_failed_flush_keeps_deltas(self):
+        """Если запись не удалась, приращения остаются до следующей."""
+        likebuffer.add(self.post.pk, 1)
+        with mock.patch.object(
+            likebuffer, 'change_post_counters', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                likebuffer.flush()
+
+        self.assertEqual(likebuffer.flush(), 1)
+        self.assertEqual(self.likes_count(), 1)
+
+    def test_shutdown_flushes_pending(self):
+        """При остановке процесса накопленное записывается в базу."""
+        likebuffer.add(self.post.pk, 4)
+
+        likebuffer._shutdown(likebuffer.threading.Event())
+
+        self.assertEqual(self.likes_count(), 4)
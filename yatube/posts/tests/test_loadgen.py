@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from users.models import UserProfile
+
+from ..loadgen import DEFAULT_MIX, LoadGenerator, parse_mix
+from ..models import Follow, Group, Post
+
+
+class SeedCommandTest(TestCase):
+    def test_seed_yatube_fills_database(self):
+        out = StringIO()
+        call_command(
+            'seed_yatube', users=30, posts=200, likes=100, comments=50,
+            follows=3, groups=2, stdout=out
+        )
+
+        self.assertIn('posts: 200', out.getvalue())
+        self.assertEqual(UserProfile.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Post.objects.filter(is_valid=False).exists())
+
+    def test_overlapping_prefixes_seed_separately(self):
+        """Префикс seed2 начинается с seed: наполнения не мешают друг другу."""
+        for prefix in ('seed', 'seed2'):
+            call_command(
+                'seed_yatube', users=12, posts=20, likes=10, comments=5,
+                follows=2, groups=2, prefix=prefix, stdout=StringIO()
+            )
+
+        self.assertEqual(UserProfile.objects.count(), 24)
+        self.assertEqual(Group.objects.count(), 4)
+
+
+class LoadGeneratorTest(TransactionTestCase):
+    """Потоки видят только зафиксированные данные, поэтому без TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'seed_yatube', users=30, posts=200, likes=100, comments=50,
+            follows=3, groups=2, stdout=StringIO()
+        )
+
+    def test_mix_is_replayed_without_errors(self):
+        generator = LoadGenerator(WSGIHandler(), readers=5)
+
+        report = generator.run(requests=60, concurrency=1)
+
+        self.assertEqual(report['total']['requests'], 60)
+        self.assertEqual(report['total']['errors'], 0, report)
+        self.assertLessEqual(set(report) - {'total'}, set(DEFAULT_MIX))
+        self.assertIn('p95_ms', report['total'])
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix('posts=3,like=1'), {'posts': 3.0, 'like': 1.0}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix('unknown=1')
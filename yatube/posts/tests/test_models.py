@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.test import Client, TestCase
 
-from ..models import Group, Post
+from ..models import Group, Like, Post
 
 User = get_user_model()
 
@@ -66,3 +67,39 @@ class PostModelTest(TestCase):
         for instance, expected_name in instances:
             with self.subTest(instance=instance):
                 self.assertEqual(str(instance), expected_name)
+
+
+class PostQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.liked_post = Post.objects.create(
+            text='liked', author=cls.author, is_valid=True
+        )
+        cls.other_post = Post.objects.create(
+            text='other', author=cls.author, is_valid=True
+        )
+        Like.objects.create(post=cls.liked_post, user=cls.reader)
+        Like.objects.create(post=cls.liked_post, user=cls.author)
+        Post.objects.filter(pk=cls.liked_post.pk).update(likes_count=2)
+
+    def test_with_likes_annotates_every_post_in_one_query(self):
+        with self.assertNumQueries(1):
+            posts = {
+                post.pk: post
+                for post in Post.objects.with_likes(self.reader)
+            }
+
+        self.assertEqual(posts[self.liked_post.pk].like_count, 2)
+        self.assertTrue(posts[self.liked_post.pk].liked_by_user)
+        self.assertEqual(posts[self.other_post.pk].like_count, 0)
+        self.assertFalse(posts[self.other_post.pk].liked_by_user)
+
+    def test_with_likes_for_anonymous_user(self):
+        post = Post.objects.with_likes(AnonymousUser()).get(
+            pk=self.liked_post.pk
+        )
+
+        self.assertEqual(post.like_count, 2)
+        self.assertFalse(post.liked_by_user)
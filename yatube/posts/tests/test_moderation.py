@@ -0,0 +1,277 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.caching import generation
+from users.models import UserProfile
+
+from .. import moderation
+from ..classifiers import WordlistClassifier
+from ..counters import follow_changed
+from ..models import Follow, Post, SearchPosting, TimelineEntry
+from ..moderation import (
+    approve, auto_approve_below, pending_posts, reject, score
+)
+
+User = get_user_model()
+
+
+class ModerationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        follow_changed(cls.reader.pk, cls.author.pk, 1)
+        cls.first = Post.objects.create(text='Первый котик',
+                                        author=cls.author)
+        cls.second = Post.objects.create(text='Второй котик',
+                                         author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def posts_count(self):
+        return UserProfile.objects.get(user=self.author).posts_count
+
+    def test_queue_is_oldest_first(self):
+        self.assertEqual(list(pending_posts()), [self.first, self.second])
+
+    def test_approve_publishes_in_bulk(self):
+        feed = generation('feed')
+
+        self.assertEqual(approve([self.first.pk, self.second.pk]), 2)
+
+        self.assertFalse(pending_posts().exists())
+        self.assertEqual(self.posts_count(), 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertFalse(
+            SearchPosting.objects.filter(published=False).exists()
+        )
+        self.assertNotEqual(generation('feed'), feed)
+
+    def test_approve_is_idempotent(self):
+        approve([self.first.pk])
+        self.assertEqual(approve([self.first.pk]), 0)
+        self.assertEqual(self.posts_count(), 1)
+
+    def test_reject_unpublishes_valid_posts(self):
+        approve([self.first.pk])
+
+        self.assertEqual(reject([self.first.pk, self.second.pk]), 2)
+
+        self.assertFalse(pending_posts().exists())
+        self.assertEqual(self.posts_count(), 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(
+            SearchPosting.objects.filter(published=True).exists()
+        )
+
+    def test_chunk_costs_constant_queries(self):
+        """Запросов на пачку столько же, сколько на один пост."""
+        with self.assertNumQueries(7):
+            approve([self.first.pk])
+        with self.assertNumQueries(7):
+            approve([self.second.pk])
+        Post.objects.bulk_create(
+            Post(text=str(i), author=self.author) for i in range(10)
+        )
+        ids = list(pending_posts().values_list('pk', flat=True))
+        with self.assertNumQueries(7):
+            approve(ids)
+        self.assertEqual(self.posts_count(), 12)
+
+    def test_large_batches_are_chunked(self):
+        Post.objects.bulk_create(
+            Post(text=str(i), author=self.author)
+            for i in range(moderation.CHUNK_SIZE + 10)
+        )
+        ids = pending_posts().values_list('pk', flat=True)
+        self.assertEqual(approve(ids), moderation.CHUNK_SIZE + 12)
+        self.assertEqual(self.posts_count(), moderation.CHUNK_SIZE + 12)
+
+
+class ModerationViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(text='Котик', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_only_staff_sees_queue(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('moderation'))
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('moderation'))
+        self.assertEqual(list(response.context['page']), [self.post])
+
+    def test_checked_posts_are_approved(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(
+            reverse('moderation'),
+            {'action': 'approve', 'ids': [self.post.pk]}
+        )
+        self.assertRedirects(response, reverse('moderation'))
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.is_valid)
+
+
+class ClassifierTest(TestCase):
+    def setUp(self):
+        self.classifier = WordlistClassifier(words=('казино', 'кредит'))
+
+    def test_plain_text_is_safe(self):
+        self.assertEqual(self.classifier.score('Котики спят на солнце'), 0)
+
+    def test_risky_text_scores_high(self):
+        for text in (
+            'Лучшие казино города',
+            'Кредиты без справок http://a.example http://b.example',
+            'ПОКУПАЙТЕ СЕЙЧАС ПОКА НЕ ПОЗДНО!!!!!!',
+        ):
+            with self.subTest(text=text):
+                self.assertGreaterEqual(
+                    self.classifier.score(text), auto_approve_below()
+                )
+
+    def test_score_is_capped(self):
+        self.assertEqual(
+            self.classifier.score('казино кредит казино www.x.example'), 1
+        )
+
+
+class AutoModerationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, text):
+        self.client.post(reverse('new_post'), {'text': text})
+        return Post.objects.get(text=text)
+
+    def test_safe_post_is_published_on_create(self):
+        post = self.create('Котики спят на солнце')
+
+        self.assertTrue(post.is_valid)
+        self.assertEqual(post.moderation_score, 0)
+
+    def test_risky_post_waits_for_moderator(self):
+        post = self.create('Лучшее казино, ставки тут')
+
+        self.assertFalse(post.is_valid)
+        self.assertGreaterEqual(post.moderation_score, auto_approve_below())
+        self.assertIn(post, pending_posts())
+
+    def test_edit_is_rescored(self):
+        post = self.create('Лучшее казино, ставки тут')
+        self.client.post(
+            reverse('post_edit', args=(self.user.username, post.pk)),
+            {'text': 'Котики вместо казино? Нет, просто котики'}
+        )
+        post.refresh_from_db()
+        self.assertGreater(post.moderation_score, 0)
+        self.assertFalse(post.is_valid)
+
+        self.client.post(
+            reverse('post_edit', args=(self.user.username, post.pk)),
+            {'text': 'Просто котики'}
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.is_valid)
+
+    def test_published_post_edited_to_risky_is_unpublished(self):
+        """Опасная правка опубликованного поста возвращает его в очередь."""
+        post = self.create('Котики спят на солнце')
+        self.assertTrue(post.is_valid)
+
+        self.client.post(
+            reverse('post_edit', args=(self.user.username, post.pk)),
+            {'text': 'Лучшее казино, ставки тут'}
+        )
+
+        post.refresh_from_db()
+        self.assertFalse(post.is_valid)
+        self.assertFalse(post.is_rejected)
+        self.assertIn(post, pending_posts())
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).posts_count, 0
+        )
+        self.assertFalse(
+            SearchPosting.objects.filter(post=post, published=True).exists()
+        )
+
+    def test_post_approved_by_moderator_survives_risky_edit(self):
+        """Правка поста, одобренного модератором, его не снимает."""
+        post = self.create('Лучшее казино, ставки тут')
+        approve([post.pk])
+        self.client.post(
+            reverse('post_edit', args=(self.user.username, post.pk)),
+            {'text': 'Ещё лучшее казино, ставки тут'}
+        )
+
+        post.refresh_from_db()
+        self.assertTrue(post.is_valid)
+        self.assertTrue(post.approved_by_moderator)
+
+    def test_rescore_all_skips_posts_approved_by_moderator(self):
+        """rescore_posts --all не пересматривает решения модератора."""
+        manual = self.create('Лучшее казино, ставки тут')
+        approve([manual.pk])
+        automatic = self.create('Котики спят на солнце')
+        Post.objects.filter(pk=automatic.pk).update(text='Казино и ставки')
+
+        call_command('rescore_posts', all=True, stdout=StringIO())
+
+        manual.refresh_from_db()
+        automatic.refresh_from_db()
+        self.assertTrue(manual.is_valid)
+        self.assertFalse(automatic.is_valid)
+        self.assertEqual(list(pending_posts()), [automatic])
+
+    def test_rejected_posts_are_not_rescored(self):
+        post = Post.objects.create(text='Котики', author=self.user)
+        reject([post.pk])
+
+        self.assertEqual(score([post.pk]), 0)
+        post.refresh_from_db()
+        self.assertFalse(post.is_valid)
+
+
+class RescoreCommandTest(TransactionTestCase):
+    """Команда закрывает соединения перед запуском процессов, без TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user')
+
+    def test_rescore_command_processes_backlog_in_parallel(self):
+        Post.objects.bulk_create(
+            Post(text=text, author=self.user)
+            for text in ['Котики'] * 5 + ['Казино'] * 3
+        )
+        out = StringIO()
+        call_command('rescore_posts', workers=2, batch_size=3, stdout=out)
+
+        self.assertIn('Оценено постов: 8, опубликовано: 5', out.getvalue())
+        self.assertEqual(pending_posts().count(), 3)
+        self.assertFalse(
+            Post.objects.filter(moderation_score=None).exists()
+        )
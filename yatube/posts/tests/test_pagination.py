@@ -0,0 +1,192 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Post
+from ..timeline import backfill, timeline_posts
+from ..utils import CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(text=f'text {num}', author=cls.user, is_valid=True)
+            for num in range(12)
+        )
+        # Одинаковое время публикации: порядок держится на id.
+        same_time = timezone.now()
+        Post.objects.filter(
+            pk__in=Post.objects.values('pk')[:6]
+        ).update(pub_date=same_time)
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, queryset, per_page=5):
+        paginator = CursorPaginator(queryset, per_page)
+        page = paginator.get_page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        return paginator, pages
+
+    def test_pages_follow_each_other_without_gaps(self):
+        _, pages = self.walk(Post.objects.all())
+
+        ids = [post.pk for page in pages for post in page]
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator, pages = self.walk(Post.objects.all())
+
+        page = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(page), list(pages[1]))
+        page = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(page), list(pages[0]))
+        self.assertFalse(page.has_previous())
+
+    def test_broken_cursor_opens_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+
+        page = paginator.get_page('not-a-cursor')
+
+        self.assertEqual([post.pk for post in page], self.expected[:5])
+
+    def test_null_cursor_opens_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        token = base64.urlsafe_b64encode(b'["n",[null,null]]').decode()
+
+        page = paginator.get_page(token)
+
+        self.assertEqual([post.pk for post in page], self.expected[:5])
+
+    def test_null_cursor_in_views_opens_first_page(self):
+        client = Client()
+        client.force_login(self.user)
+        token = base64.urlsafe_b64encode(b'["n",[null,null]]').decode()
+
+        for url in (
+            reverse('posts'),
+            reverse('profile', args=(self.user.username,)),
+            reverse('api:posts'),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url, {'cursor': token})
+                self.assertEqual(response.status_code, 200)
+
+    def test_timeline_is_paginated_by_its_own_keys(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        backfill(reader.pk, self.user.pk)
+
+        _, pages = self.walk(timeline_posts(reader), per_page=4)
+
+        ids = [post.pk for page in pages for post in page]
+        self.assertEqual(ids, self.expected)
+
+    def test_feed_views_use_cursor_and_keep_page_numbers(self):
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('profile', args=(self.user.username,))
+
+        response = client.get(url)
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertContains(response, '?cursor=')
+
+        response = client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(
+            [post.pk for post in response.context['page']], self.expected[10:]
+        )
+
+        response = client.get(url, {'page': 2})
+        self.assertIsInstance(response.context['page'], Page)
+        self.assertEqual(response.context['paginator'].count, 12)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentThreadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            text='Test post', author=cls.user, is_valid=True
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{num}'),
+                text=f'comment {num}'
+            )
+            for num in range(7)
+        )
+        # Одинаковое время: порядок держится на id.
+        Comment.objects.update(created=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def comments(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_thread_is_loaded_page_by_page(self):
+        """Первая страница — на странице поста, остальные — фрагментами."""
+        response = self.client.get(
+            reverse('post', args=(self.user.username, self.post.pk))
+        )
+        texts = self.comments(response)
+        fragment = reverse(
+            'post_comments', args=(self.user.username, self.post.pk)
+        )
+        page = response.context['comments']
+        while page.has_next():
+            self.assertContains(response, f'{fragment}?cursor=')
+            response = self.client.get(fragment, {'cursor': page.next_cursor})
+            self.assertTemplateUsed(response, 'includes/comment_items.html')
+            texts += self.comments(response)
+            page = response.context['comments']
+
+        self.assertEqual(texts, [f'comment {num}' for num in range(7)])
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_comment_authors_come_with_comments(self):
+        """Число запросов не зависит от числа комментариев на странице."""
+        url = reverse('post', args=(self.user.username, self.post.pk))
+        with self.settings(COMMENTS_PER_PAGE=1):
+            with CaptureQueriesContext(connection) as single:
+                self.client.get(url)
+        cache.clear()
+
+        with self.assertNumQueries(len(single)):
+            self.client.get(url)
+
+    def test_hidden_post_has_no_comment_fragment(self):
+        hidden = Post.objects.create(text='hidden', author=self.user)
+
+        response = self.client.get(
+            reverse('post_comments', args=(self.user.username, hidden.pk))
+        )
+
+        self.assertEqual(response.status_code, 404)
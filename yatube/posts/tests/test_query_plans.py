@@ -0,0 +1,127 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..moderation import pending_posts
+from ..timeline import backfill
+from ..utils import CursorPaginator
+
+User = get_user_model()
+
+# «SCAN posts_post» без «USING INDEX» — полный проход таблицы.
+TABLE_SCAN = re.compile(r'\bSCAN (TABLE )?\w+( AS \w+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент идут по индексам, без прохода и сортировки таблицы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Test group', slug='test-group', description='test'
+        )
+        Post.objects.bulk_create(
+            Post(
+                text=f'text {num}',
+                author=cls.user,
+                group=cls.group,
+                is_valid=True
+            )
+            for num in range(12)
+        )
+        Follow.objects.create(user=cls.user, author=cls.user)
+        backfill(cls.user.pk, cls.user.pk)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def feed_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        return response, [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'posts_post' in query['sql']
+        ]
+
+    def assert_uses_indexes(self, sql):
+        plan = self.explain(sql)
+        for step in plan:
+            self.assertIsNone(TABLE_SCAN.search(step), f'{step}\n{sql}')
+            self.assertNotIn('TEMP B-TREE', step, sql)
+
+    def test_feeds_use_indexes(self):
+        urls = (
+            reverse('posts'),
+            reverse('group', args=(self.group.slug,)),
+            reverse('profile', args=(self.user.username,)),
+            reverse('follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response, queries = self.feed_queries(url)
+                self.assertTrue(queries)
+                for sql in queries:
+                    self.assert_uses_indexes(sql)
+
+                cursor = response.context['page'].next_cursor
+                _, queries = self.feed_queries(url, {'cursor': cursor})
+                for sql in queries:
+                    self.assert_uses_indexes(sql)
+
+    def test_search_starts_from_term_index(self):
+        _, queries = self.feed_queries(reverse('search'), {'q': 'text'})
+
+        self.assertTrue(queries)
+        for sql in queries:
+            plan = self.explain(sql)
+            for step in plan:
+                self.assertIsNone(TABLE_SCAN.search(step), f'{step}\n{sql}')
+            self.assertNotIn('post_valid_date_idx', ' '.join(plan), sql)
+
+    def test_moderation_queue_uses_pending_index(self):
+        Post.objects.bulk_create(
+            Post(text=f'pending {num}', author=self.user) for num in range(3)
+        )
+        paginator = CursorPaginator(pending_posts(), 2)
+        with CaptureQueriesContext(connection) as context:
+            cursor = paginator.get_page().next_cursor
+            paginator.get_page(cursor)
+
+        for query in context.captured_queries:
+            plan = ' '.join(self.explain(query['sql']))
+            self.assertIn('post_pending_idx', plan, query['sql'])
+            self.assertNotIn('TEMP B-TREE', plan, query['sql'])
+
+    def test_comment_thread_uses_thread_index(self):
+        post = Post.objects.filter(author=self.user).first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text=f'comment {num}')
+            for num in range(3)
+        )
+        paginator = CursorPaginator(
+            Comment.objects.filter(post=post).order_by('created', 'id'), 2
+        )
+        with CaptureQueriesContext(connection) as context:
+            cursor = paginator.get_page().next_cursor
+            paginator.get_page(cursor)
+
+        for query in context.captured_queries:
+            plan = ' '.join(self.explain(query['sql']))
+            self.assertIn('comment_thread_idx', plan, query['sql'])
+            self.assertNotIn('TEMP B-TREE', plan, query['sql'])
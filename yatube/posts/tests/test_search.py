@@ -0,0 +1,160 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, SearchPosting
+from ..search import rebuild_index, search_posts
+from ..utils import CursorPaginator
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Test group', slug='test-group', description='test'
+        )
+        cls.cats = Post.objects.create(
+            text='Котики спят, котики едят', author=cls.author,
+            group=cls.group, is_valid=True
+        )
+        cls.cat = Post.objects.create(
+            text='Мой котик и собака', author=cls.other, is_valid=True
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки гуляют', author=cls.author, is_valid=True
+        )
+        cls.draft = Post.objects.create(text='Котики в черновике',
+                                        author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_word_forms_match_and_rank(self):
+        self.assertEqual(
+            list(search_posts('котиков')), [self.cats, self.cat]
+        )
+
+    def test_filters_by_group_and_author(self):
+        self.assertEqual(
+            list(search_posts('котик', group=self.group)), [self.cats]
+        )
+        self.assertEqual(
+            list(search_posts('котик', author=self.other)), [self.cat]
+        )
+
+    def test_comments_and_edits_are_indexed(self):
+        Comment.objects.create(post=self.dogs, author=self.other,
+                               text='Где котики?')
+        self.assertIn(self.dogs, search_posts('котики'))
+
+        self.cat.text = 'Только собака'
+        self.cat.save()
+        self.assertNotIn(self.cat, search_posts('котики'))
+
+    def test_all_query_words_must_match(self):
+        """Слова запроса объединяются через И."""
+        self.assertEqual(list(search_posts('котик собака')), [self.cat])
+
+    def test_comments_shift_weights_without_reindexing(self):
+        """Комментарий сдвигает веса своих слов, не перечитывая ветку."""
+        for num in range(5):
+            Comment.objects.create(
+                post=self.dogs, author=self.other, text=f'Собаки {num}'
+            )
+        weight = self.dogs.search_postings.get(term='собак').weight
+
+        with self.assertNumQueries(6) as context:
+            comment = Comment.objects.create(
+                post=self.dogs, author=self.other, text='Собаки и котики'
+            )
+
+        self.assertFalse(any(
+            'posts_comment' in query['sql'] and 'SELECT' in query['sql']
+            for query in context.captured_queries
+        ))
+        self.assertEqual(
+            self.dogs.search_postings.get(term='собак').weight, weight + 1
+        )
+        self.assertIn(self.dogs, search_posts('котики'))
+
+        # В TestCase транзакция не фиксируется: хук выполняется сразу.
+        with mock.patch(
+            'posts.signals.transaction.on_commit', lambda func: func()
+        ):
+            comment.delete()
+        self.assertNotIn(self.dogs, search_posts('котики'))
+        self.assertEqual(
+            self.dogs.search_postings.get(term='собак').weight, weight
+        )
+
+    def test_incremental_index_matches_rebuild(self):
+        """После правок и комментариев индекс совпадает с пересобранным."""
+        Comment.objects.create(post=self.cat, author=self.author,
+                               text='Котик хороший')
+        self.cat.text = 'Котик спит'
+        self.cat.save()
+        self.draft.is_valid = True
+        self.draft.save()
+
+        def postings():
+            return sorted(SearchPosting.objects.values_list(
+                'post_id', 'term', 'weight', 'published'
+            ))
+        incremental = postings()
+        rebuild_index()
+
+        self.assertEqual(incremental, postings())
+
+    def test_rebuild_index_restores_results(self):
+        self.assertEqual(rebuild_index(), 4)
+
+        # Равный вес: выше более новый пост.
+        self.assertEqual(list(search_posts('собака')), [self.dogs, self.cat])
+
+    def test_results_are_paginated_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(text=f'котик номер {num}', author=self.other, is_valid=True)
+            for num in range(5)
+        )
+        rebuild_index()
+        expected = list(search_posts('котик'))
+
+        paginator = CursorPaginator(search_posts('котик'), 3)
+        page = paginator.get_page()
+        ids = [post.pk for post in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            ids += [post.pk for post in page]
+
+        self.assertEqual(ids, [post.pk for post in expected])
+        self.assertEqual(len(ids), 7)
+
+    def test_search_page(self):
+        client = Client()
+        client.force_login(self.other)
+
+        response = client.get(
+            reverse('search'), {'q': 'собаки', 'author': 'author'}
+        )
+
+        self.assertEqual(list(response.context['page']), [self.dogs])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котики спят'}
+        )
+
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cats]
+        )
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from users.models import UserProfile
+
+from ..models import Follow, Like, Post, TimelineEntry
+from ..social import follow, like, unfollow, unlike
+
+User = get_user_model()
+
+JSON = {'HTTP_ACCEPT': 'application/json'}
+
+
+class SocialTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Test post', author=cls.author, is_valid=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def likes_count(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count
+
+    def test_like_and_unlike_are_idempotent(self):
+        """Повторный лайк и повторная отмена ничего не меняют."""
+        self.assertTrue(like(self.reader.pk, self.post.pk))
+        self.assertFalse(like(self.reader.pk, self.post.pk))
+        self.assertEqual(self.likes_count(), 1)
+
+        self.assertTrue(unlike(self.reader.pk, self.post.pk))
+        self.assertFalse(unlike(self.reader.pk, self.post.pk))
+        self.assertEqual(self.likes_count(), 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_hidden_post_cannot_be_liked(self):
+        """Лайк неопубликованному посту не ставится."""
+        hidden = Post.objects.create(text='hidden', author=self.author)
+
+        self.assertFalse(like(self.reader.pk, hidden.pk))
+        self.assertFalse(Like.objects.exists())
+
+    def test_follow_is_idempotent_and_skips_self(self):
+        """Подписка создаётся один раз, на себя — никогда."""
+        self.assertTrue(follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follow(self.reader.pk, self.reader.pk))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserProfile.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post
+        ).exists())
+
+        self.assertTrue(unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(unfollow(self.reader.pk, self.author.pk))
+        self.assertEqual(
+            UserProfile.objects.get(user=self.author).followers_count, 0
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_like_json_returns_new_count(self):
+        """В JSON-режиме вьюха отдаёт счётчик и ссылку на обратное действие."""
+        response = self.client.get(
+            reverse('post_like', args=(self.post.pk,)), **JSON
+        )
+
+        self.assertEqual(response.json(), {
+            'liked': True,
+            'likes_count': 1,
+            'url': reverse('post_unlike', args=(self.post.pk,)),
+        })
+
+        response = self.client.get(
+            reverse('post_unlike', args=(self.post.pk,)), **JSON
+        )
+        self.assertEqual(response.json()['likes_count'], 0)
+        self.assertFalse(response.json()['liked'])
+
+    def test_follow_json_returns_followers_count(self):
+        url = reverse('profile_follow', args=(self.author.username,))
+
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(response.json(), {
+            'following': True,
+            'followers_count': 1,
+            'url': reverse('profile_unfollow', args=(self.author.username,)),
+        })
+
+    def test_like_without_referer_redirects_to_index(self):
+        response = self.client.get(reverse('post_like', args=(self.post.pk,)))
+
+        self.assertRedirects(response, reverse('posts'))
+
+    def test_missing_targets_return_404(self):
+        self.assertEqual(
+            self.client.get(reverse('post_like', args=(999,)), **JSON)
+            .status_code,
+            404
+        )
+        self.assertEqual(
+            self.client.get(reverse('post_unlike', args=(999,))).status_code,
+            404
+        )
+        self.assertEqual(
+            self.client.get(reverse('profile_follow', args=('nobody',)))
+            .status_code,
+            404
+        )
+
+    def test_like_is_a_single_insert(self):
+        """Лайк — одна вставка и одно обновление счётчика (плюс savepoint)."""
+        with self.assertNumQueries(4):
+            like(self.reader.pk, self.post.pk)
+        with self.assertNumQueries(3):
+            like(self.reader.pk, self.post.pk)
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import PLACEHOLDERS, ready_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_new_post_pregenerates_thumbnail(self):
+        self.client.post(
+            reverse('new_post'), data={'text': 'text', 'image': uploaded()}
+        )
+
+        post = Post.objects.get()
+        self.assertIsNotNone(ready_thumbnail(post.image, 'post'))
+
+    def test_page_shows_placeholder_until_thumbnail_is_ready(self):
+        post = Post.objects.create(
+            text='text', author=self.user, image=uploaded('raw.gif'),
+            is_valid=True
+        )
+        url = reverse('post', args=(self.user.username, post.pk))
+
+        response = self.client.get(url)
+        self.assertContains(response, PLACEHOLDERS['post'])
+        self.assertIsNone(ready_thumbnail(post.image, 'post'))
+
+        out = StringIO()
+        call_command('pregenerate_thumbnails', stdout=out)
+        self.assertIn('Нарезано картинок: 1', out.getvalue())
+
+        response = self.client.get(url)
+        thumbnail = ready_thumbnail(post.image, 'post')
+        webp = ready_thumbnail(post.image, 'post', 'WEBP')
+        self.assertContains(response, thumbnail.url)
+        self.assertContains(response, f'<source srcset="{webp.url}"')
+        self.assertNotContains(response, PLACEHOLDERS['post'])
+
+    def test_update_user_pregenerates_avatar(self):
+        self.client.post(
+            reverse('update_user', args=(self.user.username,)),
+            data={'description': 'hi', 'avatar': uploaded('avatar.gif')}
+        )
+
+        self.user.profile.refresh_from_db()
+        self.assertIsNotNone(
+            ready_thumbnail(self.user.profile.avatar, 'avatar')
+        )
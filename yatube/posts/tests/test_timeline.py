@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..social import follow, unfollow
+from ..timeline import rebuild_timelines, timeline_posts
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            text='old', author=cls.author, is_valid=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self):
+        self.client.get(reverse('profile_follow', args=(self.author.username,)))
+
+    def test_follow_backfills_timeline(self):
+        self.follow()
+
+        self.assertEqual(list(timeline_posts(self.reader)), [self.old_post])
+
+    def test_published_post_fans_out_to_followers(self):
+        self.follow()
+        post = Post.objects.create(text='new', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        post.is_valid = True
+        post.save()
+
+        self.assertEqual(
+            list(timeline_posts(self.reader)), [post, self.old_post]
+        )
+
+    def test_unpublished_post_is_retracted(self):
+        self.follow()
+
+        self.old_post.is_valid = False
+        self.old_post.save()
+
+        self.assertEqual(list(timeline_posts(self.reader)), [])
+
+    def test_unfollow_trims_timeline(self):
+        self.follow()
+
+        self.client.get(
+            reverse('profile_unfollow', args=(self.author.username,))
+        )
+
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_follow_page_reads_timeline(self):
+        self.follow()
+
+        response = self.client.get(reverse('follow_index'))
+
+        self.assertEqual(list(response.context['page']), [self.old_post])
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_follow_page_size_comes_from_settings(self):
+        self.follow()
+        Post.objects.create(text='new', author=self.author, is_valid=True)
+
+        response = self.client.get(reverse('follow_index'))
+
+        self.assertEqual(len(response.context['page']), 1)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        self.follow()
+        post = Post.objects.create(
+            text='new', author=self.author, is_valid=True
+        )
+
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            list(timeline_posts(self.reader)), [post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_timelines_are_filled_when_author_drops_under_limit(self):
+        """Перестав быть «знаменитостью», автор попадает в ленты."""
+        other = User.objects.create_user(username='other')
+        follow(self.reader.pk, self.author.pk)
+        follow(other.pk, self.author.pk)
+        post = Post.objects.create(
+            text='new', author=self.author, is_valid=True
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        unfollow(other.pk, self.author.pk)
+
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader)
+                 .values_list('post', flat=True)),
+            [post.pk, self.old_post.pk]
+        )
+        self.assertEqual(
+            list(timeline_posts(self.reader)), [post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_BACKFILL=2)
+    def test_rebuild_keeps_recent_posts_of_each_author(self):
+        self.follow()
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        posts = [
+            Post.objects.create(text=str(num), author=author, is_valid=True)
+            for num in range(3) for author in (self.author, other)
+        ]
+        Post.objects.create(text='draft', author=other)
+
+        rebuild_timelines()
+
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('post', flat=True)),
+            {post.pk for post in posts[2:]}
+        )
@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from users.models import UserProfile
+
+from ..models import Comment, Follow, Group, Like, Post, TimelineEntry
+from ..search import search_posts
+from ..transfer import export_data, import_data
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        UserProfile.objects.filter(user=cls.author).update(
+            description='Пишу про котиков'
+        )
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+        cls.post = Post.objects.create(
+            text='Котики спят', author=cls.author, group=cls.group,
+            is_valid=True
+        )
+        cls.draft = Post.objects.create(text='Черновик', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Милота')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Like.objects.create(user=cls.reader, post=cls.post)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def reload(self, file_format):
+        """Выгружает базу, очищает её и загружает выгрузку обратно."""
+        counts = export_data(self.directory, file_format)
+        self.assertEqual(counts['posts'], 2)
+        self.original_date = Post.objects.get(text='Котики спят').pub_date
+        self.original_created = Comment.objects.get().created
+        for model in (Group, User, Post):
+            model.objects.all().delete()
+        return import_data(self.directory, file_format, batch_size=1)
+
+    def assert_restored(self):
+        post = Post.objects.get(text='Котики спят')
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.pub_date, self.original_date)
+        comment = post.comments.get()
+        self.assertEqual(comment.author.username, 'reader')
+        self.assertEqual(comment.created, self.original_created)
+        self.assertEqual(post.likes_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+        profile = UserProfile.objects.get(user__username='author')
+        self.assertEqual(profile.description, 'Пишу про котиков')
+        self.assertEqual(profile.posts_count, 1)
+        self.assertEqual(profile.followers_count, 1)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post', flat=True)),
+            [post.pk]
+        )
+        self.assertEqual(list(search_posts('котик')), [post])
+        self.assertFalse(Post.objects.get(text='Черновик').is_valid)
+
+    def test_ndjson_round_trip(self):
+        counts = self.reload('ndjson')
+
+        self.assertEqual(counts, {
+            'groups': 1, 'users': 2, 'posts': 2, 'comments': 1,
+            'follows': 1, 'likes': 1,
+        })
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        self.reload('csv')
+        self.assert_restored()
+
+    def test_import_into_non_empty_database(self):
+        export_data(self.directory)
+        Post.objects.filter(pk=self.draft.pk).delete()
+
+        counts = import_data(self.directory)
+
+        self.assertEqual(counts['users'], 2)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.filter(text='Котики спят').count(), 2)
+        self.assertEqual(Like.objects.count(), 2)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_orphans_of_skipped_posts_are_skipped(self):
+        """Без автора пропускаются его посты, их комментарии и лайки."""
+        export_data(self.directory)
+        path = os.path.join(self.directory, 'users.ndjson')
+        with open(path, encoding='utf-8') as source:
+            rows = [row for row in source if '"author"' not in row]
+        with open(path, 'w', encoding='utf-8') as output:
+            output.writelines(rows)
+        for model in (Group, User, Post):
+            model.objects.all().delete()
+
+        counts = import_data(self.directory)
+
+        self.assertEqual(
+            (counts['posts'], counts['comments'], counts['likes']), (0, 0, 0)
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Like.objects.exists())
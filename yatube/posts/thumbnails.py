@@ -0,0 +1,190 @@
+"""
+Заготовка миниатюр картинок в фоне.
+
+sorl.thumbnail режет картинку при первом рендере шаблона, и холодная
+страница с новыми картинками ждёт Pillow. Здесь миниатюры всех размеров
+из THUMBNAIL_GEOMETRIES готовятся заранее: вьюхи ставят задачу в пул
+потоков, а шаблон до её завершения показывает заглушку.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics
+from users.models import UserProfile
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEOMETRIES = {
+    'post': [
+        ('960x339', {'crop': 'center', 'upscale': True}),
+        ('960x339', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+    ],
+    'avatar': [
+        ('960x960', {'crop': 'center', 'upscale': True}),
+        ('960x960', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+    ],
+}
+# Что показать, пока миниатюра не готова (путь в static).
+PLACEHOLDERS = {
+    'post': 'image/placeholder.svg',
+    'avatar': 'image/avatar-placeholder.svg',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def geometries(kind):
+    return getattr(settings, 'THUMBNAIL_GEOMETRIES', DEFAULT_GEOMETRIES)[kind]
+
+
+def workers():
+    """Сколько потоков режут картинки; 0 — резать сразу в запросе."""
+    return getattr(settings, 'THUMBNAIL_WORKERS', 2)
+
+
+def queue_depth():
+    """Сколько задач ещё ждут или выполняются в этом процессе."""
+    return _pending
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def _variant(kind, image_format):
+    for geometry, options in geometries(kind):
+        if options.get('format') == image_format:
+            return geometry, dict(options)
+    return None
+
+
+def ready_thumbnail(file_, kind, image_format=None):
+    """
+    Готовая миниатюра или None, если её ещё не нарезали.
+
+    image_format выбирает вариант размера (например, 'WEBP'); без него
+    берётся основной. Повторяет расчёт имени из
+    ThumbnailBackend.get_thumbnail, но только спрашивает kvstore и никогда
+    не открывает исходник.
+    """
+    variant = _variant(kind, image_format)
+    if not file_ or variant is None:
+        return None
+    geometry, options = variant
+    backend = default.backend
+    source = ImageFile(file_)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def all_ready(file_, kind):
+    return all(
+        ready_thumbnail(file_, kind, options.get('format')) is not None
+        for _, options in geometries(kind)
+    )
+
+
+def pregenerate(file_, kind):
+    """Нарезает все размеры картинки. Возвращает True, если всё удалось."""
+    try:
+        for geometry, options in geometries(kind):
+            get_thumbnail(file_, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось нарезать миниатюры %s', file_)
+        return False
+    return True
+
+
+def _post_job(post_id, name):
+    if pregenerate(name, 'post'):
+        # Карточка могла закэшироваться с заглушкой — меняем её версию.
+        Post.objects.filter(pk=post_id, image=name).update(
+            card_version=F('card_version') + 1
+        )
+
+
+def _avatar_job(profile_id, name):
+    pregenerate(name, 'avatar')
+
+
+def _change_pending(delta):
+    global _pending
+    with _pending_lock:
+        _pending += delta
+        metrics.set_gauge('yatube_thumbnail_queue_depth', _pending)
+
+
+def _run(job, *args):
+    try:
+        job(*args)
+    finally:
+        _change_pending(-1)
+        if workers():
+            close_old_connections()
+
+
+def _submit(job, *args):
+    _change_pending(1)
+    if workers():
+        _get_executor().submit(_run, job, *args)
+    else:
+        _run(job, *args)
+
+
+def _enqueue(job, pk, field_file):
+    if not field_file:
+        return
+    name = field_file.name
+    if not workers():
+        _submit(job, pk, name)
+        return
+    # Поток не увидит строку, пока транзакция запроса не зафиксирована.
+    transaction.on_commit(lambda: _submit(job, pk, name))
+
+
+def enqueue_post(post):
+    _enqueue(_post_job, post.pk, post.image)
+
+
+def enqueue_avatar(profile):
+    _enqueue(_avatar_job, profile.pk, profile.avatar)
+
+
+def pending_images():
+    """Картинки постов и аватары, для которых ещё нет миниатюр."""
+    posts = Post.objects.exclude(image='').exclude(image=None)
+    for post in posts.only('pk', 'image').iterator():
+        if not all_ready(post.image, 'post'):
+            yield _post_job, post.pk, post.image.name
+    profiles = UserProfile.objects.exclude(avatar='').exclude(avatar=None)
+    for profile in profiles.only('pk', 'avatar').iterator():
+        if not all_ready(profile.avatar, 'avatar'):
+            yield _avatar_job, profile.pk, profile.avatar.name
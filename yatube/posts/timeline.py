@@ -0,0 +1,159 @@
+"""
+Лента подписок с раскладкой при записи (fan-out on write).
+
+Опубликованный пост сразу раскладывается в TimelineEntry всех подписчиков
+автора, поэтому чтение /follow/ — один проход по индексу
+(user, -pub_date, -post). Посты авторов, у которых подписчиков больше
+TIMELINE_FANOUT_LIMIT, не раскладываются: их ленты добирают при чтении.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, IntegerField, Q, Value, Window
+from django.db.models.functions import RowNumber
+
+from core.sql import insert_select
+from users.models import UserProfile
+
+from .models import Follow, Post, TimelineEntry
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def backfill_size():
+    return getattr(settings, 'TIMELINE_BACKFILL', 200)
+
+
+def fan_out(post):
+    """Раскладывает только что опубликованный пост по лентам подписчиков."""
+    fan_out_many([post.pk])
+
+
+def retract(post):
+    """Убирает пост из всех лент, например когда его сняли с публикации."""
+    TimelineEntry.objects.filter(post_id=post.pk).delete()
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id,
+        is_valid=True,
+        author__profile__followers_count__lte=fanout_limit(),
+    ).order_by('-pub_date', '-id')[:backfill_size()]
+    _insert_entries(posts, Value(user_id, output_field=IntegerField()))
+
+
+def author_unfollowed(author_id):
+    """
+    Раскладывает посты автора, который перестал быть «знаменитостью».
+
+    Пока подписчиков было больше TIMELINE_FANOUT_LIMIT, его посты не
+    попадали в ленты. Теперь ленты его подписчиков читаются без добора,
+    поэтому последние посты автора раскладываются им при переходе
+    через порог.
+    """
+    if not UserProfile.objects.filter(
+        user_id=author_id, followers_count=fanout_limit()
+    ).exists():
+        return
+    recent = Post.objects.filter(
+        author_id=author_id, is_valid=True
+    ).order_by('-pub_date', '-id')[:backfill_size()]
+    _insert_for_followers(Post.objects.filter(pk__in=recent.values('pk')))
+
+
+def trim(user_id, author_id):
+    """Чистит ленту от постов автора, от которого пользователь отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def timeline_posts(user):
+    """
+    Посты ленты подписок пользователя от новых к старым.
+
+    Если пользователь не подписан на «знаменитостей», лента целиком
+    читается из TimelineEntry; иначе их посты добираются при чтении.
+    """
+    celebrities = Follow.objects.filter(
+        user=user, author__profile__followers_count__gt=fanout_limit()
+    ).values('author')
+    if not celebrities.exists():
+        # F() берёт post_id из самой записи ленты, а не сортировку Post,
+        # так что порядок целиком совпадает с индексом.
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            F('timeline_entries__pub_date').desc(),
+            F('timeline_entries__post').desc()
+        )
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=celebrities, is_valid=True)
+    ).order_by('-pub_date', '-id')
+
+
+def _insert_entries(posts, reader):
+    """
+    Вставляет записи лент одним INSERT ... SELECT.
+
+    reader — выражение над posts с id подписчика. Уже существующие
+    записи пропускаются.
+    """
+    return insert_select(
+        TimelineEntry, posts,
+        user=reader, post='pk', author='author', pub_date='pub_date'
+    )
+
+
+def _insert_for_followers(posts):
+    return _insert_entries(
+        posts.filter(
+            author__following__isnull=False,
+            author__profile__followers_count__lte=fanout_limit(),
+        ).order_by(),
+        F('author__following__user'),
+    )
+
+
+def fan_out_many(post_ids):
+    """Раскладывает пачку опубликованных постов по лентам одним запросом."""
+    _insert_for_followers(Post.objects.filter(pk__in=post_ids))
+
+
+def retract_many(post_ids):
+    TimelineEntry.objects.filter(post_id__in=post_ids).delete()
+
+
+def rebuild_timelines():
+    """
+    Собирает все ленты заново из подписок и опубликованных постов.
+
+    Это один INSERT ... SELECT: построчный backfill() на каждую подписку
+    создаёт сотни тысяч объектов TimelineEntry в Python.
+    """
+    TimelineEntry.objects.all().delete()
+    # Номер поста среди постов автора считается одним проходом оконной
+    # функции; коррелированный подзапрос на каждый пост растёт
+    # квадратично у плодовитых авторов.
+    ranked = Post.objects.filter(is_valid=True).annotate(
+        rank=Window(
+            RowNumber(),
+            partition_by=[F('author')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).order_by().values('pk', 'rank')
+    sql, params = ranked.query.sql_with_params()
+    post_id = '{}.{}'.format(
+        connection.ops.quote_name(Post._meta.db_table),
+        connection.ops.quote_name('id'),
+    )
+    # pk__in=RawSQL(...) даёт «IN ((SELECT ...))», то есть скалярный
+    # подзапрос, поэтому условие пишется через extra().
+    recent = Post.objects.filter(is_valid=True).extra(
+        where=[
+            f'{post_id} IN (SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.rank <= %s)'
+        ],
+        params=[*params, backfill_size()],
+    )
+    _insert_for_followers(recent)
@@ -9,6 +9,8 @@ urlpatterns = [
     path('new/', views.new_post, name='new_post'),
     
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('moderation/', views.moderation, name='moderation'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -16,6 +18,9 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path('<str:username>/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('<str:username>/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
@@ -1,8 +1,228 @@
+import base64
+import binascii
+import datetime
+import json
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+
+from core.caching import generation, get_or_compute
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def _json_value(value):
+    # DjangoJSONEncoder обрезает время до миллисекунд, а курсору нужна
+    # точность до микросекунды, иначе соседние посты сольются.
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} нельзя положить в курсор')
 
 
 def paginate_page(request, post_list):
     paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)
+
+
+def feed_key(name):
+    """Ключ кэша первой страницы ленты; сбрасывается при публикации."""
+    return f'feed:{name}:{generation("feed")}'
+
+
+def paginate(request, queryset, per_page, first_page_key=None):
+    """
+    Постраничный вывод ленты.
+
+    По умолчанию страницы листаются курсором (?cursor=), без COUNT(*)
+    и OFFSET. Старые ссылки вида ?page=N открываются постраничным
+    Paginator, если там действительно нужно общее число записей.
+    """
+    if 'page' in request.GET and 'cursor' not in request.GET:
+        paginator = Paginator(queryset, per_page)
+        return paginator.get_page(request.GET.get('page')), paginator
+    paginator = CursorPaginator(queryset, per_page, first_page_key)
+    return paginator.get_page(request.GET.get('cursor')), paginator
+
+
+class CursorPaginator:
+    """
+    Пагинация по ключу сортировки (keyset).
+
+    Ключ берётся из order_by() выборки, он должен однозначно упорядочивать
+    строки, например ('-pub_date', '-id'). Страница выбирается условием
+    «строго после курсора» по этому ключу, поэтому глубина страницы не
+    влияет на стоимость запроса.
+
+    Если передан first_page_key, ids первой страницы, одной на всех
+    читателей, берутся из кэша; сами строки всё равно читаются свежими.
+    """
+
+    def __init__(self, queryset, per_page, first_page_key=None):
+        self.per_page = int(per_page)
+        self.first_page_key = first_page_key
+        self.keys = self._keys(queryset)
+        self.queryset = queryset.annotate(**{
+            name: F(path) for name, path, _ in self.keys
+        })
+
+    @staticmethod
+    def _keys(queryset):
+        ordering = queryset.query.order_by
+        if not ordering and queryset.query.default_ordering:
+            ordering = queryset.model._meta.ordering
+        if not ordering:
+            raise ValueError('CursorPaginator требует явный order_by()')
+        keys = []
+        for position, item in enumerate(ordering):
+            if isinstance(item, OrderBy):
+                path, descending = item.expression.name, item.descending
+            else:
+                path, descending = item.lstrip('-'), item.startswith('-')
+            if path == 'pk':
+                path = queryset.model._meta.pk.name
+            keys.append((f'cursor_key_{position}', path, descending))
+        return keys
+
+    @cached_property
+    def count(self):
+        """Общее число записей; считается, только если его спросили."""
+        return self.queryset.count()
+
+    def encode(self, direction, obj):
+        values = [getattr(obj, name) for name, _, _ in self.keys]
+        raw = json.dumps([direction, values], default=_json_value)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, token):
+        padded = token + '=' * (-len(token) % 4)
+        try:
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.keys):
+                raise ValueError(values)
+            annotations = self.queryset.query.annotations
+            values = [
+                annotations[name].output_field.to_python(value)
+                for (name, _, _), value in zip(self.keys, values)
+            ]
+            # NULL в ключе сравнить нельзя: такой курсор только подделка.
+            if None in values:
+                raise ValueError(values)
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            return None
+        return direction, values
+
+    def _after(self, values, reverse=False):
+        # (k1, k2) > (v1, v2) раскладывается в
+        # k1 >= v1 AND (k1 > v1 OR (k1 = v1 AND k2 > v2)),
+        # чтобы первое условие сужало проход по индексу.
+        condition = None
+        for index in reversed(range(len(self.keys))):
+            name, _, descending = self.keys[index]
+            lookup = 'lt' if descending != reverse else 'gt'
+            strict = Q(**{f'{name}__{lookup}': values[index]})
+            if condition is None:
+                condition = strict
+            else:
+                condition = strict | (
+                    Q(**{name: values[index]}) & condition
+                )
+        name, _, descending = self.keys[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def _ordering(self, reverse=False):
+        return [
+            F(name).desc() if descending != reverse else F(name).asc()
+            for name, _, descending in self.keys
+        ]
+
+    def _first_rows(self):
+        ordered = self.queryset.order_by(*self._ordering())
+        if self.first_page_key is None:
+            return list(ordered[:self.per_page + 1])
+        ids = get_or_compute(
+            self.first_page_key,
+            lambda: list(
+                ordered.values_list('pk', flat=True)[:self.per_page + 1]
+            ),
+            settings.FEED_CACHE_TIMEOUT
+        )
+        # Порядок уже известен из кэша, сортировать в базе незачем.
+        rows = {row.pk: row for row in self.queryset.filter(pk__in=ids)}
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def get_page(self, token=None):
+        cursor = self.decode(token) if token else None
+        if cursor is None:
+            rows = self._first_rows()
+            return CursorPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+
+        direction, values = cursor
+        reverse = direction == PREVIOUS
+        rows = list(
+            self.queryset.filter(self._after(values, reverse))
+            .order_by(*self._ordering(reverse))[:self.per_page + 1]
+        )
+        extra = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=extra)
+        return CursorPage(rows, self, has_next=extra, has_previous=True)
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode(NEXT, self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode(PREVIOUS, self.object_list[0])
@@ -1,47 +1,112 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User, Like
+from . import likebuffer
+from .counters import change_post_counter
+from .etags import page_etag, post_etag, tag_page, tag_post
+from .forms import CommentForm, PostForm, SearchForm
+from .moderation import approve, enqueue_score, pending_posts, reject
+from .models import Comment, Follow, Group, Post, User
+from .search import search_posts
+from .social import follow, like, unfollow, unlike
+from .thumbnails import enqueue_avatar, enqueue_post
+from .timeline import timeline_posts
+from .utils import CursorPaginator, feed_key, paginate
 import random
 
+from core.caching import (
+    cache_anonymous_page, conditional_page, get_or_compute
+)
 from users.forms import UpdateForm
+from users.models import UserProfile
 
 
+FEED_PER_PAGE = 5
+PROFILE_PER_PAGE = 10
+
+
+@method_decorator(
+    cache_anonymous_page(settings.PAGE_CACHE_TIMEOUT), name='dispatch'
+)
 class IndexView(TemplateView):
     template_name = 'index.html'
 
+
+def _posts_etag(request):
+    return page_etag(
+        request, Post.objects.filter(is_valid=True), FEED_PER_PAGE,
+        feed_key('posts')
+    )
+
+
 @login_required
+@conditional_page(_posts_etag)
 def posts(request):
-    post_list = Post.objects.select_related('group').filter(is_valid=True)
-    paginator = Paginator(post_list, 5)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    post_list = Post.objects.filter(is_valid=True).with_likes(request.user)
+    page, paginator = paginate(
+        request, post_list, FEED_PER_PAGE, feed_key('posts')
+    )
+    response = render(
         request,
         'posts.html',
         {'page': page, 'paginator': paginator}
     )
+    return tag_page(response, request, page)
+
+
+def _group_id(slug, group=None):
+    """
+    id группы по slug из кэша: так 304 не тратит на него запрос.
+
+    Страница группы передаёт загруженную группу и лишь заполняет кэш.
+    """
+    def producer():
+        if group is not None:
+            return group.pk
+        return Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+
+    return get_or_compute(
+        feed_key(f'group-id:{slug}'), producer, settings.FEED_CACHE_TIMEOUT
+    )
+
+
+def _group_etag(request, slug):
+    # Ключ кэша первой страницы тот же, что у group_posts: иначе ETag
+    # сверялся бы со свежей выборкой, а страница — с закэшированной.
+    group_id = _group_id(slug)
+    if group_id is None:
+        return None
+    return page_etag(
+        request, Post.objects.filter(is_valid=True, group_id=group_id),
+        FEED_PER_PAGE, feed_key(f'group:{group_id}')
+    )
+
 
 @login_required
+@conditional_page(_group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.filter(is_valid=True)
-    paginator = Paginator(posts, 5)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    _group_id(slug, group)
+    posts = group.posts.filter(is_valid=True).with_likes(request.user)
+    page, paginator = paginate(
+        request, posts, FEED_PER_PAGE, feed_key(f'group:{group.pk}')
+    )
 
-    return render(
+    response = render(
         request,
         'group.html',
         {'group': group, 'page': page, 'paginator': paginator}
     )
+    return tag_page(response, request, page)
 
 
 @login_required
@@ -61,19 +126,29 @@ def new_post(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
-
+    enqueue_post(post)
+    enqueue_score(post)
 
     return redirect('posts')
 
+def _profile_etag(request, username):
+    return page_etag(
+        request,
+        Post.objects.filter(is_valid=True, author__username=username),
+        PROFILE_PER_PAGE,
+        with_author=True,
+    )
+
+
 @login_required
+@conditional_page(_profile_etag)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-
-    posts = user.posts.filter(is_valid=True)
-    paginator = Paginator(posts, 10)
+    user = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
 
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = user.posts.filter(is_valid=True).with_likes(request.user)
+    page, paginator = paginate(request, posts, PROFILE_PER_PAGE)
 
     form = CommentForm()
     is_edit_profile = user == request.user
@@ -85,7 +160,7 @@ def profile(request, username):
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=user
     ).exists()
-    return render(
+    response = render(
         request,
         'profile.html',
         {
@@ -99,22 +174,71 @@ def profile(request, username):
             'time_here': time_here
         }
     )
+    return tag_page(response, request, page, user, following)
+
+
+def _post_etag(request, username, post_id):
+    return post_etag(
+        request,
+        Post.objects.filter(
+            pk=post_id, is_valid=True, author__username=username
+        )
+    )
+
 
 @login_required
+@conditional_page(_post_etag)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, is_valid=True, author__username=username)
-    posts_count = post.author.posts.filter(is_valid=True).count()
+    post = get_object_or_404(
+        Post.objects.with_likes(request.user).select_related(
+            'author__profile'
+        ),
+        pk=post_id,
+        is_valid=True,
+        author__username=username
+    )
+    posts_count = post.author.profile.posts_count
     form = CommentForm()
-    return render(
+    response = render(
         request,
         'post.html',
         {
             'post': post,
             'author': post.author,
             'posts_count': posts_count,
+            'comments': _comment_page(request, post.pk),
             'form': form
         }
     )
+    return tag_post(response, request, post)
+
+
+def _comment_page(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'text', 'created', 'author', 'author__username'
+    ).order_by('created', 'id')
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@login_required
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев — HTML-фрагмент для подгрузки."""
+    if not Post.objects.filter(
+        pk=post_id, is_valid=True, author__username=username
+    ).exists():
+        raise Http404
+    return render(
+        request,
+        'includes/comment_items.html',
+        {
+            'comments': _comment_page(request, post_id),
+            'username': username,
+            'post_id': post_id,
+        }
+    )
 
 
 @login_required
@@ -128,6 +252,10 @@ def post_edit(request, username, post_id):
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            enqueue_post(post)
+        if 'text' in form.changed_data:
+            enqueue_score(post)
         return redirect('post', post_id=post_id, username=username)
 
     return render(
@@ -145,7 +273,9 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            change_post_counter(post.pk, 'comments_count', 1)
     return redirect('post', post_id=post_id, username=username)
 
 
@@ -154,7 +284,9 @@ def update_user(request, username):
     author = get_object_or_404(User, username=username)
     form = UpdateForm(request.POST, request.FILES, instance=author.profile)
     if form.is_valid():
-        form.save()
+        profile = form.save()
+        if 'avatar' in form.changed_data:
+            enqueue_avatar(profile)
     return redirect('profile', username=username)
 
 
@@ -166,13 +298,54 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@staff_member_required
+def moderation(request):
+    if request.method == 'POST':
+        action = {'approve': approve, 'reject': reject}.get(
+            request.POST.get('action')
+        )
+        ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+        if action is not None and ids:
+            action(ids)
+        return redirect(request.get_full_path())
+
+    posts = pending_posts().select_related('author', 'group')
+    page, paginator = paginate(request, posts, 50)
+    return render(
+        request,
+        'moderation.html',
+        {'page': page, 'paginator': paginator}
+    )
+
+
 @login_required
-def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user, is_valid=True)
-    paginator = Paginator(posts, 10)
+def search(request):
+    form = SearchForm(request.GET or None)
+    page = paginator = None
+    if form.is_valid():
+        author = None
+        if form.cleaned_data['author']:
+            author = get_object_or_404(
+                User, username=form.cleaned_data['author']
+            )
+        posts = search_posts(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=author,
+        ).with_likes(request.user)
+        page, paginator = paginate(request, posts, 10)
+
+    return render(
+        request,
+        'search.html',
+        {'form': form, 'page': page, 'paginator': paginator}
+    )
 
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+
+@login_required
+def follow_index(request):
+    posts = timeline_posts(request.user).with_likes(request.user)
+    page, paginator = paginate(request, posts, settings.POSTS_PER_PAGE)
 
     return render(
         request,
@@ -184,44 +357,88 @@ def follow_index(request):
     )
 
 
-@login_required
-def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if (
-            Follow.objects.filter(author=author, user=request.user).exists()
-            or request.user == author
-    ):
+def _wants_json(request):
+    return (
+        request.is_ajax()
+        or 'application/json' in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def _back(request, fallback):
+    referer = request.META.get('HTTP_REFERER')
+    if not referer:
+        return redirect(fallback)
+    return HttpResponseRedirect('/' + '/'.join(referer.split('/')[3:]))
+
+
+def _author_id(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        raise Http404
+    return author_id
+
+
+def _follow_response(request, username, author_id, following):
+    if not _wants_json(request):
         return redirect('profile', username=username)
-    Follow.objects.create(author=author, user=request.user)
+    action = 'profile_unfollow' if following else 'profile_follow'
+    return JsonResponse({
+        'following': following,
+        'followers_count': UserProfile.objects.filter(
+            user_id=author_id
+        ).values_list('followers_count', flat=True).first() or 0,
+        'url': reverse(action, args=(username,)),
+    })
 
-    return redirect('profile', username=username)
+
+@login_required
+def profile_follow(request, username):
+    author_id = _author_id(username)
+    follow(request.user.pk, author_id)
+    return _follow_response(
+        request, username, author_id,
+        following=author_id != request.user.pk
+    )
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    follow_qs = Follow.objects.filter(author=author, user=request.user)
-    if follow_qs.exists():
-        follow_qs.delete()
-
-    return redirect('profile', username=username)
+    author_id = _author_id(username)
+    unfollow(request.user.pk, author_id)
+    return _follow_response(request, username, author_id, following=False)
+
+
+def _like_response(request, post_id, created, liked):
+    if not _wants_json(request):
+        # Лайк уже стоял: проверяем, что пост вообще есть.
+        if not created and not Post.objects.filter(
+            pk=post_id, is_valid=True
+        ).exists():
+            raise Http404
+        return _back(request, 'posts')
+    likes_count = Post.objects.filter(
+        pk=post_id, is_valid=True
+    ).values_list('likes_count', flat=True).first()
+    if likes_count is None:
+        raise Http404
+    likes_count += likebuffer.pending([post_id]).get(post_id, 0)
+    action = 'post_unlike' if liked else 'post_like'
+    return JsonResponse({
+        'liked': liked,
+        'likes_count': likes_count,
+        'url': reverse(action, args=(post_id,)),
+    })
 
 
 @login_required
 def post_like(request, post_id):
-    url = '/'+'/'.join(request.META.get('HTTP_REFERER').split('/')[3:])
-    post = get_object_or_404(Post, pk=post_id, is_valid=True)
-    Like.objects.get_or_create(post=post, user=request.user)
-    return HttpResponseRedirect(url)
+    created = like(request.user.pk, post_id)
+    return _like_response(request, post_id, created, liked=True)
 
 
 @login_required
 def post_unlike(request, post_id):
-    url = '/'+'/'.join(request.META.get('HTTP_REFERER').split('/')[3:])
-    post = get_object_or_404(Post, pk=post_id, is_valid=True)
-    like_qs = Like.objects.filter(post=post, user=request.user)
-    print(like_qs)
-    if like_qs.exists():
-        like_qs.delete()
-
-    return HttpResponseRedirect(url)
\ No newline at end of file
+    deleted = unlike(request.user.pk, post_id)
+    return _like_response(request, post_id, deleted, liked=False)
@@ -0,0 +1,65 @@
+/*
+ * Лайки и подписки без перезагрузки страницы: ссылка запрашивается
+ * с Accept: application/json, а ответ обновляет счётчик и саму ссылку.
+ * Следующие комментарии поста подгружаются HTML-фрагментом на место
+ * кнопки «Показать ещё». Без JavaScript ссылки ведут на обычные страницы.
+ */
+document.addEventListener('click', function (event) {
+    var link = event.target.closest('.js-more-comments a');
+    if (!link || event.ctrlKey || event.metaKey) {
+        return;
+    }
+    event.preventDefault();
+    var more = link.parentNode;
+    fetch(link.dataset.fragment, {credentials: 'same-origin'})
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.text();
+        })
+        .then(function (html) {
+            more.insertAdjacentHTML('beforebegin', html);
+            more.remove();
+        })
+        .catch(function () {
+            window.location = link.href;
+        });
+});
+
+document.addEventListener('click', function (event) {
+    var link = event.target.closest('a.js-like, a.js-follow');
+    if (!link || event.ctrlKey || event.metaKey) {
+        return;
+    }
+    event.preventDefault();
+    fetch(link.href, {
+        credentials: 'same-origin',
+        headers: {
+            'Accept': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.status);
+        }
+        return response.json();
+    }).then(function (data) {
+        link.href = data.url;
+        if (link.classList.contains('js-like')) {
+            link.querySelector('.js-count').textContent = data.likes_count;
+            link.querySelector('img').style.filter =
+                data.liked ? '' : 'hue-rotate(-60deg)';
+            return;
+        }
+        link.textContent = data.following ? 'Отписаться' : 'Подписаться';
+        link.classList.toggle('my-btn', data.following);
+        link.classList.toggle('my-btn-2', !data.following);
+        var followers = document.querySelector('.js-followers');
+        if (followers) {
+            followers.textContent = data.followers_count;
+        }
+    }).catch(function () {
+        window.location = link.href;
+    });
+});
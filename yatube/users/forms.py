@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
 
+from core.images import normalize_image
+
 from .models import UserProfile
 
 User = get_user_model()
@@ -16,4 +18,7 @@ class CreationForm(UserCreationForm):
 class UpdateForm(forms.ModelForm):
     class Meta:
         model = UserProfile
-        fields = ('description', 'avatar')
\ No newline at end of file
+        fields = ('description', 'avatar')
+
+    def clean_avatar(self):
+        return normalize_image(self.cleaned_data['avatar'])
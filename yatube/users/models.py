@@ -7,4 +7,6 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, related_name='profile', on_delete=models.CASCADE, null=True)
     avatar = models.ImageField(upload_to='avatar/', blank=True, null=True)
     description = models.TextField(blank=True)
-    
\ No newline at end of file
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
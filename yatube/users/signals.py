@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import User, UserProfile
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    """У каждого пользователя есть профиль: в нём хранятся счётчики."""
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
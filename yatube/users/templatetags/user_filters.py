@@ -1,5 +1,8 @@
 from django import template
+from django.templatetags.static import static
+from posts.fragments import render_cards
 from posts.models import Like
+from posts.thumbnails import PLACEHOLDERS, ready_thumbnail
 
 register = template.Library()
 
@@ -11,8 +14,51 @@ def addclass(field, css):
 
 @register.simple_tag
 def is_like(post, user):
+    """Берёт отметку из Post.objects.with_likes(), не обращаясь к базе."""
+    if hasattr(post, 'liked_by_user'):
+        return post.liked_by_user
     return Like.objects.filter(post=post, user=user).exists()
 
+
 @register.simple_tag
 def count_like(post):
-    return Like.objects.filter(post=post).count()
\ No newline at end of file
+    """Берёт число лайков из Post.objects.with_likes(), не обращаясь к базе."""
+    if hasattr(post, 'like_count'):
+        return post.like_count
+    return Like.objects.filter(post=post).count()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """Ссылка на страницу ленты по курсору с сохранением остальных GET."""
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    query['cursor'] = cursor
+    return f'?{query.urlencode()}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов: общая часть из кэша, кнопки читателя — заново."""
+    return render_cards(posts, context.get('user'))
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    return render_cards([post], context.get('user'))
+
+
+@register.simple_tag
+def thumbnail_url(image, kind, image_format=None):
+    """
+    Адрес готовой миниатюры.
+
+    Пока её режут в фоне, основной вариант заменяется заглушкой, а для
+    дополнительных форматов возвращается пустая строка.
+    """
+    thumbnail = ready_thumbnail(image, kind, image_format)
+    if thumbnail is not None:
+        return thumbnail.url
+    if image_format is None:
+        return static(PLACEHOLDERS[kind])
+    return ''
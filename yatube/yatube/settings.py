@@ -1,19 +1,39 @@
 import os
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-SECRET_KEY = '+)c#h7#@ex^ihc5-8w7zifyx012!)x)-*_ucam8$1_f2+0$t*k'
+# Окружение выбирается переменной YATUBE_ENV: development (по умолчанию)
+# или production. В production DEBUG выключен, ключ и хосты берутся из
+# YATUBE_SECRET_KEY и YATUBE_ALLOWED_HOSTS, шаблоны компилируются один
+# раз на процесс, сессии читаются из кэша, соединения с базой живут
+# дольше запроса, а статика отдаётся собранной (core.staticfiles).
+# Отладочную конфигурацию в production не пропустит core.checks.
+ENVIRONMENT = os.environ.get('YATUBE_ENV', 'development')
+PRODUCTION = ENVIRONMENT == 'production'
 
-DEBUG = True
+SECRET_KEY = os.environ.get(
+    'YATUBE_SECRET_KEY',
+    '' if PRODUCTION else '+)c#h7#@ex^ihc5-8w7zifyx012!)x)-*_ucam8$1_f2+0$t*k'
+)
+
+DEBUG = os.environ.get('YATUBE_DEBUG', '' if PRODUCTION else '1') == '1'
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = [
+    host for host in os.environ.get(
+        'YATUBE_ALLOWED_HOSTS', '' if PRODUCTION else '*'
+    ).split(',') if host
+]
 
 
 INSTALLED_APPS = [
-    'users',
-    'posts',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
     'about',
+    'api',
+    'core.apps.CoreConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -24,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.staticfiles.StaticFilesMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,7 +60,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером рендера для профилирования.
+        'BACKEND': 'core.backends.templates.ProfiledDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -51,22 +74,132 @@ TEMPLATES = [
         },
     },
 ]
+if PRODUCTION:
+    # Шаблоны templates/ и приложений читаются и разбираются один раз.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
+# Общий для всех процессов кэш выбирается переменной окружения
+# YATUBE_CACHE: locmem (по умолчанию), file или redis (django-redis
+# из requirements.txt).
+# Тесты всегда идут на locmem.
+CACHE_PROFILES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'
+        ),
+        'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+    },
+}
+# manage.py test узнаётся по аргументам; pytest запускает тесты
+# с yatube.settings_test, который ставит YATUBE_TESTING.
+TESTING = (
+    sys.argv[1:2] == ['test'] or os.environ.get('YATUBE_TESTING') == '1'
+)
+CACHE_PROFILE = 'locmem' if TESTING else os.environ.get(
+    'YATUBE_CACHE', 'locmem'
+)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_PROFILES[CACHE_PROFILE],
+        'KEY_PREFIX': 'yatube',
     }
 }
 
+# Первая страница общей ленты и лент групп: ids постов держатся в кэше
+# и сбрасываются при публикации, так что это лишь страховка.
+FEED_CACHE_TIMEOUT = 30
+# Полустатичные страницы для анонимов (лендинг, «об авторе»).
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Карточки постов версионируются, поэтому их можно держать долго.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
-DATABASES = {
-    'default': {
+# База выбирается переменной окружения YATUBE_DB: sqlite (по умолчанию),
+# sqlite-tuned или postgres (нужен psycopg2). Параметры подключения
+# задаются переменными YATUBE_DB_NAME, _USER, _PASSWORD, _HOST, _PORT.
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+    },
+    # WAL: читатели не ждут писателя, а писатели ждут замка до
+    # busy_timeout вместо ошибки «database is locked». PRAGMAS
+    # выполняет на каждом новом соединении движок core.backends.sqlite3.
+    # Тестовая база — файл, иначе WAL не включится.
+    'sqlite-tuned': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 20000,
+            'mmap_size': 256 * 1024 * 1024,
+        },
+        # pid в имени: параллельные прогоны не делят одну тестовую базу.
+        'TEST': {
+            'NAME': os.path.join(
+                tempfile.gettempdir(), f'yatube-test-{os.getpid()}.sqlite3'
+            ),
+        },
+    },
+    # Драйвер ставится отдельно: pip install -r requirements-postgres.txt.
+    # Соединения живут CONN_MAX_AGE секунд и переиспользуются запросами.
+    # За PgBouncer в режиме транзакций (YATUBE_DB_POOLER=1) серверные
+    # курсоры iterator() отключаются: пулер не держит их между
+    # транзакциями.
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', 'yatube'),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('YATUBE_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            os.environ.get('YATUBE_DB_POOLER')
+        ),
+        'OPTIONS': {'connect_timeout': 5},
+    },
 }
+DATABASE_PROFILE = os.environ.get('YATUBE_DB', 'sqlite')
+DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+if PRODUCTION:
+    # Соединение переживает запрос и не открывается на каждый заново.
+    DATABASES['default'].setdefault(
+        'CONN_MAX_AGE', int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60))
+    )
+
+# В production сессия читается из кэша, а база — только при промахе.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if PRODUCTION
+    else 'django.contrib.sessions.backends.db'
+)
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -101,10 +234,104 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, "static"),
 )
+# collectstatic собирает сюда файлы с хэшем в имени и их сжатые копии
+# (core.staticfiles). В тестах сборки нет, манифест не нужен.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING
+    else 'core.staticfiles.CompressedManifestStaticFilesStorage'
+)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Размеры миниатюр, которые нарезаются в фоне сразу после загрузки.
+# Вариант без format показывает <img>, WEBP — <source> в <picture>.
+THUMBNAIL_GEOMETRIES = {
+    'post': [
+        ('960x339', {'crop': 'center', 'upscale': True}),
+        ('960x339', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+    ],
+    'avatar': [
+        ('960x960', {'crop': 'center', 'upscale': True}),
+        ('960x960', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+    ],
+}
+# Загруженные картинки уменьшаются до этого размера и пережимаются.
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_QUALITY = 82
+# Потоки, режущие картинки; 0 — резать прямо в запросе (в тестах).
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'posts'
+
+# Постов на странице ленты подписок /follow/.
+POSTS_PER_PAGE = 10
+# Комментарии под постом подгружаются страницами по столько штук.
+COMMENTS_PER_PAGE = 20
+# Постов на странице JSON API (api.views).
+API_PAGE_SIZE = 20
+
+# Авторы, у которых подписчиков больше этого числа, не раскладываются
+# по лентам при публикации: их посты добираются при чтении /follow/.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 200
+
+# Автоматическая премодерация: посты с риском ниже порога публикуются
+# без модератора. Потоки оценки; 0 — оценивать прямо в запросе (в тестах).
+MODERATION_CLASSIFIER = 'posts.classifiers.WordlistClassifier'
+MODERATION_AUTO_APPROVE = 0.3
+MODERATION_WORKERS = 0 if TESTING else 1
+
+# Приращения likes_count копятся в памяти и пишутся в базу раз в столько
+# секунд (posts.likebuffer); 0 — писать сразу (в тестах).
+LIKE_FLUSH_INTERVAL = 0 if TESTING else 2
+
+# Профилирование запросов (core.middleware): доля запросов с полным
+# замером, порог медленного запроса и сколько SQL класть в его запись.
+PROFILING_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILING_RATE', 0.01))
+PROFILING_SLOW_MS = int(os.environ.get('YATUBE_SLOW_MS', 500))
+PROFILING_SLOW_SQL = 5
+
+# Файлы метрик рабочих процессов (core.metrics). Каталог общий для всех
+# процессов одного сервера; его стоит очищать при перезапуске.
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    tempfile.mkdtemp(prefix='yatube-metrics-') if TESTING
+    else os.path.join(BASE_DIR, '.metrics')
+)
+# Адреса через запятую, с которых можно читать /metrics; по умолчанию
+# только с этой машины.
+METRICS_ALLOWED_IPS = [
+    address for address in os.environ.get(
+        'YATUBE_METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+    ).split(',') if address
+]
+# Токен для /metrics: Prometheus передаёт его в заголовке
+# Authorization: Bearer. За обратным прокси все запросы приходят
+# с 127.0.0.1, и проверка адреса сама по себе ничего не закрывает.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'slow': {'format': '%(asctime)s %(message)s'},
+    },
+    'handlers': {
+        'slow': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'slow',
+        },
+    },
+    'loggers': {
+        'yatube.slow': {
+            'handlers': ['slow'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
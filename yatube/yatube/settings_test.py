@@ -0,0 +1,6 @@
+"""Настройки для pytest: manage.py test узнаётся и без них."""
+import os
+
+os.environ['YATUBE_TESTING'] = '1'
+
+from .settings import *  # noqa: E402,F401,F403
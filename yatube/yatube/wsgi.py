@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Сервер приложений не запускает системные проверки сам.
+from core.checks import ensure_production_ready  # noqa: E402
+
+ensure_production_ready()